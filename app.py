@@ -1,40 +1,114 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file
-from flask_sqlalchemy import SQLAlchemy
-from flask_compress import Compress
-from datetime import datetime, date, timedelta
+from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file, Response, stream_with_context, has_request_context
+from werkzeug.datastructures import MultiDict
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Session as SessionBase
+from collections import defaultdict
+from datetime import datetime, date, timedelta, timezone
 import os
 import json
 import csv
 import io
+import base64
+import codecs
 from functools import wraps
 import time
 
+from assets import StaticAssets, build_assets
+from cache import ResponseCache
+from compression import ResponseCompression, compress_file
+from config import Config
+from database.engine import (
+    WRITE_METHODS, database_url, engine_options, install_sqlite_tuning, install_write_lock, lock_writes,
+)
+from jobs import JobQueue
+from database.migrations import (
+    longest_run, rebuild_daily_stats, rebuild_note_tags, record_sync_rows, run_migrations, split_tags,
+    streak_dates,
+)
+from metrics import RequestMetrics
+from reminders import DueSoonReminders
+from search import search_content, ensure_search_index, rebuild_search_index
+from serialization import Schema, install_json_provider
+from startup import WARMUP_ENVIRON_KEY
+from tenancy import Tenancy, TenantSQLAlchemy
+
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///second_brain.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-key-please-change-in-production')
-app.config['COMPRESS_MIMETYPES'] = ['text/html', 'text/css', 'application/json', 'application/javascript']
+app.config.from_object(Config)
+install_json_provider(app)
+app.config['SQLALCHEMY_DATABASE_URI'] = database_url(app.config['SQLALCHEMY_DATABASE_URI'])
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config['SQLALCHEMY_DATABASE_URI'], app.config)
+
+# Registered first so its after_request runs last, on the finished response
+response_compression = ResponseCompression(app)
+
+# Write requests take the write lock (SQLite's, or an advisory lock on PostgreSQL) when their transaction starts
+def is_write_request():
+    return has_request_context() and request.method in WRITE_METHODS
 
-Compress(app)
+install_sqlite_tuning(app.config, write_intent=is_write_request)
+install_write_lock(is_write_request)
 
-db = SQLAlchemy(app)
+db = TenantSQLAlchemy(app)
+# Per-user databases when TENANCY_ENABLED; registered before anything that queries
+tenancy = Tenancy(app, db)
+tenancy.exempt('static', 'health_check', 'service_worker', 'metrics')
+static_assets = StaticAssets(app)
+response_cache = ResponseCache(app, namespace=tenancy.current)
+request_metrics = RequestMetrics(app)
+task_reminders = DueSoonReminders(app)
 
 # Database Models
 class Task(db.Model):
+    __table_args__ = (
+        # Open tasks in due order (undated first): the today list, agenda, reminders,
+        # overdue counts and filtered keyset pages are all ranges of it
+        db.Index('ix_task_completed_due_date', 'completed', 'due_date', 'id'),
+        # Completed counts
+        db.Index('ix_task_completed_updated_at', 'completed', 'updated_at'),
+        # "Completed today" range scans
+        db.Index('ix_task_completed_at', 'completed_at'),
+        # Unfiltered keyset pages on (due_date, id)
+        db.Index('ix_task_due_date_id', 'due_date', 'id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     due_date = db.Column(db.DateTime)
     completed = db.Column(db.Boolean, default=False)
+    completed_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 class Note(db.Model):
+    __table_args__ = (
+        # Recent notes and keyset pages on (updated_at, id)
+        db.Index('ix_note_updated_at_id', 'updated_at', 'id'),
+        # "Captured today" range scans
+        db.Index('ix_note_created_at', 'created_at'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     content = db.Column(db.Text, nullable=False)
     tags = db.Column(db.String(500))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Normalized copy of `tags` for filtering and counts; `tags` keeps the text as typed
+    normalized_tags = db.relationship('Tag', secondary='note_tag')
+
+class Tag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True, index=True)
+    # Notes carrying this tag; picks the query plan for tag filters and serves /api/tags
+    note_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+note_tag = db.Table(
+    'note_tag',
+    db.Column('tag_id', db.Integer, db.ForeignKey('tag.id', ondelete='CASCADE'), primary_key=True),
+    db.Column('note_id', db.Integer, db.ForeignKey('note.id', ondelete='CASCADE'), primary_key=True),
+    db.Index('ix_note_tag_note_id', 'note_id'),
+)
 
 class DailyLog(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -49,57 +123,320 @@ class Habit(db.Model):
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text)
     streak_count = db.Column(db.Integer, default=0)
+    longest_streak = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     last_completed = db.Column(db.Date)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completions = db.relationship('HabitCompletion', cascade='all, delete-orphan',
+                                  order_by='HabitCompletion.date')
+    
+    @hybrid_property
+    def current_streak(self):
+        # A streak not extended yesterday or today is broken, even before the nightly job resets it
+        if self.last_completed and (date.today() - self.last_completed).days <= 1:
+            return self.streak_count or 0
+        return 0
+    
+    @current_streak.inplace.expression
+    @classmethod
+    def _current_streak_expression(cls):
+        return db.case(
+            (cls.last_completed >= date.today() - timedelta(days=1), db.func.coalesce(cls.streak_count, 0)),
+            else_=0
+        )
+
+class HabitCompletion(db.Model):
+    # One row per habit per day done; the primary key serves per-habit date ranges
+    __tablename__ = 'habit_completion'
+    
+    habit_id = db.Column(db.Integer, db.ForeignKey('habit.id', ondelete='CASCADE'), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+
+class DailyStat(db.Model):
+    # Per-day counters maintained by _track_daily_stats in the writing transaction
+    __tablename__ = 'daily_stats'
+    
+    date = db.Column(db.Date, primary_key=True)
+    tasks_created = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    tasks_completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    notes_created = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    habits_completed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+class DailyRecap(db.Model):
+    # End-of-day recap, stored by the nightly job so past days are never recomputed
+    __tablename__ = 'daily_recap'
+    
+    date = db.Column(db.Date, primary_key=True)
+    recap = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class SyncChange(db.Model):
+    # Change log behind /api/sync: one row per object, moved to the end on every write.
+    # AUTOINCREMENT keeps seq from being reused when the newest row is replaced.
+    __tablename__ = 'sync_change'
+    __table_args__ = (
+        db.Index('ix_sync_change_kind_object_id', 'kind', 'object_id', unique=True),
+        {'sqlite_autoincrement': True},
+    )
+    
+    seq = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(10), nullable=False)
+    object_id = db.Column(db.Integer, nullable=False)
+    deleted = db.Column(db.Boolean, nullable=False, default=False)
+
+class Job(db.Model):
+    # Background work claimed and run by job_queue (see jobs.py)
+    __table_args__ = (
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+    
+    id = db.Column(db.String(32), primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    dedupe_key = db.Column(db.String(100), unique=True)
+    run_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # User whose database the job reads, when tenancy is enabled
+    tenant = db.Column(db.String(64))
+
+job_queue = JobQueue(app, db, tenancy)
+
+def dialect_insert(model):
+    # INSERT supporting ON CONFLICT for the current backend
+    if db.engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model.__table__)
+
+def increment_daily_stats(connection, day, **deltas):
+    stmt = dialect_insert(DailyStat).values(date=day, **deltas)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['date'],
+        set_={column: DailyStat.__table__.c[column] + stmt.excluded[column] for column in deltas}
+    )
+    connection.execute(stmt)
+
+def _old_value(obj, attribute):
+    history = db.inspect(obj).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return history.unchanged[0] if history.unchanged else None
+
+@db.event.listens_for(SessionBase, 'before_flush')
+def _track_daily_stats(session, flush_context, instances):
+    deltas = defaultdict(int)
+    now = datetime.utcnow()
+    
+    for obj in session.new:
+        if isinstance(obj, Task):
+            deltas[(obj.created_at or now).date(), 'tasks_created'] += 1
+            if obj.completed:
+                obj.completed_at = obj.completed_at or now
+                deltas[obj.completed_at.date(), 'tasks_completed'] += 1
+        elif isinstance(obj, Note):
+            deltas[(obj.created_at or now).date(), 'notes_created'] += 1
+        elif isinstance(obj, HabitCompletion):
+            deltas[obj.date, 'habits_completed'] += 1
+    
+    for obj in session.dirty:
+        if isinstance(obj, Task) and db.inspect(obj).attrs.completed.history.has_changes():
+            was_completed = bool(_old_value(obj, 'completed'))
+            if obj.completed and not was_completed:
+                obj.completed_at = now
+                deltas[now.date(), 'tasks_completed'] += 1
+            elif was_completed and not obj.completed:
+                if obj.completed_at:
+                    deltas[obj.completed_at.date(), 'tasks_completed'] -= 1
+                obj.completed_at = None
+    
+    for obj in session.deleted:
+        if isinstance(obj, Task):
+            if obj.created_at:
+                deltas[obj.created_at.date(), 'tasks_created'] -= 1
+            if obj.completed and obj.completed_at:
+                deltas[obj.completed_at.date(), 'tasks_completed'] -= 1
+        elif isinstance(obj, Note) and obj.created_at:
+            deltas[obj.created_at.date(), 'notes_created'] -= 1
+        elif isinstance(obj, HabitCompletion):
+            deltas[obj.date, 'habits_completed'] -= 1
+    
+    by_day = defaultdict(dict)
+    for (day, column), delta in deltas.items():
+        if delta:
+            by_day[day][column] = delta
+    for day, changes in by_day.items():
+        increment_daily_stats(session.connection(), day, **changes)
+
+# Tag usage counts follow the note_tag links as they are added and removed
+@db.event.listens_for(Note.normalized_tags, 'append')
+def _count_tag_added(note, tag, initiator):
+    tag.note_count = (tag.note_count or 0) + 1
+
+@db.event.listens_for(Note.normalized_tags, 'remove')
+def _count_tag_removed(note, tag, initiator):
+    tag.note_count = (tag.note_count or 0) - 1
+
+@db.event.listens_for(SessionBase, 'before_flush')
+def _count_deleted_note_tags(session, flush_context, instances):
+    for obj in session.deleted:
+        if isinstance(obj, Note):
+            for tag in obj.normalized_tags:
+                tag.note_count = (tag.note_count or 0) - 1
+
+# Writes invalidate cached responses for the tables they touched, once committed
+def mark_changed(*tables):
+    # Core statements skip the flush hooks; record their tables by hand
+    db.session.info.setdefault('changed_tables', set()).update(tables)
+
+@db.event.listens_for(SessionBase, 'after_flush')
+def _collect_changed_tables(session, flush_context):
+    changed = session.info.setdefault('changed_tables', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        changed.add(obj.__tablename__)
+
+# Every task, note, habit and log write is appended to the sync change log
+SYNC_KINDS = {Task: 'task', Note: 'note', Habit: 'habit', DailyLog: 'log'}
+
+def record_sync_changes(connection, changes):
+    # changes: {(kind, object_id): deleted}
+    if not changes:
+        return
+    table = SyncChange.__table__
+    # Writers outside requests (jobs, commands) take it here, before their seq numbers
+    lock_writes(connection)
+    rows = [{'kind': kind, 'object_id': object_id, 'deleted': deleted}
+            for (kind, object_id), deleted in changes.items()]
+    connection.execute(
+        table.delete().where(table.c.kind == db.bindparam('kind'), table.c.object_id == db.bindparam('object_id')),
+        [{'kind': row['kind'], 'object_id': row['object_id']} for row in rows]
+    )
+    connection.execute(table.insert(), rows)
+
+@db.event.listens_for(SessionBase, 'after_flush')
+def _record_sync_changes(session, flush_context):
+    changes = {}
+    for obj in session.new:
+        if type(obj) in SYNC_KINDS:
+            changes[SYNC_KINDS[type(obj)], obj.id] = False
+    for obj in session.dirty:
+        if type(obj) in SYNC_KINDS and session.is_modified(obj):
+            changes[SYNC_KINDS[type(obj)], obj.id] = False
+    for obj in session.deleted:
+        if type(obj) in SYNC_KINDS:
+            changes[SYNC_KINDS[type(obj)], obj.id] = True
+    record_sync_changes(session.connection(), changes)
+
+@db.event.listens_for(SessionBase, 'after_commit')
+def _invalidate_response_cache(session):
+    changed = session.info.pop('changed_tables', None)
+    if changed:
+        response_cache.invalidate(changed)
+        # Waiting reminder polls look again at once
+        if 'task' in changed:
+            task_reminders.notify()
+
+@db.event.listens_for(SessionBase, 'after_soft_rollback')
+def _discard_changed_tables(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('changed_tables', None)
+
+def daily_stat_to_dict(stat):
+    return {
+        'date': stat.date.isoformat(),
+        'tasks_created': stat.tasks_created,
+        'tasks_completed': stat.tasks_completed,
+        'notes_created': stat.notes_created,
+        'habits_completed': stat.habits_completed
+    }
 
 # Smart Functions
-def generate_daily_recap():
-    today = date.today()
+def day_range(day):
+    # Half-open [start, end) bounds so range predicates can use column indexes
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+def get_dashboard_stats(today=None):
+    today = today or date.today()
     
-    completed_tasks = Task.query.filter(
-        db.func.date(Task.updated_at) == today,
-        Task.completed == True
-    ).all()
+    # Every dashboard counter in one statement: index range counts for totals,
+    # and today's activity from the materialized daily_stats row
+    def count(column, *criteria):
+        return db.select(db.func.count(column)).where(*criteria).scalar_subquery()
     
-    overdue_tasks = Task.query.filter(
-        Task.due_date < datetime.now(),
-        Task.completed == False
-    ).all()
+    def today_stat(column):
+        return db.func.coalesce(db.select(column).where(DailyStat.date == today).scalar_subquery(), 0)
     
-    recent_notes = Note.query.filter(
-        db.func.date(Note.created_at) == today
-    ).all()
+    row = db.session.query(
+        count(Task.id),
+        count(Task.id, Task.completed == True),
+        today_stat(DailyStat.tasks_completed),
+        count(Task.id, Task.completed == False, Task.due_date < datetime.now()),
+        count(Note.id),
+        today_stat(DailyStat.notes_created),
+        count(Habit.id),
+    ).one()
+    
+    return {
+        'tasks_count': row[0],
+        'completed_tasks_count': row[1],
+        'completed_today': row[2],
+        'overdue_count': row[3],
+        'notes_count': row[4],
+        'notes_today': row[5],
+        'habits_count': row[6],
+    }
+
+def get_completed_today_titles(today=None, limit=3):
+    start, end = day_range(today or date.today())
+    rows = db.session.query(Task.title).filter(
+        Task.completed_at >= start,
+        Task.completed_at < end
+    ).order_by(Task.completed_at.asc()).limit(limit).all()
+    return [row.title for row in rows]
+
+def generate_daily_recap(stats=None, day=None):
+    stats = stats or get_dashboard_stats(day)
+    completed_count = stats['completed_today']
+    overdue_count = stats['overdue_count']
+    notes_count = stats['notes_today']
+    completed_titles = get_completed_today_titles(day) if completed_count else []
     
     recap = {
-        'completed_count': len(completed_tasks),
-        'overdue_count': len(overdue_tasks),
-        'notes_count': len(recent_notes),
-        'summary': generate_ai_summary(completed_tasks, overdue_tasks, recent_notes),
-        'productivity_score': calculate_productivity_score(completed_tasks, overdue_tasks)
+        'completed_count': completed_count,
+        'overdue_count': overdue_count,
+        'notes_count': notes_count,
+        'summary': generate_ai_summary(completed_count, overdue_count, notes_count, completed_titles),
+        'productivity_score': calculate_productivity_score(completed_count, overdue_count)
     }
     
     return recap
 
-def generate_ai_summary(completed_tasks, overdue_tasks, recent_notes):
-    if not completed_tasks and not recent_notes:
+def generate_ai_summary(completed_count, overdue_count, notes_count, completed_titles):
+    if not completed_count and not notes_count:
         return "A quiet day. Consider adding some tasks or notes for tomorrow!"
     
     summary_parts = []
     
-    if completed_tasks:
-        task_titles = [task.title for task in completed_tasks[:3]]
-        if len(completed_tasks) > 3:
-            summary_parts.append(f"Completed {len(completed_tasks)} tasks including: {', '.join(task_titles)}...")
+    if completed_count:
+        task_titles = completed_titles[:3]
+        if completed_count > 3:
+            summary_parts.append(f"Completed {completed_count} tasks including: {', '.join(task_titles)}...")
         else:
             summary_parts.append(f"Completed: {', '.join(task_titles)}")
     
-    if overdue_tasks:
-        summary_parts.append(f"⚠️ {len(overdue_tasks)} tasks overdue")
+    if overdue_count:
+        summary_parts.append(f"⚠️ {overdue_count} tasks overdue")
     
-    if recent_notes:
-        summary_parts.append(f"Captured {len(recent_notes)} new ideas")
+    if notes_count:
+        summary_parts.append(f"Captured {notes_count} new ideas")
     
-    productivity = len(completed_tasks) - len(overdue_tasks)
+    productivity = completed_count - overdue_count
     if productivity > 3:
         summary_parts.append("Great productivity today! 🎉")
     elif productivity > 0:
@@ -109,12 +446,292 @@ def generate_ai_summary(completed_tasks, overdue_tasks, recent_notes):
     
     return " ".join(summary_parts)
 
-def calculate_productivity_score(completed_tasks, overdue_tasks):
-    base_score = len(completed_tasks) * 10
-    penalty = len(overdue_tasks) * 5
+def calculate_productivity_score(completed_count, overdue_count):
+    base_score = completed_count * 10
+    penalty = overdue_count * 5
     score = max(0, min(100, base_score - penalty))
     return score
 
+# Request parsing and pagination helpers
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def parse_datetime(value):
+    if not value:
+        return None
+    if 'T' in value:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    return datetime.strptime(value, '%Y-%m-%d')
+
+def parse_bool(value):
+    if value is None or value == '':
+        return None
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f'Invalid boolean: {value}')
+
+def parse_limit(args):
+    limit = int(args.get('limit', PAGE_SIZE))
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def encode_cursor(*values):
+    raw = json.dumps([v.isoformat() if isinstance(v, (datetime, date)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+# Read-only endpoints select just these columns and skip building ORM objects
+TASK_SCHEMA = Schema(Task, 'id', 'title', 'description', 'due_date', 'completed', 'created_at', 'updated_at')
+NOTE_SCHEMA = Schema(Note, 'id', 'content', 'tags', 'created_at', 'updated_at')
+HABIT_SCHEMA = Schema(Habit, 'id', 'name', 'description', ('streak_count', 'current_streak'),
+                      'longest_streak', 'last_completed')
+LOG_SCHEMA = Schema(DailyLog, 'id', 'date', ('accomplishments', 'accomplishments', ''),
+                    ('missed_items', 'missed_items', ''), ('tomorrow_plan', 'tomorrow_plan', ''), 'created_at')
+
+def paginate_tasks(args):
+    # Keyset pagination on (due_date, id); undated tasks sort first
+    limit = parse_limit(args)
+    query = db.session.query(*TASK_SCHEMA.columns())
+    
+    completed = parse_bool(args.get('completed'))
+    if completed is not None:
+        query = query.filter(Task.completed == completed)
+    if parse_bool(args.get('overdue')):
+        query = query.filter(Task.completed == False, Task.due_date < datetime.now())
+    
+    due_from = parse_datetime(args.get('due_from'))
+    if due_from:
+        query = query.filter(Task.due_date >= due_from)
+    due_to = args.get('due_to')
+    if due_to:
+        if 'T' in due_to:
+            query = query.filter(Task.due_date <= parse_datetime(due_to))
+        else:
+            query = query.filter(Task.due_date < parse_datetime(due_to) + timedelta(days=1))
+    
+    cursor = args.get('cursor')
+    if cursor:
+        last_due, last_id = decode_cursor(cursor)
+        if last_due is None:
+            query = query.filter(db.or_(
+                db.and_(Task.due_date.is_(None), Task.id > last_id),
+                Task.due_date.isnot(None)
+            ))
+        else:
+            last_due = datetime.fromisoformat(last_due)
+            query = query.filter(db.or_(
+                Task.due_date > last_due,
+                db.and_(Task.due_date == last_due, Task.id > last_id)
+            ))
+    
+    tasks = query.order_by(Task.due_date.asc().nulls_first(), Task.id.asc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_cursor(tasks[-1].due_date, tasks[-1].id)
+    return tasks, next_cursor
+
+# Below this many candidate notes a tag filter reads the notes by id and sorts them;
+# above it, walking the updated_at index and probing note_tag finds a page sooner
+TAG_SCAN_MIN_NOTES = 2000
+
+def filter_notes_by_tags(query, tag_names, match='all'):
+    """Restrict a Note query to notes with all (or any) of the given tags."""
+    if match not in ('all', 'any'):
+        raise ValueError("match must be 'all' or 'any'")
+    tags = Tag.query.filter(Tag.name.in_(tag_names)).all()
+    if not tags or (match == 'all' and len(tags) < len(tag_names)):
+        return query.filter(db.false())
+    
+    def has_tag(tag_ids):
+        return db.exists().where(note_tag.c.note_id == Note.id, note_tag.c.tag_id.in_(tag_ids))
+    
+    if match == 'all':
+        for tag in tags:
+            query = query.filter(has_tag([tag.id]))
+        driver = [min(tags, key=lambda tag: tag.note_count)]
+    else:
+        query = query.filter(has_tag([tag.id for tag in tags]))
+        driver = tags
+    if sum(tag.note_count for tag in driver) < TAG_SCAN_MIN_NOTES:
+        tagged = db.select(note_tag.c.note_id).where(note_tag.c.tag_id.in_([tag.id for tag in driver]))
+        query = query.filter(Note.id.in_(tagged))
+    return query
+
+def paginate_notes(args):
+    # Keyset pagination on (updated_at, id), newest first; ?tag=a&tag=b matches
+    # notes with every tag, add match=any for notes with either
+    limit = parse_limit(args)
+    query = db.session.query(*NOTE_SCHEMA.columns())
+    
+    tag_names = split_tags(','.join(args.getlist('tag')))
+    if tag_names:
+        query = filter_notes_by_tags(query, tag_names, args.get('match', 'all'))
+    
+    cursor = args.get('cursor')
+    if cursor:
+        last_updated, last_id = decode_cursor(cursor)
+        last_updated = datetime.fromisoformat(last_updated)
+        query = query.filter(db.or_(
+            Note.updated_at < last_updated,
+            db.and_(Note.updated_at == last_updated, Note.id < last_id)
+        ))
+    
+    notes = query.order_by(Note.updated_at.desc(), Note.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(notes) > limit:
+        notes = notes[:limit]
+        next_cursor = encode_cursor(notes[-1].updated_at, notes[-1].id)
+    return notes, next_cursor
+
+LOG_TEXT_FIELDS = ('accomplishments', 'missed_items', 'tomorrow_plan')
+
+def log_schema(fields):
+    # ?fields=a,b projects the listed log fields; id and date are always included
+    if not fields:
+        return LOG_SCHEMA
+    requested = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = requested - set(LOG_SCHEMA.keys)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return LOG_SCHEMA.only(requested | {'id', 'date'})
+
+def log_date_range(args):
+    # Inclusive ?from= and ?to= dates as criteria on the date index
+    criteria = []
+    if args.get('from'):
+        criteria.append(DailyLog.date >= date.fromisoformat(args['from']))
+    if args.get('to'):
+        criteria.append(DailyLog.date <= date.fromisoformat(args['to']))
+    return criteria
+
+def paginate_logs(args):
+    # Keyset pagination on date, newest first
+    limit = parse_limit(args)
+    schema = log_schema(args.get('fields'))
+    query = schema.select().where(*log_date_range(args))
+    
+    cursor = args.get('cursor')
+    if cursor:
+        (last_date,) = decode_cursor(cursor)
+        query = query.where(DailyLog.date < date.fromisoformat(last_date))
+    
+    logs = db.session.execute(query.order_by(DailyLog.date.desc()).limit(limit + 1)).all()
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = encode_cursor(logs[-1].date)
+    return schema, logs, next_cursor
+
+def period_start(column, period):
+    # First day of the week (Monday) or month containing the date in `column`
+    if db.engine.dialect.name == 'postgresql':
+        return db.cast(db.func.date_trunc(period, column), db.Date)
+    if period == 'week':
+        return db.func.date(column, 'weekday 0', '-6 days')
+    return db.func.date(column, 'start of month')
+
+def word_count(column):
+    # Words between spaces and line breaks, counted by the database; runs of up to
+    # four spaces are folded into one first
+    text = db.func.replace(db.func.replace(db.func.coalesce(column, ''), '\r', ''), '\n', ' ')
+    for _ in range(2):
+        text = db.func.replace(text, '  ', ' ')
+    text = db.func.trim(text)
+    return db.case((text == '', 0), else_=db.func.length(text) - db.func.length(db.func.replace(text, ' ', '')) + 1)
+
+def log_rollups(period, criteria):
+    """Days logged and words written per week or month, aggregated in one grouped query."""
+    start = period_start(DailyLog.date, period).label('period_start')
+    words = sum(word_count(getattr(DailyLog, name)) for name in LOG_TEXT_FIELDS)
+    rows = db.session.query(
+        start,
+        db.func.count(DailyLog.id).label('days_logged'),
+        db.func.sum(words).label('words'),
+        db.func.sum(word_count(DailyLog.accomplishments)).label('accomplishment_words'),
+        db.func.count(DailyLog.id).filter(db.func.coalesce(DailyLog.missed_items, '') != '').label('days_with_missed_items'),
+    ).filter(*criteria).group_by(start).order_by(start.asc()).all()
+    return [{
+        'period_start': str(row.period_start),
+        'days_logged': row.days_logged,
+        'words': row.words or 0,
+        'accomplishment_words': row.accomplishment_words or 0,
+        'days_with_missed_items': row.days_with_missed_items,
+    } for row in rows]
+
+# Scheduling
+AGENDA_DAYS = 7
+MAX_AGENDA_DAYS = 90
+
+def today_task_rows(now, limit=50):
+    # Undated tasks, then those due by now: two ranges of ix_task_completed_due_date
+    # merged in order. The same filter written as an OR reads every open task
+    # whenever fewer than `limit` match.
+    open_tasks = TASK_SCHEMA.select().where(Task.completed == False)
+    statement = db.union_all(
+        open_tasks.where(Task.due_date.is_(None)),
+        open_tasks.where(Task.due_date <= now),
+    ).order_by(db.literal_column('due_date').nulls_first(), db.literal_column('id')).limit(limit)
+    return db.session.execute(statement).all()
+
+def get_agenda(now, days, limit):
+    """Open tasks due before the end of the day `days` days from now, split into overdue, today and upcoming."""
+    tomorrow = day_range(now.date())[1]
+    rows = db.session.execute(TASK_SCHEMA.select().where(
+        Task.completed == False,
+        Task.due_date < tomorrow + timedelta(days=days)
+    ).order_by(Task.due_date.asc(), Task.id.asc()).limit(limit + 1)).all()
+    
+    to_dict = TASK_SCHEMA.serializer()
+    buckets = {'overdue': [], 'today': [], 'upcoming': []}
+    for row in rows[:limit]:
+        if row.due_date < now:
+            bucket = 'overdue'
+        elif row.due_date < tomorrow:
+            bucket = 'today'
+        else:
+            bucket = 'upcoming'
+        buckets[bucket].append(to_dict(row))
+    return buckets, len(rows) > limit
+
+def due_soon_tasks(after=None):
+    """Open tasks due between now and the reminder lead time, less those the cursor `after` covers.
+
+    A (seq, horizon) cursor covers the tasks due by `horizon` as of sync_change
+    `seq`, so a task created or rescheduled since then is reminded even when
+    it is due before tasks already reminded. Returns the rows, the cursor that
+    covers them and the seconds until the next later task is due for a
+    reminder (None if there is none).
+    """
+    now = datetime.now()
+    horizon = now + task_reminders.lead
+    # Writes are serialized, so seq numbers follow commit order. Tasks changed
+    # after this one are left to the next poll, which sees them as changed.
+    seq = db.session.query(db.func.max(SyncChange.seq)).scalar() or 0
+    changed_at = db.func.coalesce(SyncChange.seq, 0)
+    query = TASK_SCHEMA.select().outerjoin(SyncChange, db.and_(
+        SyncChange.kind == 'task', SyncChange.object_id == Task.id
+    )).where(Task.completed == False, Task.due_date >= now, Task.due_date <= horizon, changed_at <= seq)
+    if after:
+        last_seq, last_horizon = after
+        query = query.where(db.or_(Task.due_date > last_horizon, changed_at > last_seq))
+    rows = db.session.execute(query.order_by(Task.due_date.asc(), Task.id.asc())).all()
+    later = db.session.query(db.func.min(Task.due_date)).filter(
+        Task.completed == False, Task.due_date > horizon
+    ).scalar()
+    # A waiting request must not keep a read transaction (and its WAL snapshot) open
+    db.session.close()
+    return rows, (seq, horizon), (later - horizon).total_seconds() if later else None
+
 def initialize_default_habits():
     existing_habits = Habit.query.count()
     if existing_habits > 0:
@@ -136,75 +753,159 @@ def initialize_default_habits():
     
     db.session.commit()
 
-def update_habit_streak(habit_id, completed=True):
-    habit = Habit.query.get(habit_id)
+@tenancy.on_create
+def prepare_database():
+    # The one-time startup step: run by `flask upgrade-db`, by gunicorn's master
+    # before it forks workers, and by the development and waitress servers.
+    # With tenancy, also run for each user's database when it is first opened.
+    applied = run_migrations(db.engine, db.metadata)
+    ensure_search_index(db.engine)
+    initialize_default_habits()
+    return applied
+
+def apply_habit_streak(habit, completed=True):
+    # Streaks only ever grow by today, so current and longest update in O(1)
+    # from last_completed; habit_completion keeps the full history
     today = date.today()
     
     if completed:
+        if habit.last_completed == today:
+            return habit.streak_count
         if habit.last_completed and (today - habit.last_completed).days == 1:
-            habit.streak_count += 1
-        elif not habit.last_completed or (today - habit.last_completed).days > 1:
+            habit.streak_count = (habit.streak_count or 0) + 1
+        else:
             habit.streak_count = 1
         habit.last_completed = today
+        habit.longest_streak = max(habit.longest_streak or 0, habit.streak_count)
+        db.session.add(HabitCompletion(habit_id=habit.id, date=today))
     else:
         if habit.last_completed and (today - habit.last_completed).days > 1:
             habit.streak_count = 0
     
-    db.session.commit()
     return habit.streak_count
 
+def update_habit_streak(habit_id, completed=True):
+    habit = db.session.get(Habit, habit_id)
+    if habit is None:
+        return None
+    streak = apply_habit_streak(habit, completed)
+    db.session.commit()
+    return streak
+
+# Mutations shared by the single-object routes and /api/batch (callers commit)
+def create_task_record(data):
+    due_date = None
+    if data.get('due_date'):
+        try:
+            due_date = parse_datetime(data['due_date'])
+        except:
+            due_date = None
+    
+    task = Task(
+        title=data['title'],
+        description=data.get('description', ''),
+        due_date=due_date
+    )
+    db.session.add(task)
+    return task
+
+def update_task_record(task, data):
+    if 'completed' in data:
+        task.completed = data['completed']
+    if 'title' in data:
+        task.title = data['title']
+    if 'description' in data:
+        task.description = data['description']
+    if 'due_date' in data and data['due_date']:
+        try:
+            task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
+        except:
+            pass
+    return task
+
+def set_note_tags(note):
+    names = split_tags(note.tags)
+    tags = Tag.query.filter(Tag.name.in_(names)).all() if names else []
+    known = {tag.name for tag in tags}
+    note.normalized_tags = tags + [Tag(name=name) for name in names if name not in known]
+
+def create_note_record(data):
+    note = Note(
+        content=data['content'],
+        tags=data.get('tags', '')
+    )
+    db.session.add(note)
+    set_note_tags(note)
+    return note
+
+def update_note_record(note, data):
+    note.content = data['content']
+    note.tags = data.get('tags', '')
+    set_note_tags(note)
+    return note
+
+def create_habit_record(data):
+    habit = Habit(
+        name=data['name'],
+        description=data.get('description', '')
+    )
+    db.session.add(habit)
+    return habit
+
+def update_habit_record(habit, data):
+    if 'name' in data:
+        habit.name = data['name']
+    if 'description' in data:
+        habit.description = data['description']
+    return habit
+
+# Views sorting tasks against the current time are re-rendered this often;
+# due dates set in the UI are whole minutes, so that is when tasks move bucket
+DUE_TIME_PERIOD = 60
+
 # Routes
 @app.route('/')
+@response_cache.cached('task', 'note', 'habit', period=DUE_TIME_PERIOD)
 def index():
-    today = date.today()
-    today_tasks = Task.query.filter(
-        (Task.due_date <= datetime.today()) | (Task.due_date.is_(None)),
-        Task.completed == False
-    ).order_by(Task.due_date.asc()).limit(50).all()
-    
-    completed_today = Task.query.filter(
-        db.func.date(Task.updated_at) == today,
-        Task.completed == True
-    ).count()
+    today_tasks = today_task_rows(datetime.today())
     
     recent_notes = Note.query.order_by(Note.updated_at.desc()).limit(10).all()
     current_date = datetime.now()
-    daily_recap = generate_daily_recap()
-    
-    tasks_count = Task.query.count()
-    notes_count = Note.query.count()
-    habits_count = Habit.query.count()
-    completed_tasks_count = Task.query.filter_by(completed=True).count()
+    stats = get_dashboard_stats()
+    daily_recap = generate_daily_recap(stats)
     
     return render_template('index.html', 
                          today_tasks=today_tasks,
-                         completed_today=completed_today,
+                         completed_today=stats['completed_today'],
                          recent_notes=recent_notes,
                          current_date=current_date,
                          daily_recap=daily_recap,
-                         tasks_count=tasks_count,
-                         notes_count=notes_count,
-                         habits_count=habits_count,
-                         completed_tasks_count=completed_tasks_count)
+                         tasks_count=stats['tasks_count'],
+                         notes_count=stats['notes_count'],
+                         habits_count=stats['habits_count'],
+                         completed_tasks_count=stats['completed_tasks_count'])
 
 @app.route('/tasks')
 def tasks():
-    all_tasks = Task.query.order_by(Task.due_date.asc()).all()
-    return render_template('tasks.html', tasks=all_tasks)
+    first_page, next_cursor = paginate_tasks({})
+    return render_template('tasks.html', tasks=first_page, next_cursor=next_cursor)
 
 @app.route('/notes')
 def notes():
-    all_notes = Note.query.order_by(Note.updated_at.desc()).all()
-    return render_template('notes.html', notes=all_notes)
+    first_page, next_cursor = paginate_notes(MultiDict())
+    return render_template('notes.html', notes=first_page, next_cursor=next_cursor)
 
 @app.route('/logs')
 def logs():
     recent_logs = DailyLog.query.order_by(DailyLog.date.desc()).limit(7).all()
-    return render_template('logs.html', logs=recent_logs)
+    week_start = date.today() - timedelta(days=6)
+    week_stats = {stat.date: stat for stat in DailyStat.query.filter(DailyStat.date >= week_start)}
+    activity = [(week_start + timedelta(days=i), week_stats.get(week_start + timedelta(days=i)))
+                for i in range(7)]
+    return render_template('logs.html', logs=recent_logs, date=date, activity=activity)
 
 @app.route('/habits')
 def habits():
-    initialize_default_habits()
     all_habits = Habit.query.all()
     today_date = date.today()
     return render_template('habits.html', habits=all_habits, date=today_date)
@@ -212,44 +913,42 @@ def habits():
 @app.route('/search')
 def search():
     query = request.args.get('q', '')
-    results = search_content(query) if query else {'tasks': [], 'notes': [], 'habits': []}
+    results = {'tasks': [], 'notes': [], 'habits': [], 'logs': []}
+    if query:
+        try:
+            with request_metrics.timer('search'):
+                results = search_content(db.engine, query)
+        except OperationalError:
+            # Malformed FTS expression; show no results rather than a 500
+            pass
     return render_template('search.html', results=results, query=query)
 
 @app.route('/export')
 def export_data():
-    tasks_count = Task.query.count()
-    notes_count = Note.query.count()
-    habits_count = Habit.query.count()
-    completed_tasks_count = Task.query.filter_by(completed=True).count()
+    stats = get_dashboard_stats()
     
     return render_template('export.html',
-                         tasks_count=tasks_count,
-                         notes_count=notes_count,
-                         habits_count=habits_count,
-                         completed_tasks_count=completed_tasks_count)
+                         tasks_count=stats['tasks_count'],
+                         notes_count=stats['notes_count'],
+                         habits_count=stats['habits_count'],
+                         completed_tasks_count=stats['completed_tasks_count'])
 
 # API Routes for Tasks
+@app.route('/api/tasks')
+def list_tasks():
+    try:
+        tasks, next_cursor = paginate_tasks(request.args)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'tasks': TASK_SCHEMA.dump(tasks),
+        'next_cursor': next_cursor
+    })
+
 @app.route('/api/tasks', methods=['POST'])
 def create_task():
     data = request.get_json()
-    
-    due_date = None
-    if data.get('due_date'):
-        try:
-            due_date_str = data['due_date']
-            if 'T' in due_date_str:
-                due_date = datetime.fromisoformat(due_date_str)
-            else:
-                due_date = datetime.strptime(due_date_str, '%Y-%m-%d')
-        except:
-            due_date = None
-    
-    task = Task(
-        title=data['title'],
-        description=data.get('description', ''),
-        due_date=due_date
-    )
-    db.session.add(task)
+    task = create_task_record(data)
     db.session.commit()
     return jsonify({'id': task.id, 'message': 'Task created successfully'})
 
@@ -257,19 +956,7 @@ def create_task():
 def update_task(task_id):
     task = Task.query.get_or_404(task_id)
     data = request.get_json()
-    
-    if 'completed' in data:
-        task.completed = data['completed']
-    if 'title' in data:
-        task.title = data['title']
-    if 'description' in data:
-        task.description = data['description']
-    if 'due_date' in data and data['due_date']:
-        try:
-            task.due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
-        except:
-            pass
-    
+    update_task_record(task, data)
     db.session.commit()
     return jsonify({'message': 'Task updated successfully'})
 
@@ -291,15 +978,67 @@ def get_task(task_id):
         'completed': task.completed
     })
 
+@app.route('/api/tasks/agenda')
+@response_cache.cached('task', period=DUE_TIME_PERIOD)
+def get_task_agenda():
+    try:
+        days = int(request.args.get('days', AGENDA_DAYS))
+        limit = parse_limit(request.args)
+    except ValueError:
+        return jsonify({'error': 'days and limit must be integers'}), 400
+    if not 0 <= days <= MAX_AGENDA_DAYS:
+        return jsonify({'error': f'days must be between 0 and {MAX_AGENDA_DAYS}'}), 400
+    
+    now = datetime.now()
+    buckets, has_more = get_agenda(now, days, limit)
+    return jsonify(dict(buckets, generated_at=now.isoformat(), has_more=has_more))
+
+# Long poll: answers as soon as a task comes within REMINDER_LEAD_MINUTES of its due
+# time, or after `wait` seconds with no reminders. Pass back the cursor so each
+# task is reminded once (and again if it is edited while due soon).
+@app.route('/api/tasks/reminders')
+def get_task_reminders():
+    cursor = request.args.get('cursor')
+    try:
+        after = None
+        if cursor:
+            last_seq, last_horizon = decode_cursor(cursor)
+            after = (int(last_seq), parse_datetime(last_horizon))
+        wait = float(request.args.get('wait', task_reminders.max_wait))
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    
+    covered = {}
+    def fetch():
+        rows, covered['cursor'], next_in = due_soon_tasks(after)
+        return rows, next_in
+    
+    rows, waited = task_reminders.poll(fetch, wait)
+    if rows:
+        cursor = encode_cursor(*covered['cursor'])
+    return jsonify({
+        'reminders': TASK_SCHEMA.dump(rows),
+        'cursor': cursor,
+        # No waiting slot was free: poll again after this many seconds
+        'retry_after': 0 if waited or rows else task_reminders.max_wait,
+    })
+
 # API Routes for Notes
+@app.route('/api/notes')
+def list_notes():
+    try:
+        notes, next_cursor = paginate_notes(request.args)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'notes': NOTE_SCHEMA.dump(notes),
+        'next_cursor': next_cursor
+    })
+
 @app.route('/api/notes', methods=['POST'])
 def create_note():
     data = request.get_json()
-    note = Note(
-        content=data['content'],
-        tags=data.get('tags', '')
-    )
-    db.session.add(note)
+    note = create_note_record(data)
     db.session.commit()
     return jsonify({'id': note.id, 'message': 'Note created successfully'})
 
@@ -307,8 +1046,7 @@ def create_note():
 def update_note(note_id):
     note = Note.query.get_or_404(note_id)
     data = request.get_json()
-    note.content = data['content']
-    note.tags = data.get('tags', '')
+    update_note_record(note, data)
     db.session.commit()
     return jsonify({'message': 'Note updated successfully'})
 
@@ -319,27 +1057,76 @@ def delete_note(note_id):
     db.session.commit()
     return jsonify({'message': 'Note deleted successfully'})
 
+# Tag counts, most used first
+@app.route('/api/tags')
+@response_cache.cached('note', 'tag')
+def list_tags():
+    query = (db.select(Tag.name, Tag.note_count)
+             .where(Tag.note_count > 0)
+             .order_by(Tag.note_count.desc(), Tag.name))
+    limit = request.args.get('limit', type=int)
+    if limit:
+        query = query.limit(limit)
+    return jsonify([{'name': name, 'count': count} for name, count in db.session.execute(query)])
+
 # API Routes for Logs - COMPLETE AND WORKING
+@app.route('/api/logs')
+@response_cache.cached('daily_log')
+def list_logs():
+    try:
+        schema, logs, next_cursor = paginate_logs(request.args)
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({
+        'logs': schema.dump(logs),
+        'next_cursor': next_cursor
+    })
+
+ROLLUP_PERIODS = ('week', 'month')
+
+@app.route('/api/logs/rollups')
+@response_cache.cached('daily_log')
+def get_log_rollups():
+    period = request.args.get('period', 'week')
+    if period not in ROLLUP_PERIODS:
+        return jsonify({'error': f"period must be one of: {', '.join(ROLLUP_PERIODS)}"}), 400
+    args = request.args.to_dict()
+    # The last year unless a range is given
+    if not args.get('from') and not args.get('to'):
+        args['from'] = (date.today() - timedelta(days=365)).isoformat()
+    try:
+        criteria = log_date_range(args)
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD'}), 400
+    return jsonify({'period': period, 'rollups': log_rollups(period, criteria)})
+
 @app.route('/api/logs', methods=['POST'])
 def create_log():
+    # Creates today's log or, if it already exists, updates the fields given: one
+    # INSERT ... ON CONFLICT, so concurrent saves cannot race to a duplicate date
     try:
-        data = request.get_json()
-        today = date.today()
-        
-        # Check if log already exists for today
-        existing_log = DailyLog.query.filter_by(date=today).first()
-        if existing_log:
-            return jsonify({'error': 'Log already exists for today'}), 400
-        
-        log = DailyLog(
-            date=today,
-            accomplishments=data.get('accomplishments', ''),
-            missed_items=data.get('missed_items', ''),
-            tomorrow_plan=data.get('tomorrow_plan', '')
+        data = request.get_json() or {}
+        now = datetime.utcnow()
+        stmt = dialect_insert(DailyLog).values(
+            date=date.today(), created_at=now,
+            **{name: data.get(name, '') for name in LOG_TEXT_FIELDS}
         )
-        db.session.add(log)
+        updates = {name: stmt.excluded[name] for name in LOG_TEXT_FIELDS if name in data}
+        stmt = stmt.on_conflict_do_update(index_elements=['date'], set_=updates or {'date': stmt.excluded.date})
+        log_id, created_at = db.session.execute(stmt.returning(DailyLog.id, DailyLog.created_at)).one()
+        
+        # Core statements skip the flush hooks
+        record_sync_changes(db.session.connection(), {('log', log_id): False})
+        mark_changed('daily_log')
         db.session.commit()
-        return jsonify({'id': log.id, 'message': 'Daily log created successfully'})
+        
+        # An existing log keeps its own created_at
+        created = created_at == now
+        return jsonify({
+            'id': log_id,
+            'created': created,
+            'message': 'Daily log created successfully' if created else 'Daily log updated successfully'
+        })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -369,20 +1156,14 @@ def delete_log(log_id):
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/logs/today')
+@response_cache.cached('daily_log')
 def get_today_log():
     try:
         today = date.today()
-        log = DailyLog.query.filter_by(date=today).first()
+        log = db.session.execute(LOG_SCHEMA.select().where(DailyLog.date == today)).first()
         
         if log:
-            return jsonify({
-                'id': log.id,
-                'date': log.date.isoformat(),
-                'accomplishments': log.accomplishments or '',
-                'missed_items': log.missed_items or '',
-                'tomorrow_plan': log.tomorrow_plan or '',
-                'exists': True
-            })
+            return jsonify({**LOG_SCHEMA.dump_one(log), 'exists': True})
         else:
             return jsonify({'exists': False})
     except Exception as e:
@@ -390,137 +1171,853 @@ def get_today_log():
 
 # API Routes for Habits
 @app.route('/api/habits')
+@response_cache.cached('habit')
 def get_habits():
-    habits = Habit.query.all()
-    habit_list = []
-    
-    for habit in habits:
-        habit_list.append({
-            'id': habit.id,
-            'name': habit.name,
-            'description': habit.description,
-            'streak_count': habit.streak_count,
-            'last_completed': habit.last_completed.isoformat() if habit.last_completed else None
-        })
-    
-    return jsonify(habit_list)
+    habits = db.session.execute(HABIT_SCHEMA.select().order_by(Habit.id))
+    return jsonify(HABIT_SCHEMA.dump(habits))
 
 @app.route('/api/habits/<int:habit_id>/complete', methods=['POST'])
 def complete_habit(habit_id):
     streak = update_habit_streak(habit_id, True)
+    if streak is None:
+        return jsonify({'error': 'Habit not found'}), 404
     return jsonify({'message': 'Habit completed!', 'streak': streak})
 
 @app.route('/api/habits/<int:habit_id>/skip', methods=['POST'])
 def skip_habit(habit_id):
     streak = update_habit_streak(habit_id, False)
+    if streak is None:
+        return jsonify({'error': 'Habit not found'}), 404
     return jsonify({'message': 'Habit skipped', 'streak': streak})
 
+MAX_HISTORY_DAYS = 10 * 366
+
+def encode_bitset(days, offsets):
+    # Bit i (least significant first within each byte) is day `from` + i
+    bits = bytearray((days + 7) // 8)
+    for offset in offsets:
+        bits[offset >> 3] |= 1 << (offset & 7)
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+def encode_runs(days, offsets):
+    # Alternating run lengths, missed days first: [missed, done, missed, done, ...]
+    runs = []
+    position = 0
+    for offset in offsets:
+        if runs and offset == position:
+            runs[-1] += 1
+        else:
+            runs += [offset - position, 1]
+        position = offset + 1
+    if position < days:
+        runs.append(days - position)
+    return runs
+
+@app.route('/api/habits/<int:habit_id>/history')
+@response_cache.cached('habit', 'habit_completion')
+def get_habit_history(habit_id):
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=364)
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD dates'}), 400
+    if start > end or (end - start).days >= MAX_HISTORY_DAYS:
+        return jsonify({'error': f'Range must be between 1 and {MAX_HISTORY_DAYS} days'}), 400
+    encoding = request.args.get('encoding', 'bitset')
+    if encoding not in ('bitset', 'rle'):
+        return jsonify({'error': 'encoding must be bitset or rle'}), 400
+    
+    habit = db.session.get(Habit, habit_id)
+    if habit is None:
+        return jsonify({'error': 'Habit not found'}), 404
+    
+    rows = db.session.query(HabitCompletion.date).filter(
+        HabitCompletion.habit_id == habit_id,
+        HabitCompletion.date >= start,
+        HabitCompletion.date <= end
+    ).order_by(HabitCompletion.date.asc()).all()
+    offsets = [(row.date - start).days for row in rows]
+    days = (end - start).days + 1
+    
+    history = {
+        'habit_id': habit.id,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'days': days,
+        'completed': len(offsets),
+        'completion_rate': round(len(offsets) / days, 3),
+        'current_streak': habit.current_streak,
+        'longest_streak': habit.longest_streak,
+        'encoding': encoding
+    }
+    if encoding == 'bitset':
+        history['bitset'] = encode_bitset(days, offsets)
+    else:
+        history['runs'] = encode_runs(days, offsets)
+    return jsonify(history)
+
 @app.route('/api/initialize-habits', methods=['POST'])
 def api_initialize_habits():
     initialize_default_habits()
     return jsonify({'message': 'Default habits initialized'})
 
+# Batch API
+MAX_BATCH_OPERATIONS = 1000
+
+BATCH_MODELS = {'task': Task, 'note': Note, 'habit': Habit}
+BATCH_CREATE = {'task': create_task_record, 'note': create_note_record, 'habit': create_habit_record}
+BATCH_UPDATE = {'task': update_task_record, 'note': update_note_record, 'habit': update_habit_record}
+
+class BatchOperationError(ValueError):
+    pass
+
+def apply_batch_operation(operation):
+    kind = operation.get('type')
+    action = operation.get('op')
+    data = operation.get('data') or {}
+    if kind not in BATCH_MODELS:
+        raise BatchOperationError(f'Unknown type: {kind}')
+    
+    if action == 'create':
+        obj = BATCH_CREATE[kind](data)
+        db.session.flush()
+        return {'id': obj.id}
+    
+    obj = db.session.get(BATCH_MODELS[kind], operation.get('id'))
+    if obj is None:
+        raise BatchOperationError(f'{kind.capitalize()} {operation.get("id")} not found')
+    
+    result = {'id': obj.id}
+    if action == 'update':
+        BATCH_UPDATE[kind](obj, data)
+    elif action == 'delete':
+        db.session.delete(obj)
+    elif action == 'complete' and kind == 'task':
+        obj.completed = data.get('completed', True)
+    elif action in ('complete', 'skip') and kind == 'habit':
+        result['streak'] = apply_habit_streak(obj, action == 'complete')
+    else:
+        raise BatchOperationError(f'Unsupported operation {action!r} for {kind}')
+    db.session.flush()
+    return result
+
+@app.route('/api/batch', methods=['POST'])
+def batch_operations():
+    data = request.get_json()
+    operations = data.get('operations') if isinstance(data, dict) else data
+    atomic = isinstance(data, dict) and data.get('atomic', False)
+    if not isinstance(operations, list):
+        return jsonify({'error': 'Expected a list of operations'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'error': f'At most {MAX_BATCH_OPERATIONS} operations per batch'}), 400
+    
+    results = []
+    failed = 0
+    for index, operation in enumerate(operations):
+        # Each operation runs in a savepoint so one failure doesn't undo the others
+        savepoint = db.session.begin_nested()
+        try:
+            if not isinstance(operation, dict):
+                raise BatchOperationError('Operation must be an object')
+            result = apply_batch_operation(operation)
+            savepoint.commit()
+            results.append({'index': index, 'status': 'ok', **result})
+        except (BatchOperationError, KeyError, TypeError, ValueError, db.exc.IntegrityError) as e:
+            savepoint.rollback()
+            failed += 1
+            if isinstance(e, KeyError):
+                error = f'Missing field: {e}'
+            elif isinstance(e, db.exc.IntegrityError):
+                error = str(e.orig)
+            else:
+                error = str(e)
+            results.append({'index': index, 'status': 'error', 'error': error})
+            if atomic:
+                db.session.rollback()
+                return jsonify({'error': 'Batch rolled back', 'results': results}), 400
+    
+    db.session.commit()
+    return jsonify({
+        'results': results,
+        'succeeded': len(operations) - failed,
+        'failed': failed
+    })
+
+# Delta sync
+SYNC_PAGE_SIZE = 500
+MAX_SYNC_PAGE_SIZE = 5000
+
+# record type -> (section, model, schema)
+SYNC_TYPES = {
+    'task': ('tasks', Task, TASK_SCHEMA),
+    'note': ('notes', Note, NOTE_SCHEMA),
+    'habit': ('habits', Habit, HABIT_SCHEMA),
+    'log': ('logs', DailyLog, LOG_SCHEMA),
+}
+
+@app.route('/api/sync')
+def sync_changes():
+    try:
+        since = int(request.args.get('since', 0))
+        limit = max(1, min(int(request.args.get('limit', SYNC_PAGE_SIZE)), MAX_SYNC_PAGE_SIZE))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be integers'}), 400
+    
+    # A cursor from another database (e.g. before a restore): start the replica over
+    latest = db.session.query(db.func.max(SyncChange.seq)).scalar() or 0
+    if since > latest:
+        return jsonify({'reset': True, 'cursor': 0, 'has_more': True})
+    
+    rows = db.session.query(SyncChange.seq, SyncChange.kind, SyncChange.object_id, SyncChange.deleted).filter(
+        SyncChange.seq > since
+    ).order_by(SyncChange.seq.asc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    changed = defaultdict(list)
+    deleted = defaultdict(list)
+    for row in rows:
+        (deleted if row.deleted else changed)[row.kind].append(row.object_id)
+    
+    response = {'changes': {}, 'deleted': {}}
+    for kind, (section, model, schema) in SYNC_TYPES.items():
+        ids = changed.get(kind)
+        records = db.session.execute(schema.select().where(model.id.in_(ids)).order_by(model.id)) if ids else []
+        response['changes'][section] = schema.dump(records)
+        response['deleted'][section] = deleted.get(kind, [])
+    response['cursor'] = rows[-1].seq if rows else since
+    response['has_more'] = has_more
+    return jsonify(response)
+
 # Other APIs
 @app.route('/api/daily-recap')
+@response_cache.cached('task', 'note', 'habit', 'daily_recap')
 def get_daily_recap():
-    recap = generate_daily_recap()
+    day = request.args.get('date')
+    if day:
+        try:
+            day = date.fromisoformat(day)
+        except ValueError:
+            return jsonify({'error': 'date must be YYYY-MM-DD'}), 400
+        # Past days were stored by the nightly job
+        if day < date.today():
+            stored = db.session.get(DailyRecap, day)
+            if stored:
+                return jsonify(json.loads(stored.recap))
+    recap = generate_daily_recap(day=day)
     return jsonify(recap)
 
-@app.route('/api/export/csv')
-def export_csv():
-    output = io.StringIO()
-    writer = csv.writer(output)
+MAX_STATS_DAYS = 3 * 366
+
+@app.route('/api/stats')
+def get_stats():
+    try:
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else date.today()
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({'error': 'from and to must be YYYY-MM-DD dates'}), 400
+    if start > end or (end - start).days >= MAX_STATS_DAYS:
+        return jsonify({'error': f'Range must be between 1 and {MAX_STATS_DAYS} days'}), 400
     
-    writer.writerow(['Type', 'Title/Content', 'Description/Tags', 'Status', 'Created Date'])
+    stats = DailyStat.query.filter(
+        DailyStat.date >= start,
+        DailyStat.date <= end
+    ).order_by(DailyStat.date.asc()).all()
+    days = [daily_stat_to_dict(stat) for stat in stats]
+    totals = {column: sum(day[column] for day in days)
+              for column in ('tasks_created', 'tasks_completed', 'notes_created', 'habits_completed')}
     
-    tasks = Task.query.all()
-    for task in tasks:
-        writer.writerow([
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'days': days,
+        'totals': totals
+    })
+
+# Streaming export
+EXPORT_VERSION = '1.0'
+EXPORT_BATCH_SIZE = 1000
+
+TASK_EXPORT_SCHEMA = Schema(Task, 'title', 'description', 'due_date', 'completed', 'completed_at', 'created_at')
+NOTE_EXPORT_SCHEMA = Schema(Note, 'content', 'tags', 'created_at')
+# The id is only there to look up completions and is dropped from the record
+HABIT_EXPORT_SCHEMA = Schema(Habit, 'id', 'name', 'description', 'streak_count', 'longest_streak',
+                             'last_completed', 'created_at')
+LOG_EXPORT_SCHEMA = Schema(DailyLog, 'date', 'accomplishments', 'missed_items', 'tomorrow_plan', 'created_at')
+
+def iter_rows(statement):
+    # yield_per streams rows from the cursor instead of loading the whole table
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+    yield from result.partitions()
+
+def export_batches(schema):
+    def batches():
+        for rows in iter_rows(schema.select().order_by(schema.model.id)):
+            yield schema.dump(rows)
+    return batches
+
+def habit_export_batches():
+    # One completions query per batch of habits rather than one per habit
+    for batch in export_batches(HABIT_EXPORT_SCHEMA)():
+        ids = [record.pop('id') for record in batch]
+        completions = defaultdict(list)
+        for habit_id, day in db.session.execute(
+            db.select(HabitCompletion.habit_id, HabitCompletion.date)
+            .where(HabitCompletion.habit_id.in_(ids))
+            .order_by(HabitCompletion.habit_id, HabitCompletion.date)
+        ):
+            completions[habit_id].append(day.isoformat())
+        for habit_id, record in zip(ids, batch):
+            record['completions'] = completions[habit_id]
+        yield batch
+
+# (section name, NDJSON record type, model, batches of export records)
+EXPORT_SECTIONS = [
+    ('tasks', 'task', Task, export_batches(TASK_EXPORT_SCHEMA)),
+    ('notes', 'note', Note, export_batches(NOTE_EXPORT_SCHEMA)),
+    ('habits', 'habit', Habit, habit_export_batches),
+    ('logs', 'log', DailyLog, export_batches(LOG_EXPORT_SCHEMA)),
+]
+
+class _LineBuffer:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+def generate_csv_export():
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(['Type', 'Title/Content', 'Description/Tags', 'Status', 'Created Date'])
+    
+    tasks = db.select(Task.title, Task.description, Task.completed, Task.created_at).order_by(Task.id)
+    for rows in iter_rows(tasks):
+        yield ''.join(writer.writerow([
             'Task',
-            task.title,
-            task.description or '',
-            'Completed' if task.completed else 'Pending',
-            task.created_at.strftime('%Y-%m-%d')
-        ])
-    
-    notes = Note.query.all()
-    for note in notes:
-        writer.writerow([
+            title,
+            description or '',
+            'Completed' if completed else 'Pending',
+            created_at.strftime('%Y-%m-%d')
+        ]) for title, description, completed, created_at in rows)
+    
+    for rows in iter_rows(db.select(Note.content, Note.tags, Note.created_at).order_by(Note.id)):
+        yield ''.join(writer.writerow([
             'Note',
-            note.content[:50] + '...' if len(note.content) > 50 else note.content,
-            note.tags or '',
+            content[:50] + '...' if len(content) > 50 else content,
+            tags or '',
             'Active',
-            note.created_at.strftime('%Y-%m-%d')
-        ])
+            created_at.strftime('%Y-%m-%d')
+        ]) for content, tags, created_at in rows)
     
-    habits = Habit.query.all()
-    for habit in habits:
-        writer.writerow([
+    habits = db.select(Habit.name, Habit.description, Habit.streak_count, Habit.created_at).order_by(Habit.id)
+    for rows in iter_rows(habits):
+        yield ''.join(writer.writerow([
             'Habit',
-            habit.name,
-            habit.description or '',
-            f'Streak: {habit.streak_count} days',
-            habit.created_at.strftime('%Y-%m-%d')
-        ])
-    
-    output.seek(0)
-    return send_file(
-        io.BytesIO(output.getvalue().encode('utf-8')),
+            name,
+            description or '',
+            f'Streak: {streak_count} days',
+            created_at.strftime('%Y-%m-%d')
+        ]) for name, description, streak_count, created_at in rows)
+
+def generate_json_export():
+    yield '{"export_date": %s, "version": %s' % (
+        json.dumps(datetime.now().isoformat()), json.dumps(EXPORT_VERSION))
+    encode = app.json.encode
+    for section, _, _, batches in EXPORT_SECTIONS:
+        yield ', "%s": [' % section
+        separator = ''
+        for batch in batches():
+            # One encoder call per batch; the list's brackets are dropped
+            yield separator + encode(batch)[1:-1]
+            separator = ', '
+        yield ']'
+    yield '}\n'
+
+def generate_ndjson_export():
+    yield json.dumps({
+        'type': 'meta',
+        'export_date': datetime.now().isoformat(),
+        'version': EXPORT_VERSION
+    }) + '\n'
+    encode = app.json.encode
+    for _, record_type, _, batches in EXPORT_SECTIONS:
+        for batch in batches():
+            yield ''.join(encode({'type': record_type, **record}) + '\n' for record in batch)
+
+def export_filename(extension):
+    return f'second_brain_export_{datetime.now().strftime("%Y%m%d")}.{extension}'
+
+# format -> (generator, mimetype)
+EXPORT_FORMATS = {
+    'csv': (generate_csv_export, 'text/csv'),
+    'json': (generate_json_export, 'application/json'),
+    'ndjson': (generate_ndjson_export, 'application/x-ndjson'),
+}
+
+@app.route('/api/export/csv')
+def export_csv():
+    return Response(
+        stream_with_context(generate_csv_export()),
         mimetype='text/csv',
-        as_attachment=True,
-        download_name=f'second_brain_export_{datetime.now().strftime("%Y%m%d")}.csv'
+        headers={'Content-Disposition': f'attachment; filename={export_filename("csv")}'}
     )
 
 @app.route('/api/export/json')
 def export_json():
-    data = {
-        'tasks': [],
-        'notes': [],
-        'habits': [],
-        'logs': [],
-        'export_date': datetime.now().isoformat(),
-        'version': '1.0'
+    return Response(stream_with_context(generate_json_export()), mimetype='application/json')
+
+@app.route('/api/export/ndjson')
+def export_ndjson():
+    return Response(
+        stream_with_context(generate_ndjson_export()),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename={export_filename("ndjson")}'}
+    )
+
+# Background jobs
+@job_queue.handler('export')
+def export_job(job_id, format='json'):
+    generate, mimetype = EXPORT_FORMATS[format]
+    path = job_queue.result_path(job_id, format)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in generate():
+            f.write(chunk)
+    # Compressed once here, so downloads never compress the export again
+    compress_file(path)
+    return {
+        'path': path,
+        'filename': export_filename(format),
+        'mimetype': mimetype,
+        'size': os.path.getsize(path),
+        'encodings': ['gzip']
     }
+
+def prune_jobs(before):
+    old = Job.query.filter(Job.finished_at < before).all()
+    for job in old:
+        result = json.loads(job.result) if job.result else {}
+        for path in (result.get('path'), result.get('path', '') + '.gz'):
+            if path and os.path.exists(path):
+                os.remove(path)
+        db.session.delete(job)
+    return len(old)
+
+def nightly_rollover(day):
+    # Stores the day's recap and breaks the streaks of habits not completed that day
+    recap = generate_daily_recap(get_dashboard_stats(day), day)
+    db.session.merge(DailyRecap(date=day, recap=json.dumps(recap)))
     
-    tasks = Task.query.all()
-    for task in tasks:
-        data['tasks'].append({
-            'title': task.title,
-            'description': task.description,
-            'due_date': task.due_date.isoformat() if task.due_date else None,
-            'completed': task.completed,
-            'created_at': task.created_at.isoformat()
-        })
-    
-    notes = Note.query.all()
-    for note in notes:
-        data['notes'].append({
-            'content': note.content,
-            'tags': note.tags,
-            'created_at': note.created_at.isoformat()
-        })
+    # Streaks of habits not completed on the day that ended are broken
+    rolled = db.session.execute(
+        db.update(Habit)
+        .where(Habit.streak_count > 0,
+               db.or_(Habit.last_completed.is_(None), Habit.last_completed < day))
+        .values(streak_count=0)
+        .returning(Habit.id)
+    ).scalars().all()
+    if rolled:
+        mark_changed('habit')
+        record_sync_changes(db.session.connection(), {('habit', habit_id): False for habit_id in rolled})
+    db.session.commit()
+    return len(rolled)
+
+@job_queue.handler('nightly')
+def nightly_job(job_id, day=None):
+    # Runs just after midnight for the day that ended, in every user's database
+    day = date.fromisoformat(day) if day else date.today() - timedelta(days=1)
+    habits_reset = sum(nightly_rollover(day) for _ in tenancy.each())
     
-    habits = Habit.query.all()
-    for habit in habits:
-        data['habits'].append({
-            'name': habit.name,
-            'description': habit.description,
-            'streak_count': habit.streak_count,
-            'last_completed': habit.last_completed.isoformat() if habit.last_completed else None,
-            'created_at': habit.created_at.isoformat()
-        })
+    # The job table stays in the configured database
+    pruned = prune_jobs(datetime.utcnow() - timedelta(days=app.config['JOB_RETENTION_DAYS']))
+    db.session.commit()
+    return {'date': day.isoformat(), 'habits_reset': habits_reset, 'jobs_pruned': pruned}
+
+def next_nightly_run(now):
+    # Five past local midnight, stored in UTC like every other timestamp
+    tomorrow = date.today() + timedelta(days=1)
+    run_at = datetime.combine(tomorrow, datetime.min.time()) + timedelta(minutes=5)
+    return run_at.astimezone(timezone.utc).replace(tzinfo=None), f'nightly:{tomorrow.isoformat()}'
+
+job_queue.schedule('nightly', next_nightly_run)
+
+@app.before_request
+def start_job_workers():
+    # Started lazily so each forked worker process gets its own threads;
+    # never by warm-up requests, which may run in gunicorn's master
+    if not request.environ.get(WARMUP_ENVIRON_KEY):
+        job_queue.start()
+
+def job_to_dict(job):
+    result = json.loads(job['result']) if job['result'] else None
+    data = {
+        'id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'created_at': str(job['created_at']) if job['created_at'] else None,
+        'started_at': str(job['started_at']) if job['started_at'] else None,
+        'finished_at': str(job['finished_at']) if job['finished_at'] else None,
+        'error': job['error'],
+    }
+    if job['status'] == 'done' and result and result.get('path'):
+        data['size'] = result.get('size')
+        data['download_url'] = url_for('download_job_result', job_id=job['id'])
+    return data
+
+@app.route('/api/export/jobs', methods=['POST'])
+def start_export_job():
+    data = request.get_json(silent=True) or {}
+    export_format = data.get('format', request.args.get('format', 'json'))
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f'format must be one of {", ".join(EXPORT_FORMATS)}'}), 400
+    job_id = job_queue.enqueue('export', {'format': export_format})
+    response = jsonify(job_to_dict(job_queue.get(job_id)))
+    response.status_code = 202
+    response.headers['Location'] = url_for('get_job', job_id=job_id)
+    return response
+
+def get_own_job(job_id):
+    # Another user's job is reported as missing
+    job = job_queue.get(job_id)
+    if job is None or job['tenant'] != tenancy.current():
+        return None
+    return job
+
+@app.route('/api/jobs/<job_id>')
+def get_job(job_id):
+    job = get_own_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_to_dict(job))
+
+@app.route('/api/jobs/<job_id>/download')
+def download_job_result(job_id):
+    job = get_own_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] != 'done' or not job['result']:
+        return jsonify({'error': f"Job is {job['status']}"}), 409
+    result = json.loads(job['result'])
+    if not os.path.exists(result['path']):
+        return jsonify({'error': 'Export file has expired'}), 410
+    path = result['path']
+    encoding = None
+    if 'gzip' in result.get('encodings', ()) and request.accept_encodings['gzip'] and os.path.exists(path + '.gz'):
+        path, encoding = path + '.gz', 'gzip'
+    response = send_file(path, mimetype=result['mimetype'],
+                         as_attachment=True, download_name=result['filename'])
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+# Bulk import
+IMPORT_BATCH_SIZE = 5000
+IMPORT_SECTIONS = {section: record_type for section, record_type, _, _ in EXPORT_SECTIONS}
+IMPORT_TYPES = {record_type: section for section, record_type in IMPORT_SECTIONS.items()}
+
+class ImportFormatError(ValueError):
+    pass
+
+def _import_datetime(value, default=None):
+    return datetime.fromisoformat(value) if value else default
+
+def _import_date(value):
+    return date.fromisoformat(value[:10]) if value else None
+
+def task_import_row(record, now):
+    created_at = _import_datetime(record.get('created_at'), now)
+    updated_at = _import_datetime(record.get('updated_at'), created_at)
+    completed = bool(record.get('completed', False))
+    return {
+        'title': record['title'],
+        'description': record.get('description'),
+        'due_date': _import_datetime(record.get('due_date')),
+        'completed': completed,
+        'completed_at': _import_datetime(record.get('completed_at'), updated_at) if completed else None,
+        'created_at': created_at,
+        'updated_at': updated_at
+    }
+
+def note_import_row(record, now):
+    created_at = _import_datetime(record.get('created_at'), now)
+    return {
+        'content': record['content'],
+        'tags': record.get('tags'),
+        'created_at': created_at,
+        'updated_at': _import_datetime(record.get('updated_at'), created_at)
+    }
+
+def habit_import_row(record, now):
+    streak_count = record.get('streak_count') or 0
+    last_completed = _import_date(record.get('last_completed'))
+    # Exports from before habit_completion carry only the current streak
+    if 'completions' in record:
+        completions = sorted({_import_date(day) for day in record['completions']})
+    else:
+        completions = streak_dates(last_completed, streak_count)
+    return {
+        'name': record['name'],
+        'description': record.get('description'),
+        'streak_count': streak_count,
+        'longest_streak': max(record.get('longest_streak') or 0, longest_run(completions), streak_count),
+        'last_completed': last_completed,
+        'created_at': _import_datetime(record.get('created_at'), now),
+        'completions': completions
+    }
+
+def log_import_row(record, now):
+    return {
+        'date': _import_date(record['date']),
+        'accomplishments': record.get('accomplishments'),
+        'missed_items': record.get('missed_items'),
+        'tomorrow_plan': record.get('tomorrow_plan'),
+        'created_at': _import_datetime(record.get('created_at'), now)
+    }
+
+def upsert_statement(model, key, update_columns):
+    # INSERT ... ON CONFLICT (key) DO UPDATE
+    stmt = dialect_insert(model)
+    return stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={column: stmt.excluded[column] for column in update_columns}
+    )
+
+IMPORT_TARGETS = {
+    'tasks': (Task, task_import_row),
+    'notes': (Note, note_import_row),
+    'habits': (Habit, habit_import_row),
+    'logs': (DailyLog, log_import_row),
+}
+
+def _check_version(version):
+    if version != EXPORT_VERSION:
+        raise ImportFormatError(f'Unsupported export version: {version}')
+
+def iter_ndjson_import(stream):
+    for line_number, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = app.json.loads(line)
+        except ValueError:
+            raise ImportFormatError(f'Invalid JSON on line {line_number}')
+        record_type = record.pop('type', None)
+        if record_type == 'meta':
+            _check_version(record.get('version'))
+        elif record_type in IMPORT_TYPES:
+            yield IMPORT_TYPES[record_type], record
+        else:
+            raise ImportFormatError(f'Unknown record type on line {line_number}: {record_type}')
+
+class _JSONStreamReader:
+    # Minimal incremental reader for the export document: walks the top-level
+    # object and decodes one array element at a time with raw_decode.
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder('utf-8')()
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            self.buffer += self.text_decoder.decode(b'', final=True)
+            return False
+        self.buffer = self.buffer[self.pos:] + self.text_decoder.decode(chunk)
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ImportFormatError('Unexpected end of JSON document')
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ImportFormatError(f'Expected {char!r} in JSON document')
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if self._fill():
+                    continue
+                raise ImportFormatError('Invalid JSON document')
+            # A number may continue in the next chunk; make sure it is complete
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_json_import(stream):
+    reader = _JSONStreamReader(stream)
+    reader.expect('{')
+    while reader.peek() != '}':
+        key = reader.value()
+        reader.expect(':')
+        if key in IMPORT_SECTIONS and reader.peek() == '[':
+            reader.expect('[')
+            while reader.peek() != ']':
+                yield key, reader.value()
+                if reader.peek() == ',':
+                    reader.expect(',')
+            reader.expect(']')
+        elif key == 'version':
+            _check_version(reader.value())
+        else:
+            reader.value()
+        if reader.peek() == ',':
+            reader.expect(',')
+
+def import_habits(rows):
+    completions = [row.pop('completions') for row in rows]
+    # The new ids come back in row order, to attach each habit's history
+    habit_ids = db.session.execute(
+        Habit.__table__.insert().returning(Habit.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+    completion_rows = [{'habit_id': habit_id, 'date': day}
+                       for habit_id, days in zip(habit_ids, completions) for day in days]
+    if completion_rows:
+        db.session.execute(HabitCompletion.__table__.insert(), completion_rows)
+        mark_changed(HabitCompletion.__tablename__)
+
+def import_records(records):
+    now = datetime.utcnow()
+    batches = {section: [] for section in IMPORT_TARGETS}
+    counts = {section: 0 for section in IMPORT_TARGETS}
+    log_upsert = upsert_statement(
+        DailyLog, 'date', ['accomplishments', 'missed_items', 'tomorrow_plan']
+    )
+
+    def flush(section):
+        rows = batches[section]
+        if not rows:
+            return
+        model = IMPORT_TARGETS[section][0]
+        if model is Habit:
+            import_habits(rows)
+        else:
+            # executemany: one prepared statement for the whole batch
+            db.session.execute(log_upsert if model is DailyLog else model.__table__.insert(), rows)
+        mark_changed(model.__tablename__)
+        counts[section] += len(rows)
+        batches[section] = []
+
+    for section, record in records:
+        try:
+            batches[section].append(IMPORT_TARGETS[section][1](record, now))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ImportFormatError(f'Invalid {section[:-1]} record: {e}')
+        if len(batches[section]) >= IMPORT_BATCH_SIZE:
+            flush(section)
+    for section in batches:
+        flush(section)
+    return counts
+
+@app.route('/api/import', methods=['POST'])
+def import_data():
+    is_ndjson = (request.mimetype == 'application/x-ndjson' or
+                 request.args.get('format') == 'ndjson')
+    # request.stream reads byte by byte on readline(); buffer it
+    stream = io.BufferedReader(request.stream, 64 * 1024)
+    records = iter_ndjson_import(stream) if is_ndjson else iter_json_import(stream)
     
-    logs = DailyLog.query.all()
-    for log in logs:
-        data['logs'].append({
-            'date': log.date.isoformat(),
-            'accomplishments': log.accomplishments,
-            'missed_items': log.missed_items,
-            'tomorrow_plan': log.tomorrow_plan,
-            'created_at': log.created_at.isoformat()
-        })
+    start = time.perf_counter()
+    try:
+        # The whole import is one transaction: it either lands completely or not at all
+        last_ids = {section: db.session.query(db.func.max(model.id)).scalar() or 0
+                    for section, (model, _) in IMPORT_TARGETS.items()}
+        with request_metrics.timer('import'):
+            counts = import_records(records)
+        # Core inserts bypass the ORM hooks, so recount the per-day stats and tags
+        rebuild_daily_stats(db.session.connection())
+        if counts['notes']:
+            rebuild_note_tags(db.session.connection())
+        for section, record_type in IMPORT_SECTIONS.items():
+            if counts[section]:
+                # Logs are upserted by date, so existing ones may have changed too
+                after_id = 0 if section == 'logs' else last_ids[section]
+                record_sync_rows(db.session.connection(), record_type, after_id)
+        db.session.commit()
+    except ImportFormatError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
     
-    return jsonify(data)
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    return jsonify({
+        'message': 'Import completed successfully',
+        'imported': counts,
+        'total': total,
+        'seconds': round(elapsed, 3),
+        'rows_per_second': int(total / elapsed) if elapsed else total
+    })
+
+@app.cli.command('upgrade-db')
+def upgrade_db_command():
+    applied = prepare_database()
+    print(f"Database is up to date ({len(applied)} migration(s) applied)")
+    # Opening a user's database brings it up to date
+    tenants = sum(1 for tenant in tenancy.each() if tenant is not None)
+    if tenants:
+        print(f"{tenants} user database(s) are up to date")
+
+@app.cli.command('rebuild-daily-stats')
+def rebuild_daily_stats_command():
+    for _ in tenancy.each():
+        with db.engine.begin() as conn:
+            rebuild_daily_stats(conn)
+    response_cache.invalidate()
+    print("Daily stats rebuilt successfully!")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    for _ in tenancy.each():
+        rebuild_search_index(db.engine)
+    print("Search index rebuilt successfully!")
+
+@app.cli.command('run-jobs')
+def run_jobs_command():
+    """Run background jobs in the foreground (for a dedicated worker process)."""
+    print("Running background jobs; press Ctrl+C to stop")
+    job_queue.run_forever()
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Minify, fingerprint and precompress static/css and static/js into static/dist."""
+    manifest, sizes = build_assets(app.static_folder)
+    print(f"{'asset':<22} {'source':>8} {'minified':>9} {'gzip':>7} {'br':>7}")
+    for source, size in sizes.items():
+        print(f"{source:<22} {size['source']:>8} {size['minified']:>9} "
+              f"{size.get('gzip', '-'):>7} {size.get('br', '-'):>7}")
+    print(f"Built {len(manifest['files'])} assets (version {manifest['version']}); restart the app to use them")
+
+@app.route('/sw.js')
+def service_worker():
+    # Served from the root so it controls every page. The precache list is part of
+    # the script, so each asset build changes its bytes and browsers install it anew.
+    with open(os.path.join(app.static_folder, 'sw.js'), encoding='utf-8') as f:
+        source = f.read()
+    manifest = json.dumps(static_assets.precache_manifest())
+    response = Response(f'self.__PRECACHE_MANIFEST = {manifest};\n{source}', mimetype='application/javascript')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/health')
 def health_check():
@@ -532,8 +2029,7 @@ def health_check():
 
 if __name__ == '__main__':
     with app.app_context():
-        db.create_all()
-        initialize_default_habits()
+        prepare_database()
     
     debug_mode = os.environ.get('FLASK_DEBUG', 'True').lower() == 'true'
     app.run(debug=debug_mode, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
\ No newline at end of file
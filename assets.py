@@ -0,0 +1,156 @@
+# assets.py - Minified, fingerprinted and precompressed static assets
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+import brotli
+from flask import current_app, request, send_from_directory, url_for
+
+# Source directories under static/ that are built; everything else is served as is
+ASSET_DIRS = ('css', 'js')
+BUILD_DIR = 'dist'
+MANIFEST_NAME = 'assets.json'
+ONE_YEAR = 365 * 24 * 3600
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def asset_sources(static_folder):
+    """Paths (relative to static/) of the files the build processes."""
+    return [
+        f'{directory}/{name}'
+        for directory in ASSET_DIRS
+        for name in sorted(os.listdir(os.path.join(static_folder, directory)))
+        if os.path.splitext(name)[1] in ('.css', '.js')
+    ]
+
+
+def _minify(extension, text):
+    # Only the build needs the minifiers
+    if extension == '.css':
+        from rcssmin import cssmin
+        return cssmin(text)
+    from rjsmin import jsmin
+    return jsmin(text)
+
+
+def _write_compressed(path, data):
+    """Write .br and .gz siblings of `path`, skipping any that would not be smaller."""
+    written = []
+    for encoding, suffix in ENCODINGS:
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=11)
+        else:
+            # mtime=0 keeps the output identical between builds
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        if len(compressed) < len(data):
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(encoding)
+    return written
+
+
+def build_assets(static_folder):
+    """Build static/css and static/js into static/dist and return the manifest.
+
+    Each file is minified and named after a hash of its content, so its URL can
+    be cached forever, with .br and .gz copies for servers to send as they are.
+    """
+    output = os.path.join(static_folder, BUILD_DIR)
+    shutil.rmtree(output, ignore_errors=True)
+    files = {}
+    encodings = {}
+    sizes = {}
+    for source in asset_sources(static_folder):
+        stem, extension = os.path.splitext(source)
+        with open(os.path.join(static_folder, source), encoding='utf-8') as f:
+            original = f.read()
+        data = _minify(extension, original).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:10]
+        target = f'{BUILD_DIR}/{stem}.{digest}{extension}'
+        path = os.path.join(static_folder, target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        files[source] = target
+        encodings[target] = _write_compressed(path, data)
+        sizes[source] = {'source': len(original.encode('utf-8')), 'minified': len(data)}
+        for encoding, suffix in ENCODINGS:
+            if encoding in encodings[target]:
+                sizes[source][encoding] = os.path.getsize(path + suffix)
+
+    version = hashlib.sha256(json.dumps(files, sort_keys=True).encode('utf-8')).hexdigest()[:10]
+    manifest = {'version': version, 'files': files, 'encodings': encodings}
+    with open(os.path.join(output, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write('\n')
+    return manifest, sizes
+
+
+class StaticAssets:
+    """Points url_for('static', ...) at built assets and serves their precompressed copies.
+
+    Without a build (or in debug mode, where sources change under you) static
+    files are served unchanged from their source paths.
+    """
+
+    def __init__(self, app=None):
+        self.files = {}
+        self.encodings = {}
+        self.version = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.manifest_path = app.config.get('ASSET_MANIFEST') or os.path.join(
+            app.static_folder, BUILD_DIR, MANIFEST_NAME)
+        if app.config.get('ASSETS_ENABLED', True) and not app.debug:
+            self.load()
+        app.url_defaults(self._hashed_filename)
+        app.view_functions['static'] = self.send_static
+
+    def load(self):
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        self.files = manifest['files']
+        self.encodings = manifest['encodings']
+        self.version = manifest['version']
+
+    def _hashed_filename(self, endpoint, values):
+        if endpoint == 'static' and values.get('filename') in self.files:
+            values['filename'] = self.files[values['filename']]
+
+    def send_static(self, filename):
+        encodings = self.encodings.get(filename)
+        if encodings is None:
+            return current_app.send_static_file(filename)
+
+        mimetype = mimetypes.guess_type(filename)[0]
+        for encoding, suffix in ENCODINGS:
+            if encoding in encodings and request.accept_encodings[encoding]:
+                response = send_from_directory(current_app.static_folder, filename + suffix,
+                                               mimetype=mimetype, max_age=ONE_YEAR)
+                # The response compressor leaves responses that already have an encoding alone
+                response.headers['Content-Encoding'] = encoding
+                break
+        else:
+            response = send_from_directory(current_app.static_folder, filename,
+                                           mimetype=mimetype, max_age=ONE_YEAR)
+        response.headers['Vary'] = 'Accept-Encoding'
+        response.cache_control.immutable = True
+        return response
+
+    def precache_manifest(self, extra=('/static/manifest.json',)):
+        """URLs for the service worker to precache, and a version that changes with them.
+
+        Pages are left out: the service worker fetches them from the network
+        and only falls back to a cached copy offline.
+        """
+        urls = list(extra) + [url_for('static', filename=source) for source in asset_sources(current_app.static_folder)]
+        return {'version': self.version or 'dev', 'urls': urls}
@@ -0,0 +1 @@
+# Benchmarks for Second Brain. Run individual scripts with `python -m benchmarks.<name>`.
@@ -0,0 +1,50 @@
+# benchmarks/bulk_import.py - throughput of POST /api/import
+#
+#   python -m benchmarks.bulk_import [rows]     (default: 1000000 tasks)
+import json
+import os
+import sys
+import time
+
+from benchmarks.common import BENCH_DIR, app, reset_database, task_rows, rng
+
+
+def write_ndjson(path, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'type': 'meta', 'version': '1.0'}) + '\n')
+        for row in task_rows(rng(), count):
+            f.write(json.dumps({
+                'type': 'task',
+                'title': row['title'],
+                'description': row['description'],
+                'due_date': row['due_date'].isoformat() if row['due_date'] else None,
+                'completed': row['completed'],
+                'created_at': row['created_at'].isoformat()
+            }) + '\n')
+
+
+def main(count):
+    path = os.path.join(BENCH_DIR, 'import.ndjson')
+    write_ndjson(path, count)
+    with app.app_context():
+        reset_database()
+
+    client = app.test_client()
+    with open(path, 'rb') as f:
+        start = time.perf_counter()
+        response = client.post(
+            '/api/import',
+            input_stream=f,
+            content_length=os.path.getsize(path),
+            content_type='application/x-ndjson'
+        )
+        wall = time.perf_counter() - start
+
+    result = response.get_json()
+    print(f"{count:,} rows ({os.path.getsize(path) / 1024 / 1024:.1f} MB NDJSON)")
+    print(f"status {response.status_code}: {result}")
+    print(f"wall clock {wall:.2f}s, {count / wall:,.0f} rows/s")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,200 @@
+# benchmarks/common.py - shared setup for the benchmark scripts
+import os
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+
+# Benchmarks always run against a throwaway database, never the real one
+BENCH_DIR = tempfile.mkdtemp(prefix='second-brain-bench-')
+os.environ['DATABASE_URL'] = os.environ.get(
+    'BENCH_DATABASE_URL', 'sqlite:///' + os.path.join(BENCH_DIR, 'bench.db')
+)
+
+from app import app, db, Task, Note, Habit, DailyLog  # noqa: E402
+
+WORDS = (
+    'plan review write call email fix ship design read learn draft meeting '
+    'budget report refactor deploy invoice garden gym groceries idea sprint '
+    'project roadmap backlog notes journal research outline feedback'
+).split()
+
+
+def sentence(rng, low=3, high=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(low, high)))
+
+
+def task_rows(rng, count, now=None):
+    now = now or datetime.utcnow()
+    for _ in range(count):
+        created = now - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86400))
+        updated = created + timedelta(days=rng.randint(0, 30))
+        yield {
+            'title': sentence(rng, 2, 6).capitalize(),
+            'description': sentence(rng),
+            'due_date': now + timedelta(days=rng.randint(-60, 60)) if rng.random() < 0.7 else None,
+            'completed': rng.random() < 0.6,
+            'created_at': created,
+            'updated_at': min(updated, now),
+        }
+
+
+def note_rows(rng, count, now=None):
+    now = now or datetime.utcnow()
+    for _ in range(count):
+        created = now - timedelta(days=rng.randint(0, 365), seconds=rng.randint(0, 86400))
+        yield {
+            'content': sentence(rng, 10, 60),
+            'tags': ', '.join(rng.sample(WORDS, rng.randint(0, 3))),
+            'created_at': created,
+            'updated_at': created,
+        }
+
+
+def habit_rows(rng, count, today=None):
+    today = today or date.today()
+    for i in range(count):
+        streak = rng.randint(0, 60)
+        yield {
+            'name': f'{sentence(rng, 1, 3).capitalize()} #{i + 1}',
+            'description': sentence(rng),
+            'streak_count': streak,
+            'last_completed': today - timedelta(days=rng.randint(0, 2)) if streak else None,
+            'created_at': datetime.utcnow(),
+        }
+
+
+def log_rows(rng, count, today=None):
+    # One log per day, walking back from today
+    today = today or date.today()
+    for offset in range(count):
+        yield {
+            'date': today - timedelta(days=offset),
+            'accomplishments': sentence(rng, 5, 30),
+            'missed_items': sentence(rng, 0, 10),
+            'tomorrow_plan': sentence(rng, 5, 20),
+            'created_at': datetime.utcnow(),
+        }
+
+
+def dataset_sizes(size):
+    """Row counts per table for a dataset scaled by its number of tasks."""
+    return {
+        'tasks': size,
+        'notes': max(size // 2, 1),
+        'habits': min(max(size // 1000, 5), 50),
+        'logs': min(max(size // 100, 7), 3650),
+    }
+
+
+def populate(size, seed=42):
+    """Fill an empty database with a reproducible dataset and its derived tables."""
+    from database.migrations import (
+        backfill_habit_completions, rebuild_daily_stats, rebuild_note_tags, seed_sync_changes,
+    )
+    from search import rebuild_search_index
+
+    generator = random.Random(seed)
+    counts = dataset_sizes(size)
+    # Anchored to noon today: dates stay realistic for the dashboard and the
+    # same seed gives the same rows on any given day
+    now = datetime.combine(date.today(), datetime.min.time()) + timedelta(hours=12)
+    insert_rows(Task, task_rows(generator, counts['tasks'], now))
+    insert_rows(Note, note_rows(generator, counts['notes'], now))
+    insert_rows(Habit, habit_rows(generator, counts['habits']))
+    insert_rows(DailyLog, log_rows(generator, counts['logs']))
+    with db.engine.begin() as conn:
+        rebuild_note_tags(conn)
+        backfill_habit_completions(conn)
+        rebuild_daily_stats(conn)
+        seed_sync_changes(conn)
+    rebuild_search_index(db.engine)
+    return counts
+
+
+def insert_rows(model, rows, batch_size=10000):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            db.session.execute(model.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(model.__table__.insert(), batch)
+    db.session.commit()
+
+
+def reset_database():
+    db.drop_all()
+    db.create_all()
+
+
+@contextmanager
+def count_queries():
+    stats = {'count': 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        stats['count'] += 1
+
+    db.event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield stats
+    finally:
+        db.event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def current_rss_mb(pid='self'):
+    # Resident set size of a process; Linux exposes it cheaply through /proc
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        if pid != 'self':
+            return 0.0  # exited, or no /proc to read it from
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+@contextmanager
+def track_peak_rss(interval=0.005, pids=None):
+    # pids: callable returning the processes to add up (default: this one)
+    def rss():
+        return sum(current_rss_mb(pid) for pid in (pids() if pids else ['self']))
+
+    stats = {'baseline_mb': rss(), 'peak_mb': 0.0}
+    stats['peak_mb'] = stats['baseline_mb']
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            stats['peak_mb'] = max(stats['peak_mb'], rss())
+            done.wait(interval)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield stats
+    finally:
+        done.set()
+        sampler.join()
+        stats['peak_mb'] = max(stats['peak_mb'], rss())
+        stats['growth_mb'] = stats['peak_mb'] - stats['baseline_mb']
+
+
+def timed(func, repeat=5):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+        db.session.remove()
+    samples.sort()
+    return result, samples[len(samples) // 2]
+
+
+def rng(seed=42):
+    return random.Random(seed)
@@ -0,0 +1,94 @@
+# benchmarks/compression.py - CPU per request and bytes sent under each compression policy
+#
+#   python -m benchmarks.compression [--size 10000] [--requests 200]
+#
+# Policies, all with a browser's Accept-Encoding (gzip, deflate, br, zstd):
+#   per-request  what Flask-Compress did: brotli 4 on every text body over 500 bytes, every time
+#   default      the configured policy: 1 KB threshold, zstd/br/gzip, bodies reused by ETag
+#   proxy        COMPRESS_DEFER_TO_PROXY: the app sends plain bodies and nginx compresses
+# CPU is this thread's CPU time for the whole request, so "saved" is per request end to end.
+import argparse
+import time
+
+from benchmarks.common import app
+from benchmarks.load import prepare_dataset
+from app import response_compression
+from compression import CompressedBodyCache
+
+ACCEPT_ENCODING = 'gzip, deflate, br, zstd'
+PATHS = (
+    '/health', '/api/logs/today', '/api/habits', '/api/daily-recap', '/',
+    '/api/tasks?limit=50', '/api/notes?limit=50', '/sw.js',
+)
+
+
+def policy_settings():
+    """name -> settings for response_compression, built once so the ETag cache persists."""
+    config = app.config
+    default_algorithms = [name.strip() for name in config['COMPRESS_ALGORITHMS'].split(',')]
+    return {
+        'per-request': {'enabled': True, 'algorithms': ['br'], 'min_size': 500, 'cache': None},
+        'default': {'enabled': True, 'algorithms': default_algorithms, 'min_size': config['COMPRESS_MIN_SIZE'],
+                    'cache': CompressedBodyCache(config['COMPRESS_CACHE_MAX_BYTES'])},
+        'proxy': {'enabled': False},
+    }
+
+
+def measure(client, path, settings, requests):
+    """Median CPU per request and the last response, alternating policies so drift hits all alike."""
+    headers = {'Accept-Encoding': ACCEPT_ENCODING}
+    samples = {name: [] for name in settings}
+    responses = {}
+    for i in range(requests + 3):
+        for name, values in settings.items():
+            for key, value in values.items():
+                setattr(response_compression, key, value)
+            start = time.thread_time()
+            response = client.get(path, headers=headers)
+            response.get_data()
+            elapsed = time.thread_time() - start
+            # The first few warm up templates and caches
+            if i >= 3:
+                samples[name].append(elapsed)
+            responses[name] = response
+    results = {}
+    for name, values in samples.items():
+        values.sort()
+        response = responses[name]
+        results[name] = (values[len(values) // 2] * 1e6, len(response.get_data()),
+                         response.headers.get('Content-Encoding', '-'))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the CPU cost of compression policies.')
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    prepare_dataset(args.size, args.seed)
+    client = app.test_client()
+    settings = policy_settings()
+    by_path = {path: measure(client, path, settings, args.requests) for path in PATHS}
+    results = {policy: {path: by_path[path][policy] for path in PATHS} for policy in settings}
+    policies = list(settings)
+
+    print(f"median CPU µs per request and bytes sent, {args.size} tasks")
+    print(f"{'path':<22}" + ''.join(f"{policy + ' µs':>16} {'bytes':>7} {'enc':>4}" for policy in policies)
+          + f"{'saved µs':>10}")
+    totals = dict.fromkeys(policies, 0.0)
+    for path in PATHS:
+        row = f'{path:<22}'
+        for policy in policies:
+            cpu, size, encoding = results[policy][path]
+            totals[policy] += cpu
+            row += f'{cpu:>16.0f} {size:>7} {encoding:>4}'
+        saved = results['per-request'][path][0] - results['default'][path][0]
+        print(row + f'{saved:>10.0f}')
+    print(f"{'mean':<22}" + ''.join(f'{totals[policy] / len(PATHS):>16.0f} {"":>7} {"":>4}' for policy in policies)
+          + f"{(totals['per-request'] - totals['default']) / len(PATHS):>10.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/concurrency.py - concurrent writers against one SQLite file
+#
+# Runs the same write-heavy workload with the connection tuning switched off
+# (SQLITE_TUNING=false) and on, and reports failed requests ("database is
+# locked") and throughput for each.
+#
+#   python -m benchmarks.concurrency [processes] [threads] [requests]
+import logging
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+MODES = {
+    'untuned': {'SQLITE_TUNING': 'false'},
+    'tuned': {'SQLITE_TUNING': 'true'},
+}
+
+
+def run_worker(env, threads, requests_per_thread, results):
+    os.environ.update(env)
+    os.environ['SERVER_THREADS'] = str(threads)
+    from benchmarks.common import app
+    app.logger.setLevel(logging.CRITICAL)
+
+    counts = {'ok': 0, 'failed': 0}
+    lock = threading.Lock()
+
+    def client_loop(index):
+        client = app.test_client()
+        ok = failed = 0
+        for i in range(requests_per_thread):
+            response = client.post('/api/tasks', json={'title': f'load {os.getpid()}-{index}-{i}'})
+            if response.status_code == 200:
+                task_id = response.get_json()['id']
+                response = client.put(f'/api/tasks/{task_id}', json={'completed': True})
+            if response.status_code == 200:
+                response = client.get('/api/tasks?limit=20')
+            if response.status_code == 200:
+                ok += 1
+            else:
+                failed += 1
+        with lock:
+            counts['ok'] += ok
+            counts['failed'] += failed
+
+    workers = [threading.Thread(target=client_loop, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    results.put(counts)
+
+
+def run_mode(name, processes, threads, requests_per_thread):
+    path = os.path.join(tempfile.mkdtemp(prefix='second-brain-load-'), 'load.db')
+    env = dict(MODES[name], BENCH_DATABASE_URL='sqlite:///' + path)
+    os.environ.update(env)
+
+    # Create the schema once, before the workers start
+    context = multiprocessing.get_context('spawn')
+    setup = context.Process(target=_create_schema, args=(env,))
+    setup.start()
+    setup.join()
+
+    results = context.Queue()
+    workers = [context.Process(target=run_worker, args=(env, threads, requests_per_thread, results))
+               for _ in range(processes)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    totals = {'ok': 0, 'failed': 0}
+    for _ in workers:
+        counts = results.get()
+        totals['ok'] += counts['ok']
+        totals['failed'] += counts['failed']
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    total = totals['ok'] + totals['failed']
+    print(f"{name:<10} {total:>9} {totals['failed']:>8} {elapsed:>9.2f} {totals['ok'] * 3 / elapsed:>10.0f}")
+
+
+def _create_schema(env):
+    os.environ.update(env)
+    from benchmarks.common import app, reset_database
+    with app.app_context():
+        reset_database()
+
+
+def main(processes, threads, requests_per_thread):
+    print(f"{processes} processes x {threads} threads x {requests_per_thread} iterations "
+          "(create + update + list)")
+    print(f"{'mode':<10} {'iterations':>9} {'failed':>8} {'seconds':>9} {'req/s':>10}")
+    for name in MODES:
+        run_mode(name, processes, threads, requests_per_thread)
+
+
+if __name__ == '__main__':
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [8, 4, 50][len(args):]))
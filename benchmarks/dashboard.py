@@ -0,0 +1,55 @@
+# benchmarks/dashboard.py - query count and latency of the dashboard counters
+#
+#   python -m benchmarks.dashboard [sizes...]     (default: 10000 100000 1000000)
+import sys
+from datetime import datetime, date
+
+from benchmarks.common import (
+    app, db, Task, Note, Habit, insert_rows, task_rows, note_rows,
+    reset_database, count_queries, timed, rng,
+)
+from app import get_dashboard_stats, generate_daily_recap
+
+
+def legacy_dashboard():
+    # The queries the index route used to run, kept here for comparison
+    today = date.today()
+    completed = Task.query.filter(db.func.date(Task.updated_at) == today, Task.completed == True).all()
+    overdue = Task.query.filter(Task.due_date < datetime.now(), Task.completed == False).all()
+    notes = Note.query.filter(db.func.date(Note.created_at) == today).all()
+    Task.query.filter(db.func.date(Task.updated_at) == today, Task.completed == True).count()
+    Task.query.count()
+    Note.query.count()
+    Habit.query.count()
+    Task.query.filter_by(completed=True).count()
+    return len(completed), len(overdue), len(notes)
+
+
+def aggregated_dashboard():
+    stats = get_dashboard_stats()
+    return generate_daily_recap(stats)
+
+
+def measure(label, func, size):
+    with count_queries() as queries:
+        func()
+    _, median_ms = timed(func)
+    print(f"{size:>10,}  {label:<12} {queries['count']:>7}  {median_ms:>10.1f}")
+
+
+def main(sizes):
+    generator = rng()
+    with app.app_context():
+        reset_database()
+        print(f"{'tasks':>10}  {'variant':<12} {'queries':>7}  {'median ms':>10}")
+        loaded = 0
+        for size in sorted(sizes):
+            insert_rows(Task, task_rows(generator, size - loaded))
+            insert_rows(Note, note_rows(generator, (size - loaded) // 10))
+            loaded = size
+            measure('legacy', legacy_dashboard, size)
+            measure('aggregated', aggregated_dashboard, size)
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [10000, 100000, 1000000])
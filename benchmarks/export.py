@@ -0,0 +1,59 @@
+# benchmarks/export.py - peak RSS and throughput of the streaming exports
+#
+#   python -m benchmarks.export [tasks]     (default: 200000, plus tasks/4 notes)
+import gc
+import sys
+import time
+
+from benchmarks.common import (
+    app, db, Task, Note, Habit, DailyLog, insert_rows, task_rows, note_rows,
+    reset_database, track_peak_rss, rng,
+)
+from app import EXPORT_SECTIONS
+
+
+def legacy_json_export():
+    # The previous implementation: every row in one dict, then one big dump
+    data = {section: [record for batch in batches() for record in batch]
+            for section, _, _, batches in EXPORT_SECTIONS}
+    return app.json.dumps(data).encode('utf-8')
+
+
+def stream(client, url):
+    response = client.get(url, buffered=False)
+    size = 0
+    for chunk in response.response:
+        size += len(chunk)
+    response.close()
+    return size
+
+
+def measure(label, func):
+    gc.collect()
+    with track_peak_rss() as rss:
+        start = time.perf_counter()
+        size = func()
+        elapsed = time.perf_counter() - start
+    print(f"{label:<16} {size / 1024 / 1024:>9.1f} {elapsed:>9.2f} {rss['growth_mb']:>14.1f}")
+
+
+def main(task_count):
+    generator = rng()
+    with app.app_context():
+        reset_database()
+        insert_rows(Task, task_rows(generator, task_count))
+        insert_rows(Note, note_rows(generator, task_count // 4))
+        db.session.remove()
+
+    client = app.test_client()
+    print(f"{task_count:,} tasks, {task_count // 4:,} notes")
+    print(f"{'export':<16} {'size MB':>9} {'seconds':>9} {'RSS growth MB':>14}")
+    measure('csv (stream)', lambda: stream(client, '/api/export/csv'))
+    measure('json (stream)', lambda: stream(client, '/api/export/json'))
+    measure('ndjson (stream)', lambda: stream(client, '/api/export/ndjson'))
+    with app.app_context():
+        measure('json (legacy)', lambda: len(legacy_json_export()))
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,338 @@
+# benchmarks/load.py - scripted load scenarios with latency percentiles and a stored baseline
+#
+#   python -m benchmarks.load [--size 10000] [--target client|gunicorn] [--scenario NAME ...]
+#                             [--requests 300] [--concurrency 4] [--workers 2]
+#                             [--baseline benchmarks/baseline.json] [--save-baseline]
+#
+# Set BENCH_DATABASE_URL to keep the generated dataset between runs.
+import argparse
+import gzip
+import http.client
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks.common import (
+    BENCH_DIR, WORDS, app, db, populate, reset_database, sentence, track_peak_rss, rng,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+HEADERS = {'Accept-Encoding': 'gzip', 'Content-Type': 'application/json'}
+
+
+# Scenarios: each returns (method, path, json body or None, callback for the response JSON or None)
+def cycle(*paths):
+    def next_request(generator, state):
+        state['i'] = state.get('i', -1) + 1
+        return 'GET', paths[state['i'] % len(paths)], None, None
+    return next_request
+
+
+def list_request(generator, state):
+    return cycle(
+        '/tasks', '/notes', '/api/tasks?completed=false', '/api/tasks?overdue=true',
+        '/api/notes?tag=' + generator.choice(WORDS),
+    )(generator, state)
+
+
+def search_request(generator, state):
+    terms = ' '.join(generator.choice(WORDS) for _ in range(generator.randint(1, 2)))
+    return 'GET', '/search?q=' + terms.replace(' ', '+'), None, None
+
+
+def crud_request(generator, state):
+    created = state.setdefault('created', [])
+    roll = generator.random()
+    if roll < 0.3 or not created:
+        body = {'title': sentence(generator, 2, 6), 'description': sentence(generator)}
+        return 'POST', '/api/tasks', body, lambda data: created.append(data['id'])
+    if roll < 0.5:
+        task_id = generator.randint(1, state['size'])
+        return 'PUT', f'/api/tasks/{task_id}', {'completed': generator.random() < 0.5}, None
+    if roll < 0.6:
+        return 'DELETE', f'/api/tasks/{created.pop()}', None, None
+    if roll < 0.8:
+        body = {'content': sentence(generator, 10, 40), 'tags': ', '.join(generator.sample(WORDS, 2))}
+        return 'POST', '/api/notes', body, None
+    return 'GET', '/api/tasks?limit=50', None, None
+
+
+# name -> (request builder, share of --requests to send)
+SCENARIOS = {
+    'dashboard': (cycle('/', '/api/daily-recap', '/api/habits', '/api/logs/today'), 1.0),
+    'lists': (list_request, 1.0),
+    'search': (search_request, 1.0),
+    'crud': (crud_request, 1.0),
+    'export': (cycle('/api/export/json'), 0.05),
+}
+
+
+# Targets
+def decode(data, headers):
+    # Bodies are requested compressed, as a browser would; callbacks need them plain
+    return gzip.decompress(data) if headers.get('Content-Encoding') == 'gzip' else data
+
+
+class ClientTarget:
+    """Requests through Flask's test client, in this process."""
+
+    name = 'client'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def session(self):
+        client = app.test_client()
+
+        def send(method, path, body):
+            response = client.open(path, method=method, json=body, headers={'Accept-Encoding': 'gzip'})
+            return response.status_code, decode(response.get_data(), response.headers)
+        return send
+
+    def pids(self):
+        return ['self']
+
+
+class GunicornTarget:
+    """Requests over HTTP to a gunicorn launched from gunicorn.conf.py."""
+
+    name = 'gunicorn'
+
+    def __init__(self, workers, env=None):
+        self.workers = workers
+        self.env = env or {}
+
+    def __enter__(self):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        env = dict(os.environ, CACHE_PATH=os.path.join(BENCH_DIR, 'response_cache.db'), **self.env)
+        self.log = open(os.path.join(BENCH_DIR, 'gunicorn.log'), 'w')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+             '--bind', f'127.0.0.1:{self.port}', '--workers', str(self.workers), 'app:app'],
+            cwd=ROOT, env=env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                status, _ = self.session()('GET', '/health', None)
+                if status == 200:
+                    return self
+            except OSError:
+                pass
+            if self.process.poll() is not None:
+                break
+            time.sleep(0.2)
+        self.__exit__()
+        raise RuntimeError(f'gunicorn did not start; see {self.log.name}')
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+        return False
+
+    def session(self):
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+
+        def send(method, path, body):
+            payload = json.dumps(body) if body is not None else None
+            try:
+                connection.request(method, path, body=payload, headers=HEADERS)
+                response = connection.getresponse()
+                return response.status, decode(response.read(), response.headers)
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                raise
+        return send
+
+    def pids(self):
+        # The master and its workers
+        master = self.process.pid
+        pids = [master]
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        if int(f.read().rsplit(')', 1)[1].split()[1]) == master:
+                            pids.append(int(entry))
+                except (OSError, IndexError, ValueError):
+                    continue
+        return pids
+
+
+# Measurement
+def percentile(samples, q):
+    # Nearest-rank percentile of sorted samples
+    return samples[max(0, math.ceil(q / 100 * len(samples)) - 1)]
+
+
+def run_scenario(target, name, total, concurrency, size, seed):
+    build_request, _ = SCENARIOS[name]
+    latencies = []
+    errors = []
+    remaining = [total]
+    lock = threading.Lock()
+
+    def worker(index):
+        send = target.session()
+        generator = rng(seed + index)
+        state = {'size': size}
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            method, path, body, callback = build_request(generator, state)
+            start = time.perf_counter()
+            try:
+                status, data = send(method, path, body)
+            except Exception as e:
+                errors.append(f'{method} {path}: {e}')
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            if status >= 400:
+                errors.append(f'{method} {path}: HTTP {status}')
+                continue
+            latencies.append(elapsed)
+            if callback:
+                callback(json.loads(data))
+
+    # Warm up templates, caches and connections before measuring
+    warmup = target.session()
+    for _ in range(3):
+        method, path, body, _ = build_request(rng(seed - 1), {'size': size})
+        if method == 'GET':
+            warmup(method, path, body)
+
+    with track_peak_rss(pids=target.pids) as memory:
+        start = time.perf_counter()
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.perf_counter() - start
+
+    latencies.sort()
+    result = {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'p50_ms': round(percentile(latencies, 50), 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 95), 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 99), 2) if latencies else None,
+        'rps': round(len(latencies) / wall, 1) if wall else None,
+        'peak_rss_mb': round(memory['peak_mb'], 1),
+    }
+    return result, errors[:5]
+
+
+def compare(result, baseline, tolerance):
+    """Percent changes against the baseline and whether any exceed the tolerance."""
+    deltas = {}
+    regressed = False
+    # p99 is reported but too noisy over a few hundred requests to gate on
+    for key, higher_is_worse in (('p50_ms', True), ('p95_ms', True), ('rps', False)):
+        old, new = baseline.get(key), result.get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        deltas[key] = change
+        if (change > tolerance) if higher_is_worse else (change < -tolerance):
+            regressed = True
+    return deltas, regressed
+
+
+def _fmt(value):
+    return '-' if value is None else value
+
+
+def prepare_dataset(size, seed):
+    # bench_dataset records which dataset the database holds, so it can be reused
+    with app.app_context():
+        with db.engine.begin() as conn:
+            conn.execute(db.text('CREATE TABLE IF NOT EXISTS bench_dataset (size INTEGER, seed INTEGER)'))
+            existing = conn.execute(db.text('SELECT size, seed FROM bench_dataset')).first()
+        if existing is None or tuple(existing) != (size, seed):
+            reset_database()
+            started = time.perf_counter()
+            counts = populate(size, seed)
+            with db.engine.begin() as conn:
+                conn.execute(db.text('DELETE FROM bench_dataset'))
+                conn.execute(db.text('INSERT INTO bench_dataset VALUES (:size, :seed)'), {'size': size, 'seed': seed})
+            print(f'Generated {counts} in {time.perf_counter() - started:.1f}s')
+        db.session.remove()
+        db.engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run load scenarios and compare them to a baseline.')
+    parser.add_argument('--size', type=int, default=10000, help='tasks in the dataset (1000 to 1000000)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--target', choices=('client', 'gunicorn'), default='client')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=300, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--tolerance', type=float, default=0.5, help='allowed slowdown before failing')
+    args = parser.parse_args()
+
+    prepare_dataset(args.size, args.seed)
+    key = f'{args.target}/{args.size}/c{args.concurrency}'
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    stored = baseline.get(key, {})
+
+    target = ClientTarget() if args.target == 'client' else GunicornTarget(args.workers)
+    results = {}
+    regressions = []
+    print(f"{key}: {'scenario':<10} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'req/s':>8} {'peak MB':>8}  vs baseline")
+    with target:
+        for name in args.scenario or list(SCENARIOS):
+            total = max(3, int(args.requests * SCENARIOS[name][1]))
+            result, errors = run_scenario(target, name, total, args.concurrency, args.size, args.seed)
+            results[name] = result
+            note = ''
+            if name in stored:
+                deltas, regressed = compare(result, stored[name], args.tolerance)
+                note = ' '.join(f'{k.split("_")[0]} {v:+.0%}' for k, v in deltas.items())
+                if regressed:
+                    regressions.append(name)
+                    note += '  REGRESSION'
+            print(f"{key}: {name:<10} {result['requests']:>8} {result['errors']:>6} "
+                  f"{_fmt(result['p50_ms']):>8} {_fmt(result['p95_ms']):>8} {_fmt(result['p99_ms']):>8} "
+                  f"{_fmt(result['rps']):>8} {result['peak_rss_mb']:>8}  {note}")
+            for error in errors:
+                print(f'    {error}')
+
+    if args.save_baseline:
+        baseline[key] = {**stored, **results}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Saved baseline {key} to {args.baseline}')
+    elif regressions:
+        print(f"Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/query_plans.py - check that hot routes are served from indexes
+#
+# Requests each hot route against a seeded database, captures every SELECT it
+# runs and fails (exit status 1) if EXPLAIN QUERY PLAN shows a full table scan
+# of a large table.
+#
+#   python -m benchmarks.query_plans
+import re
+import sys
+
+from benchmarks.common import (
+    app, db, Task, Note, Habit, DailyLog, insert_rows, task_rows, note_rows, habit_rows, reset_database, rng,
+)
+from database.migrations import backfill_habit_completions, run_migrations, seed_sync_changes
+
+HOT_ROUTES = [
+    '/',
+    '/tasks',
+    '/notes',
+    '/logs',
+    '/export',
+    '/api/tasks',
+    '/api/tasks?completed=false',
+    '/api/tasks?completed=true',
+    '/api/tasks?overdue=true',
+    '/api/tasks/agenda?days=30',
+    '/api/tasks/reminders?wait=0',
+    '/api/notes',
+    '/api/notes?tag=work',
+    '/api/notes?tag=work&tag=ideas&match=any',
+    '/api/tags',
+    '/api/daily-recap',
+    '/api/logs/today',
+    '/api/logs?fields=accomplishments&from=2024-01-01&to=2024-12-31',
+    '/api/logs/rollups?period=month',
+    '/api/habits/1/history',
+    '/api/sync?since=4000',
+]
+
+# Tables that grow with usage; habits stay small enough to scan
+LARGE_TABLES = ('task', 'note', 'daily_log', 'habit_completion', 'sync_change')
+FULL_SCAN = re.compile(r'^SCAN (%s)\b(?! USING)' % '|'.join(LARGE_TABLES))
+
+
+def capture_selects(path, client):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    db.event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(path)
+    finally:
+        db.event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+    assert response.status_code == 200, f'{path} returned {response.status_code}'
+    return statements
+
+
+def query_plan(statement, parameters):
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+    return [row[-1] for row in rows]
+
+
+def main():
+    generator = rng()
+    with app.app_context():
+        reset_database()
+        run_migrations(db.engine, db.metadata, log=lambda message: None)
+        insert_rows(Task, task_rows(generator, 5000))
+        insert_rows(Note, note_rows(generator, 1000))
+        insert_rows(Habit, habit_rows(generator, 10))
+        backfill_habit_completions(db.session.connection())
+        seed_sync_changes(db.session.connection())
+        # Fresh statistics, as a long-lived database would have
+        db.session.execute(db.text('ANALYZE'))
+        db.session.commit()
+
+    client = app.test_client()
+    failures = 0
+    for path in HOT_ROUTES:
+        with app.app_context():
+            statements = capture_selects(path, client)
+            for statement, parameters in statements:
+                plan = query_plan(statement, parameters)
+                bad = [step for step in plan if FULL_SCAN.match(step)]
+                status = 'FAIL' if bad else 'ok'
+                failures += bool(bad)
+                print(f"[{status:>4}] {path:<28} {' | '.join(plan)}")
+    if failures:
+        print(f'{failures} statement(s) scan a large table without an index')
+        sys.exit(1)
+    print('All hot-route queries use an index')
+
+
+if __name__ == '__main__':
+    main()
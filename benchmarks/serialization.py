@@ -0,0 +1,77 @@
+# benchmarks/serialization.py - rows to JSON: ORM objects and json.dumps vs compiled schemas and orjson
+#
+#   python -m benchmarks.serialization [tasks]     (default: 100000)
+#
+# Each variant turns every task into its export record and JSON text, batch by batch:
+#   orm + stdlib       Task objects, a hand-written dict per row, json.dumps per record (the old path)
+#   columns + stdlib   column-only rows, the compiled schema, one json.dumps per batch
+#   columns + orjson   the same rows and schema, datetimes left to orjson
+# "export" then times the whole /api/export/json body with each provider.
+import json
+import sys
+
+from benchmarks.common import app, db, Task, insert_rows, task_rows, reset_database, timed, rng
+from app import EXPORT_BATCH_SIZE, TASK_EXPORT_SCHEMA, generate_json_export, iter_rows
+from serialization import OrjsonProvider, StdlibJSONProvider, orjson
+
+
+def task_export_dict(task):
+    return {
+        'title': task.title,
+        'description': task.description,
+        'due_date': task.due_date.isoformat() if task.due_date else None,
+        'completed': task.completed,
+        'completed_at': task.completed_at.isoformat() if task.completed_at else None,
+        'created_at': task.created_at.isoformat()
+    }
+
+
+def orm_stdlib():
+    size = 0
+    for task in Task.query.order_by(Task.id).yield_per(EXPORT_BATCH_SIZE):
+        size += len(json.dumps(task_export_dict(task)))
+    return size
+
+
+def columns(provider):
+    def run():
+        app.json = provider
+        size = 0
+        for rows in iter_rows(TASK_EXPORT_SCHEMA.select().order_by(Task.id)):
+            size += len(provider.encode(TASK_EXPORT_SCHEMA.dump(rows)))
+        return size
+    return run
+
+
+def full_export(provider):
+    def run():
+        app.json = provider
+        return sum(len(chunk) for chunk in generate_json_export())
+    return run
+
+
+def main(task_count):
+    providers = {'stdlib': StdlibJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+    original = app.json
+    with app.app_context():
+        reset_database()
+        insert_rows(Task, task_rows(rng(), task_count))
+        db.session.remove()
+
+        print(f"{task_count:,} tasks")
+        print(f"{'variant':<20} {'median ms':>10} {'rows/s':>10} {'MB':>7}")
+        variants = [('orm + stdlib', orm_stdlib)]
+        variants += [(f'columns + {name}', columns(provider)) for name, provider in providers.items()]
+        variants += [(f'export + {name}', full_export(provider)) for name, provider in providers.items()]
+        try:
+            for label, func in variants:
+                size, median_ms = timed(func, repeat=3)
+                print(f"{label:<20} {median_ms:>10.0f} {task_count / median_ms * 1000:>10,.0f} {size / 1e6:>7.1f}")
+        finally:
+            app.json = original
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
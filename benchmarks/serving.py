@@ -0,0 +1,91 @@
+# benchmarks/serving.py - sync vs gthread gunicorn workers: throughput and connections held
+#
+#   python -m benchmarks.serving [--size 20000] [--workers 2] [--threads 8] [--slow 16]
+#
+# For each mode, with the same number of worker processes:
+#   1. requests/sec and p95 for the list-page and CRUD scenarios at --concurrency clients
+#   2. --slow clients stream /api/export/ndjson and read it slowly (a phone on a bad
+#      connection), while a probe client times /health. "held" counts slow clients whose
+#      response started within a second, i.e. connections actually being served at once.
+import argparse
+import http.client
+import threading
+import time
+
+from benchmarks.common import db  # noqa: F401  (sets up the benchmark database)
+from benchmarks.load import GunicornTarget, percentile, prepare_dataset, run_scenario
+
+SLOW_READ_BYTES = 16 * 1024
+SLOW_READ_PAUSE = 0.1
+
+
+def slow_export(port, hold_seconds, started, results):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        connection.request('GET', '/api/export/ndjson')
+        response = connection.getresponse()
+        results.append(time.perf_counter() - started)
+        deadline = time.monotonic() + hold_seconds
+        while time.monotonic() < deadline and response.read(SLOW_READ_BYTES):
+            time.sleep(SLOW_READ_PAUSE)
+    except (http.client.HTTPException, OSError):
+        pass
+    finally:
+        connection.close()
+
+
+def held_connections(target, slow, hold_seconds):
+    first_byte = []
+    started = time.perf_counter()
+    clients = [threading.Thread(target=slow_export, args=(target.port, hold_seconds, started, first_byte))
+               for _ in range(slow)]
+    for client in clients:
+        client.start()
+    time.sleep(0.5)
+
+    probe = target.session()
+    probes = []
+    while any(client.is_alive() for client in clients) and len(probes) < 20:
+        start = time.perf_counter()
+        probe('GET', '/health', None)
+        probes.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.05)
+    for client in clients:
+        client.join()
+
+    probes.sort()
+    held = sum(1 for seconds in first_byte if seconds <= 1.0)
+    return held, percentile(probes, 50), probes[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare sync and gthread gunicorn workers.')
+    parser.add_argument('--size', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--slow', type=int, default=16, help='slow export clients')
+    parser.add_argument('--hold', type=float, default=3.0, help='seconds each slow client stays connected')
+    args = parser.parse_args()
+
+    prepare_dataset(args.size, args.seed)
+    modes = {
+        'sync': {'GUNICORN_MODE': 'sync'},
+        'gthread': {'GUNICORN_MODE': 'gthread', 'GUNICORN_THREADS': str(args.threads)},
+    }
+    print(f"{args.workers} workers, {args.concurrency} clients, {args.slow} slow export clients")
+    print(f"{'mode':<8} {'lists req/s':>11} {'lists p95':>10} {'crud req/s':>10} {'crud p95':>9} "
+          f"{'held':>7} {'probe p50':>10} {'probe max':>10}")
+    for name, env in modes.items():
+        with GunicornTarget(args.workers, env) as target:
+            lists, _ = run_scenario(target, 'lists', args.requests, args.concurrency, args.size, args.seed)
+            crud, _ = run_scenario(target, 'crud', args.requests, args.concurrency, args.size, args.seed)
+            held, probe_p50, probe_max = held_connections(target, args.slow, args.hold)
+        print(f"{name:<8} {lists['rps']:>11} {lists['p95_ms']:>10} {crud['rps']:>10} {crud['p95_ms']:>9} "
+              f"{held:>3}/{args.slow:<3} {probe_p50:>10.1f} {probe_max:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# benchmarks/startup.py - time to first byte after a gunicorn worker restart
+#
+#   python -m benchmarks.startup [--size 10000] [--restarts 5]
+#
+# One worker is restarted with SIGTERM, as max_requests or a deploy would do, and
+# requests are sent straight away. "first /" is the time from the restart to the
+# first byte of the dashboard, which includes booting the new worker; the other
+# columns are the first byte of the first request to each page after that.
+import argparse
+import http.client
+import os
+import signal
+import statistics
+import time
+
+from benchmarks.common import db  # noqa: F401  (sets up the benchmark database)
+from benchmarks.load import GunicornTarget, prepare_dataset
+
+FIRST_HITS = ('/tasks', '/api/tasks', '/notes', '/habits', '/api/habits', '/search?q=plan')
+MODES = {
+    'cold': {'GUNICORN_PRELOAD': 'false', 'WARMUP_ENABLED': 'false'},
+    'preload': {'GUNICORN_PRELOAD': 'true', 'WARMUP_ENABLED': 'false'},
+    'preload + warm-up': {'GUNICORN_PRELOAD': 'true', 'WARMUP_ENABLED': 'true'},
+}
+
+
+def time_to_first_byte(port, path):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        start = time.perf_counter()
+        connection.request('GET', path)
+        response = connection.getresponse()
+        elapsed = (time.perf_counter() - start) * 1000
+        response.read()
+        return elapsed
+    finally:
+        connection.close()
+
+
+def exited(pid):
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] == 'Z'
+    except OSError:
+        return True
+
+
+def restart_worker(target):
+    """SIGTERM the worker and wait for it to stop accepting; returns when the restart began."""
+    worker = target.pids()[1]
+    started = time.perf_counter()
+    os.kill(worker, signal.SIGTERM)
+    while not exited(worker):
+        time.sleep(0.001)
+    return started
+
+
+def measure(target, restarts):
+    samples = {path: [] for path in ('first /',) + FIRST_HITS}
+    for _ in range(restarts):
+        started = restart_worker(target)
+        time_to_first_byte(target.port, '/')
+        samples['first /'].append((time.perf_counter() - started) * 1000)
+        for path in FIRST_HITS:
+            samples[path].append(time_to_first_byte(target.port, path))
+    return {path: statistics.median(values) for path, values in samples.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure time to first byte after a worker restart.')
+    parser.add_argument('--size', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--restarts', type=int, default=5)
+    args = parser.parse_args()
+
+    prepare_dataset(args.size, args.seed)
+    results = {}
+    for name, env in MODES.items():
+        # The dataset is already migrated; one worker makes "the worker" unambiguous
+        with GunicornTarget(1, dict(env, MIGRATE_ON_START='false')) as target:
+            results[name] = measure(target, args.restarts)
+
+    columns = ('first /',) + FIRST_HITS
+    print(f"median ms over {args.restarts} restarts, {args.size} tasks")
+    print(f"{'mode':<18}" + ''.join(f'{column:>16}' for column in columns))
+    for name, result in results.items():
+        print(f'{name:<18}' + ''.join(f'{result[column]:>16.1f}' for column in columns))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# benchmarks/tags.py - tag-filtered note queries and tag counts
+#
+#   python -m benchmarks.tags [sizes...]     (default: 100000 1000000)
+import sys
+
+from werkzeug.datastructures import MultiDict
+
+from benchmarks.common import app, db, Note, insert_rows, note_rows, reset_database, timed, rng
+from app import list_tags, paginate_notes
+from database.migrations import rebuild_note_tags
+
+RARE_TAG = 'rare'
+
+
+def legacy_tag_filter(tag):
+    # The comma-separated string match notes used before note_tag existed
+    normalized = db.literal(',') + db.func.replace(db.func.replace(Note.tags, ', ', ','), ' ,', ',', type_=db.String) + ','
+    return (Note.query.filter(normalized.contains(f',{tag},', autoescape=True))
+            .order_by(Note.updated_at.desc(), Note.id.desc()).limit(51).all())
+
+
+def tag_page(*tags, match='all'):
+    return lambda: paginate_notes(MultiDict([('tag', tag) for tag in tags] + [('match', match)]))
+
+
+def tag_counts():
+    with app.test_request_context('/api/tags'):
+        return list_tags.__wrapped__()
+
+
+def main(sizes):
+    generator = rng()
+    with app.app_context():
+        reset_database()
+        print(f"{'notes':>10}  {'query':<28} {'median ms':>10}")
+        loaded = 0
+        for size in sorted(sizes):
+            insert_rows(Note, note_rows(generator, size - loaded))
+            # A handful of notes with a tag nothing else uses
+            insert_rows(Note, ({**row, 'tags': RARE_TAG} for row in note_rows(generator, 20)))
+            loaded = size
+            with db.engine.begin() as conn:
+                rebuild_note_tags(conn)
+
+            cases = [
+                ('legacy tag=plan', lambda: legacy_tag_filter('plan')),
+                (f'legacy tag={RARE_TAG}', lambda: legacy_tag_filter(RARE_TAG)),
+                ('tag=plan', tag_page('plan')),
+                (f'tag={RARE_TAG}', tag_page(RARE_TAG)),
+                ('tag=plan&tag=ship', tag_page('plan', 'ship')),
+                ('tag=plan&tag=ship (any)', tag_page('plan', 'ship', match='any')),
+                ('tag counts', tag_counts),
+            ]
+            for label, func in cases:
+                _, median_ms = timed(func)
+                print(f"{size:>10,}  {label:<28} {median_ms:>10.1f}")
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or [100000, 1000000])
@@ -0,0 +1,108 @@
+# benchmarks/tenancy.py - write throughput as concurrent users grow: one database vs one per user
+#
+#   python -m benchmarks.tenancy [--users 1 2 4 8] [--seconds 5] [--workers 2] [--synchronous FULL]
+#
+# Every simulated user sends its own X-Remote-User and writes in a loop: create a
+# task, complete it, add a note. With a single database every write request holds
+# the one SQLite write lock from BEGIN IMMEDIATE to COMMIT, so users queue behind
+# each other (and SQLite's busy handler sleeps while they wait). With
+# TENANCY_ENABLED each user writes to their own file and only waits for CPU.
+# --synchronous FULL adds an fsync to every commit, made while the lock is held.
+import argparse
+import http.client
+import json
+import os
+import statistics
+import threading
+import time
+
+from benchmarks.common import BENCH_DIR
+from benchmarks.load import GunicornTarget
+
+MODES = {
+    'single database': {'TENANCY_ENABLED': 'false'},
+    'per-user databases': {'TENANCY_ENABLED': 'true', 'TENANT_DB_DIR': os.path.join(BENCH_DIR, 'tenants')},
+}
+
+
+def user_session(port, user):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    headers = {'Content-Type': 'application/json', 'X-Remote-User': user}
+
+    def send(method, path, body=None):
+        connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = connection.getresponse()
+        return response.status, response.read()
+    return send
+
+
+def run_user(port, user, stop, results):
+    send = user_session(port, user)
+    latencies, failures = [], 0
+
+    def write(method, path, body):
+        nonlocal failures
+        start = time.perf_counter()
+        status, data = send(method, path, body)
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            failures += 1
+            return None
+        return json.loads(data)
+
+    i = 0
+    while not stop.is_set():
+        i += 1
+        created = write('POST', '/api/tasks', {'title': f'{user} task {i}', 'description': 'load'})
+        if created:
+            write('PUT', f"/api/tasks/{created['id']}", {'completed': True})
+        write('POST', '/api/notes', {'content': f'{user} note {i}', 'tags': 'load'})
+    results[user] = (latencies, failures)
+
+
+def measure(port, users, seconds):
+    names = [f'user{n}' for n in range(users)]
+    # First requests create and migrate each user's database; keep that out of the timing
+    for name in names:
+        user_session(port, name)('GET', '/api/tasks?limit=1')
+    stop = threading.Event()
+    results = {}
+    threads = [threading.Thread(target=run_user, args=(port, name, stop, results)) for name in names]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for values, _ in results.values() for latency in values)
+    failures = sum(failed for _, failed in results.values())
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+    return (len(latencies) - failures) / elapsed, statistics.median(latencies) * 1000, p95, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare write throughput with one database and one per user.')
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--synchronous', default='NORMAL', choices=('NORMAL', 'FULL'))
+    args = parser.parse_args()
+
+    results = {}
+    for name, env in MODES.items():
+        env = dict(env, JOBS_ENABLED='false', CACHE_BACKEND='none', SQLITE_SYNCHRONOUS=args.synchronous)
+        with GunicornTarget(args.workers, env) as target:
+            for users in args.users:
+                results[name, users] = measure(target.port, users, args.seconds)
+
+    print(f"{args.workers} gunicorn workers, {args.seconds:.0f} s per run, writes only, "
+          f"synchronous={args.synchronous}")
+    print(f"{'mode':<20} {'users':>5} {'writes/s':>9} {'p50 ms':>7} {'p95 ms':>7} {'failed':>7}")
+    for (name, users), (throughput, p50, p95, failures) in results.items():
+        print(f'{name:<20} {users:>5} {throughput:>9.0f} {p50:>7.1f} {p95:>7.1f} {failures:>7}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+# cache.py - Response cache for read-heavy views, invalidated by writes
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from flask import Response, make_response, request
+
+
+class MemoryBackend:
+    """In-process LRU with TTL. Only coherent within a single process."""
+
+    def __init__(self, max_entries=256, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def generations(self, tables):
+        with self._lock:
+            return [self._generations.get(table, 0) for table in tables]
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for table in self._generations:
+                self._generations[table] += 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteBackend:
+    """Cache stored in a local SQLite file, shared by every worker on the host."""
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path, ttl=60):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._sets = 0
+        # A forked worker must not reuse connections opened by the parent (gunicorn preload_app)
+        os.register_at_fork(after_in_child=self._forget_connections)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_generations ("
+                         "name TEXT PRIMARY KEY, generation INTEGER NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entries ("
+                         "key TEXT PRIMARY KEY, expires REAL NOT NULL, "
+                         "etag TEXT NOT NULL, mimetype TEXT NOT NULL, body BLOB NOT NULL)")
+
+    def _forget_connections(self):
+        self._local = threading.local()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def generations(self, tables):
+        placeholders = ', '.join('?' for _ in tables)
+        rows = dict(self._connect().execute(
+            f"SELECT name, generation FROM cache_generations WHERE name IN ({placeholders})",
+            list(tables),
+        ).fetchall())
+        return [rows.get(table, 0) for table in tables]
+
+    def bump(self, tables):
+        self._connect().executemany(
+            "INSERT INTO cache_generations (name, generation) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET generation = generation + 1",
+            [(table,) for table in tables],
+        )
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM cache_entries")
+        conn.execute("UPDATE cache_generations SET generation = generation + 1")
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT etag, mimetype, body FROM cache_entries WHERE key = ? AND expires >= ?",
+            (key, time.time()),
+        ).fetchone()
+        return (row[0], row[1], bytes(row[2])) if row else None
+
+    def set(self, key, value):
+        etag, mimetype, body = value
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, expires, etag, mimetype, body) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (key, time.time() + self.ttl, etag, mimetype, body),
+        )
+        self._sets += 1
+        if self._sets % self.PURGE_EVERY == 0:
+            conn.execute("DELETE FROM cache_entries WHERE expires < ?", (time.time(),))
+
+
+def _etag_matches(etag):
+    """Compare against If-None-Match, ignoring the ':br'-style suffix compression.py appends."""
+    header = request.if_none_match
+    if not header:
+        return None
+    if header.star_tag:
+        return etag
+    for tag in header.as_set():
+        if tag == etag or tag.rsplit(':', 1)[0] == etag:
+            return tag
+    return None
+
+
+class ResponseCache:
+    """Caches whole responses keyed by the generation of the tables they read.
+
+    Committing a change to a table bumps its generation, so entries built from
+    older data are never served again and simply age out. ETags are a hash of
+    the body, letting a matching If-None-Match be answered from the cache alone.
+    `namespace` optionally returns a prefix (the current user) that keeps both
+    entries and generations apart for each database.
+    """
+
+    def __init__(self, app=None, namespace=None):
+        self.backend = None
+        self.namespace = namespace
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        kind = app.config.get('CACHE_BACKEND', 'memory')
+        ttl = app.config.get('CACHE_TTL', 60)
+        if kind == 'memory':
+            self.backend = MemoryBackend(app.config.get('CACHE_MAX_ENTRIES', 256), ttl)
+        elif kind == 'sqlite':
+            path = app.config.get('CACHE_PATH') or os.path.join(app.instance_path, 'response_cache.db')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.backend = SQLiteBackend(path, ttl)
+        elif kind in ('none', '', None):
+            self.backend = None
+        else:
+            raise ValueError(f'Unknown CACHE_BACKEND: {kind}')
+
+    def _prefix(self):
+        return (self.namespace() or '') if self.namespace is not None else ''
+
+    def _scoped(self, prefix, tables):
+        return [f'{prefix}:{table}' for table in tables] if prefix else list(tables)
+
+    def invalidate(self, tables=None):
+        if self.backend is None:
+            return
+        if tables is None:
+            self.backend.clear()
+        elif tables:
+            self.backend.bump(self._scoped(self._prefix(), sorted(tables)))
+
+    def cached(self, *tables, period=None):
+        """Cache a GET view that only reads from the given tables.
+
+        Entries are kept apart per day. Views that also depend on the time of
+        day (overdue vs due today) pass `period` in seconds to start a new
+        entry at every multiple of it.
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                backend = self.backend
+                if backend is None:
+                    return view(*args, **kwargs)
+
+                # Read generations before the view so a concurrent write can
+                # only leave its result under a key that is already stale
+                prefix = self._prefix()
+                generations = backend.generations(self._scoped(prefix, tables))
+                when = date.today().isoformat()
+                if period:
+                    when += '|%d' % (time.time() // period)
+                key = '%s|%s|%s|%s' % (
+                    prefix, request.full_path, when,
+                    ','.join(str(g) for g in generations),
+                )
+                entry = backend.get(key)
+                if entry is None:
+                    response = make_response(view(*args, **kwargs))
+                    if response.status_code != 200 or response.is_streamed:
+                        return response
+                    body = response.get_data()
+                    entry = (hashlib.sha1(body).hexdigest(), response.mimetype, body)
+                    backend.set(key, entry)
+                else:
+                    response = None
+
+                etag, mimetype, body = entry
+                matched = _etag_matches(etag)
+                if matched:
+                    response = Response(status=304)
+                    response.set_etag(matched)
+                else:
+                    if response is None:
+                        response = Response(body, mimetype=mimetype)
+                    response.set_etag(etag)
+                response.headers['Cache-Control'] = 'no-cache'
+                return response
+            return wrapper
+        return decorator
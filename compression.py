@@ -0,0 +1,170 @@
+# compression.py - Response compression: size threshold, br/zstd/gzip negotiation, ETag-keyed cache
+import gzip
+import shutil
+import threading
+from collections import OrderedDict
+
+import brotli
+import zstandard
+from flask import request
+
+# Bodies of other types are already compressed (images) or streamed (exports)
+COMPRESSIBLE_MIMETYPES = frozenset((
+    'text/html', 'text/css', 'text/javascript', 'application/javascript', 'application/json',
+))
+
+
+def _gzip(data, level):
+    # mtime=0 keeps the output of identical bodies identical
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _brotli(data, level):
+    return brotli.compress(data, quality=level)
+
+
+_zstd_local = threading.local()
+
+
+def _zstd(data, level):
+    # A compressor holds a sizeable context; reuse one per thread and level
+    compressors = getattr(_zstd_local, 'compressors', None)
+    if compressors is None:
+        compressors = _zstd_local.compressors = {}
+    compressor = compressors.get(level)
+    if compressor is None:
+        compressor = compressors[level] = zstandard.ZstdCompressor(level=level)
+    return compressor.compress(data)
+
+
+# Content-Encoding -> (compress(data, level), config key for its level, default level)
+CODECS = {
+    'zstd': (_zstd, 'COMPRESS_ZSTD_LEVEL', 3),
+    'br': (_brotli, 'COMPRESS_BR_LEVEL', 4),
+    'gzip': (_gzip, 'COMPRESS_GZIP_LEVEL', 6),
+}
+
+
+def compress_file(path, level=6):
+    """Write a gzip copy of `path` next to it, in chunks, and return its path."""
+    target = path + '.gz'
+    with open(path, 'rb') as source, gzip.open(target, 'wb', compresslevel=level) as out:
+        shutil.copyfileobj(source, out, 1024 * 1024)
+    return target
+
+
+class CompressedBodyCache:
+    """Compressed bodies keyed by (ETag, encoding), evicted least recently used first.
+
+    A strong ETag names exactly one body, so an entry never goes stale: a new
+    body comes with a new ETag and the old entry is simply evicted.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        # Anything over a quarter of the budget would flush most of the cache
+        if len(body) > self.max_bytes // 4:
+            return
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class ResponseCompression:
+    """Compresses text responses large enough to be worth it, in the encoding the client prefers.
+
+    Bodies under COMPRESS_MIN_SIZE go out as they are: compressing a health
+    check or a one-line JSON reply costs more CPU than the bytes it saves.
+    Responses with a strong ETag (the cached views) are compressed once per
+    encoding and reused. With COMPRESS_DEFER_TO_PROXY nothing is compressed
+    here and a reverse proxy in front (nginx's gzip) does it instead.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = (app.config.get('COMPRESS_ENABLED', True)
+                        and not app.config.get('COMPRESS_DEFER_TO_PROXY', False))
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', 1024)
+        algorithms = app.config.get('COMPRESS_ALGORITHMS', 'zstd,br,gzip')
+        if isinstance(algorithms, str):
+            algorithms = [name.strip() for name in algorithms.split(',') if name.strip()]
+        unknown = set(algorithms) - set(CODECS)
+        if unknown:
+            raise ValueError(f"Unknown COMPRESS_ALGORITHMS: {', '.join(sorted(unknown))}")
+        # Server preference order, which breaks ties between equal client q-values
+        self.algorithms = list(algorithms)
+        self.levels = {name: app.config.get(key, default) for name, (_, key, default) in CODECS.items()}
+        cache_bytes = app.config.get('COMPRESS_CACHE_MAX_BYTES', 16 * 1024 * 1024)
+        self.cache = CompressedBodyCache(cache_bytes) if cache_bytes > 0 else None
+        app.after_request(self.after_request)
+
+    def negotiate(self, accept_encodings):
+        best, best_quality = None, 0
+        for name in self.algorithms:
+            quality = accept_encodings.quality(name)
+            if quality > best_quality:
+                best, best_quality = name, quality
+        return best
+
+    def compress(self, encoding, data):
+        return CODECS[encoding][0](data, self.levels[encoding])
+
+    def after_request(self, response):
+        if (not self.enabled
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or not 200 <= response.status_code < 300
+                # Compressing a stream would buffer it whole; exports are
+                # precompressed by their job instead
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+        length = response.content_length
+        if length is None:
+            length = len(response.get_data())
+        if length < self.min_size:
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        key = (etag, encoding) if etag and not weak and self.cache is not None else None
+        body = self.cache.get(key) if key else None
+        if body is None:
+            body = self.compress(encoding, response.get_data())
+            if key:
+                self.cache.set(key, body)
+        if len(body) >= length:
+            return response
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # The encoded body is a different representation; cache.py strips the suffix again
+            response.set_etag(f'{etag}:{encoding}', weak)
+        return response
@@ -0,0 +1 @@
+# Database helpers for Second Brain: engine tuning, schema and migrations
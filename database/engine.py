@@ -0,0 +1,156 @@
+# database/engine.py - engine options, connection pools and per-connection SQLite tuning
+import os
+import sqlite3
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+
+# Advisory lock key for PostgreSQL writers (see lock_writes); any constant shared by all processes
+POSTGRES_WRITE_LOCK = 0x5EC0B2A1
+
+
+def database_url(url):
+    """Make the driver explicit: postgres:// and postgresql:// URLs use psycopg 3."""
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    if url.startswith('postgresql://'):
+        url = 'postgresql+psycopg://' + url[len('postgresql://'):]
+    return url
+
+
+def sqlite_pragmas(config):
+    # Applied to every new connection; all values can be overridden in Config
+    return {
+        # Readers no longer block the writer (and vice versa)
+        'journal_mode': config.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        # Safe with WAL: only a power loss can lose the last commits, never corrupt
+        'synchronous': config.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        # Wait for the write lock instead of failing with "database is locked"
+        'busy_timeout': int(config.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        # Negative values are KiB
+        'cache_size': -int(config.get('SQLITE_CACHE_SIZE_KB', 32768)),
+        'mmap_size': int(config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'temp_store': 'MEMORY',
+    }
+
+
+def server_threads():
+    # Threads serving requests in this process; set by gunicorn.conf.py / production.py
+    return max(1, int(os.environ.get('SERVER_THREADS', 1)))
+
+
+def server_workers():
+    # Server processes sharing the database; set by gunicorn.conf.py
+    return max(1, int(os.environ.get('SERVER_WORKERS', 1)))
+
+
+def _setting(config, name, default, convert=int):
+    value = config.get(name)
+    return default if value is None or value == '' else convert(value)
+
+
+def engine_options(database_uri, config=None):
+    config = config or {}
+    options = {}
+    threads = server_threads()
+    if database_uri.startswith('sqlite') and ':memory:' not in database_uri and database_uri != 'sqlite://':
+        # One connection per request thread, a little headroom for helpers that
+        # open their own connection (search, exports), and never more: SQLite has
+        # a single writer, so extra connections only add lock contention.
+        options.update({
+            'pool_size': _setting(config, 'DB_POOL_SIZE', threads),
+            'max_overflow': _setting(config, 'DB_MAX_OVERFLOW', threads),
+            'pool_timeout': _setting(config, 'DB_POOL_TIMEOUT', 30),
+        })
+    elif database_uri.startswith('postgresql'):
+        # A connection per request thread and job worker, the same again for
+        # helpers and bursts, and all of it within DB_MAX_CONNECTIONS across the
+        # server's processes: past the server's (or pooler's) limit, new
+        # connections fail instead of waiting.
+        jobs = _setting(config, 'JOB_WORKERS', 1) if config.get('JOBS_ENABLED', True) else 0
+        pool_size = _setting(config, 'DB_POOL_SIZE', threads + jobs)
+        max_overflow = _setting(config, 'DB_MAX_OVERFLOW', threads)
+        budget = _setting(config, 'DB_MAX_CONNECTIONS', None)
+        if budget:
+            per_process = max(1, budget // server_workers())
+            pool_size = min(pool_size, per_process)
+            max_overflow = min(max_overflow, per_process - pool_size)
+        connect_args = {
+            'connect_timeout': _setting(config, 'DB_CONNECT_TIMEOUT', 10),
+            'application_name': 'second_brain',
+        }
+        if database_uri.startswith('postgresql+psycopg:') and not config.get('DB_PREPARED_STATEMENTS', True):
+            # Transaction-mode poolers (PgBouncer, Supabase on port 6543) may run each
+            # transaction on another server connection, without psycopg's prepared statements
+            connect_args['prepare_threshold'] = None
+        options.update({
+            'pool_size': pool_size,
+            'max_overflow': max_overflow,
+            'pool_timeout': _setting(config, 'DB_POOL_TIMEOUT', 30),
+            # Test a connection before handing it out: the server, a pooler or a
+            # firewall may have closed it while it sat idle
+            'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+            # Replace connections before typical idle timeouts of poolers and load balancers
+            'pool_recycle': _setting(config, 'DB_POOL_RECYCLE', 1800),
+            # Reuse the most recent connection, so the ones a burst opened go idle and are recycled
+            'pool_use_lifo': True,
+            'connect_args': connect_args,
+        })
+    return options
+
+
+def lock_writes(connection):
+    """On PostgreSQL, wait until no other transaction holds the write lock, then take it until commit.
+
+    SQLite never runs two write transactions at once, and the app relies on
+    it: tag counts and streaks are read, changed and written back, and
+    sync_change rows must commit in seq order for /api/sync cursors. An
+    advisory lock gives PostgreSQL writers the same guarantee; reads are
+    never blocked. A no-op on SQLite.
+    """
+    if connection.dialect.name == 'postgresql':
+        connection.exec_driver_sql(f'SELECT pg_advisory_xact_lock({POSTGRES_WRITE_LOCK})')
+
+
+def install_write_lock(write_intent):
+    """Take lock_writes() when a PostgreSQL transaction starts and write_intent() is True.
+
+    The PostgreSQL counterpart of BEGIN IMMEDIATE in install_sqlite_tuning.
+    """
+    @event.listens_for(Engine, 'begin')
+    def _begin_postgres_transaction(conn):
+        if conn.dialect.name == 'postgresql' and write_intent():
+            lock_writes(conn)
+
+
+def install_sqlite_tuning(config, write_intent=None):
+    """Register connection hooks for SQLite engines.
+
+    ``write_intent`` is an optional callable; when it returns True the
+    transaction starts with BEGIN IMMEDIATE so it takes the write lock up
+    front instead of failing to upgrade a read lock later.
+    """
+    pragmas = sqlite_pragmas(config) if config.get('SQLITE_TUNING', True) else {}
+
+    @event.listens_for(Engine, 'connect')
+    def _configure_sqlite_connection(dbapi_connection, connection_record):
+        if not isinstance(dbapi_connection, sqlite3.Connection):
+            return
+        # pysqlite defers BEGIN until the first write, which breaks SAVEPOINT.
+        # Let SQLAlchemy emit BEGIN itself (see _begin_sqlite_transaction).
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+    @event.listens_for(Engine, 'begin')
+    def _begin_sqlite_transaction(conn):
+        if conn.dialect.name != 'sqlite':
+            return
+        if pragmas and write_intent is not None and write_intent():
+            conn.exec_driver_sql('BEGIN IMMEDIATE')
+        else:
+            conn.exec_driver_sql('BEGIN')
@@ -1,17 +1,15 @@
-import sqlite3
 import os
+import sys
+
+# Allow running as `python database/init_db.py` from the project root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, prepare_database
 
 def init_database():
-    conn = sqlite3.connect('second_brain.db')
-    cursor = conn.cursor()
-    
-    with open('database/schema.sql', 'r') as f:
-        schema = f.read()
-    
-    cursor.executescript(schema)
-    conn.commit()
-    conn.close()
+    with app.app_context():
+        prepare_database()
     print("Database initialized successfully!")
 
 if __name__ == '__main__':
-    init_database()
\ No newline at end of file
+    init_database()
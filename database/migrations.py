@@ -0,0 +1,277 @@
+# database/migrations.py - versioned schema migrations for existing databases
+#
+# New databases get the full schema from the models via create_all() and are
+# recorded as up to date; each migration brings an older database up to the
+# same state and is recorded in the schema_migrations table so it only runs
+# once. Older databases are all SQLite, so the DDL below is SQLite's; a
+# PostgreSQL database always starts from the models.
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import inspect, text
+
+from database.engine import lock_writes
+
+def add_column_if_missing(table, column, ddl):
+    def add_column(conn):
+        if column not in {c['name'] for c in inspect(conn).get_columns(table)}:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+    return add_column
+
+
+def rebuild_daily_stats(conn):
+    """Recompute daily_stats from the source tables."""
+    conn.execute(text('DELETE FROM daily_stats'))
+    conn.execute(text(
+        'INSERT INTO daily_stats (date, tasks_created, tasks_completed, notes_created, habits_completed) '
+        'SELECT day, SUM(tasks_created), SUM(tasks_completed), SUM(notes_created), SUM(habits_completed) '
+        'FROM ('
+        '  SELECT date(created_at) AS day, 1 AS tasks_created, 0 AS tasks_completed, '
+        '         0 AS notes_created, 0 AS habits_completed FROM task WHERE created_at IS NOT NULL'
+        '  UNION ALL SELECT date(completed_at), 0, 1, 0, 0 FROM task '
+        '         WHERE completed AND completed_at IS NOT NULL'
+        '  UNION ALL SELECT date(created_at), 0, 0, 1, 0 FROM note WHERE created_at IS NOT NULL'
+        '  UNION ALL SELECT date, 0, 0, 0, 1 FROM habit_completion'
+        ') AS events GROUP BY day'
+    ))
+
+
+def streak_dates(last_completed, streak_count):
+    """The completion dates a streak implies: streak_count days ending on last_completed."""
+    if not last_completed or not streak_count:
+        return []
+    last_completed = date.fromisoformat(str(last_completed))
+    return [last_completed - timedelta(days=offset) for offset in range(streak_count)]
+
+
+def longest_run(days):
+    """Length of the longest run of consecutive dates."""
+    longest = current = 0
+    previous = None
+    for day in sorted(set(days)):
+        current = current + 1 if previous and (day - previous).days == 1 else 1
+        longest = max(longest, current)
+        previous = day
+    return longest
+
+
+def backfill_habit_completions(conn):
+    """Record the completions implied by each habit's current streak.
+
+    Habits kept only streak_count and last_completed before habit_completion
+    existed, so completions outside the current streak cannot be recovered.
+    """
+    rows = [
+        {'habit_id': habit_id, 'date': day.isoformat()}
+        for habit_id, last_completed, streak_count in conn.execute(text(
+            'SELECT id, last_completed, streak_count FROM habit WHERE last_completed IS NOT NULL'
+        ))
+        for day in streak_dates(last_completed, streak_count or 1)
+    ]
+    if rows:
+        conn.execute(text(
+            'INSERT INTO habit_completion (habit_id, date) VALUES (:habit_id, :date) ON CONFLICT DO NOTHING'
+        ), rows)
+    conn.execute(text(
+        'UPDATE habit SET longest_streak = streak_count WHERE streak_count > longest_streak'
+    ))
+
+
+# /api/sync record type -> table
+SYNC_TABLES = {'task': 'task', 'note': 'note', 'habit': 'habit', 'log': 'daily_log'}
+
+
+def record_sync_rows(conn, kind, after_id=0):
+    """Move every `kind` row with id > after_id to the end of the sync change log."""
+    table = SYNC_TABLES[kind]
+    params = {'kind': kind, 'after_id': after_id, 'deleted': False}
+    lock_writes(conn)
+    conn.execute(text(
+        f'DELETE FROM sync_change WHERE kind = :kind AND object_id IN (SELECT id FROM {table} WHERE id > :after_id)'
+    ), params)
+    conn.execute(text(
+        'INSERT INTO sync_change (kind, object_id, deleted) '
+        f'SELECT :kind, id, :deleted FROM {table} WHERE id > :after_id ORDER BY id'
+    ), params)
+
+
+def seed_sync_changes(conn):
+    """Record every existing row, so a first sync returns them all."""
+    for kind in SYNC_TABLES:
+        record_sync_rows(conn, kind)
+
+
+def split_tags(value):
+    """Normalized tag names from a comma-separated Note.tags string."""
+    names = []
+    for part in (value or '').split(','):
+        name = part.strip().lstrip('#').strip().lower()[:100]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def rebuild_note_tags(conn, batch_size=5000):
+    """Rebuild the note_tag association from every note's tags string."""
+    conn.execute(text('DELETE FROM note_tag'))
+    tag_ids = dict(conn.execute(text('SELECT name, id FROM tag')).all())
+    insert_tag = text('INSERT INTO tag (name) VALUES (:name) RETURNING id')
+    insert_links = text('INSERT INTO note_tag (tag_id, note_id) VALUES (:tag_id, :note_id)')
+
+    links = []
+    last_id = 0
+    while True:
+        notes = conn.execute(text(
+            "SELECT id, tags FROM note WHERE id > :last_id AND tags IS NOT NULL AND tags != '' "
+            'ORDER BY id LIMIT :limit'
+        ), {'last_id': last_id, 'limit': batch_size}).all()
+        if not notes:
+            break
+        for note_id, tags in notes:
+            for name in split_tags(tags):
+                if name not in tag_ids:
+                    tag_ids[name] = conn.execute(insert_tag, {'name': name}).scalar_one()
+                links.append({'tag_id': tag_ids[name], 'note_id': note_id})
+        if links:
+            conn.execute(insert_links, links)
+        links = []
+        last_id = notes[-1][0]
+    conn.execute(text('UPDATE tag SET note_count = (SELECT COUNT(*) FROM note_tag WHERE tag_id = tag.id)'))
+    conn.execute(text('DELETE FROM tag WHERE note_count = 0'))
+
+
+# (version, description, statements); statements are SQL strings or callables
+# taking the connection, applied in order inside one transaction per version
+MIGRATIONS = [
+    (1, 'Indexes for hot query predicates', [
+        'CREATE INDEX IF NOT EXISTS ix_task_completed_due_date ON task (completed, due_date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_task_completed_updated_at ON task (completed, updated_at)',
+        'CREATE INDEX IF NOT EXISTS ix_task_due_date_id ON task (due_date, id)',
+        'CREATE INDEX IF NOT EXISTS ix_note_updated_at_id ON note (updated_at, id)',
+        'CREATE INDEX IF NOT EXISTS ix_note_created_at ON note (created_at)',
+    ]),
+    (2, 'Materialized daily stats and task completion time', [
+        add_column_if_missing('task', 'completed_at', 'DATETIME'),
+        'CREATE INDEX IF NOT EXISTS ix_task_completed_at ON task (completed_at)',
+        # Best available completion time for tasks completed before this column existed
+        'UPDATE task SET completed_at = updated_at WHERE completed AND completed_at IS NULL',
+        'CREATE TABLE IF NOT EXISTS daily_stats ('
+        'date DATE NOT NULL PRIMARY KEY, '
+        "tasks_created INTEGER DEFAULT '0' NOT NULL, "
+        "tasks_completed INTEGER DEFAULT '0' NOT NULL, "
+        "notes_created INTEGER DEFAULT '0' NOT NULL, "
+        "habits_completed INTEGER DEFAULT '0' NOT NULL)",
+        rebuild_daily_stats,
+    ]),
+    (3, 'Normalized note tags', [
+        'CREATE TABLE IF NOT EXISTS tag ('
+        'id INTEGER NOT NULL PRIMARY KEY, '
+        'name VARCHAR(100) NOT NULL, '
+        "note_count INTEGER DEFAULT '0' NOT NULL)",
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_tag_name ON tag (name)',
+        'CREATE TABLE IF NOT EXISTS note_tag ('
+        'tag_id INTEGER NOT NULL REFERENCES tag (id) ON DELETE CASCADE, '
+        'note_id INTEGER NOT NULL REFERENCES note (id) ON DELETE CASCADE, '
+        'PRIMARY KEY (tag_id, note_id))',
+        'CREATE INDEX IF NOT EXISTS ix_note_tag_note_id ON note_tag (note_id)',
+        rebuild_note_tags,
+    ]),
+    (4, 'Background jobs and stored daily recaps', [
+        'CREATE TABLE IF NOT EXISTS job ('
+        'id VARCHAR(32) NOT NULL PRIMARY KEY, '
+        'kind VARCHAR(50) NOT NULL, '
+        'params TEXT, '
+        'status VARCHAR(20) NOT NULL, '
+        'dedupe_key VARCHAR(100), '
+        'run_at DATETIME NOT NULL, '
+        "attempts INTEGER DEFAULT '0' NOT NULL, "
+        'result TEXT, '
+        'error TEXT, '
+        'created_at DATETIME, '
+        'started_at DATETIME, '
+        'finished_at DATETIME, '
+        'UNIQUE (dedupe_key))',
+        'CREATE INDEX IF NOT EXISTS ix_job_status_run_at ON job (status, run_at)',
+        'CREATE TABLE IF NOT EXISTS daily_recap ('
+        'date DATE NOT NULL PRIMARY KEY, '
+        'recap TEXT NOT NULL, '
+        'created_at DATETIME)',
+    ]),
+    (5, 'Habit completion history', [
+        'CREATE TABLE IF NOT EXISTS habit_completion ('
+        'habit_id INTEGER NOT NULL REFERENCES habit (id) ON DELETE CASCADE, '
+        'date DATE NOT NULL, '
+        'PRIMARY KEY (habit_id, date))',
+        add_column_if_missing('habit', 'longest_streak', "INTEGER DEFAULT '0' NOT NULL"),
+        backfill_habit_completions,
+        # habits_completed now counts every recorded completion, not just the last
+        rebuild_daily_stats,
+    ]),
+    (6, 'Change log for delta sync', [
+        'CREATE TABLE IF NOT EXISTS sync_change ('
+        'seq INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, '
+        'kind VARCHAR(10) NOT NULL, '
+        'object_id INTEGER NOT NULL, '
+        'deleted BOOLEAN NOT NULL)',
+        'CREATE UNIQUE INDEX IF NOT EXISTS ix_sync_change_kind_object_id ON sync_change (kind, object_id)',
+        seed_sync_changes,
+    ]),
+    (7, 'Job owner for per-user databases', [
+        add_column_if_missing('job', 'tenant', 'VARCHAR(64)'),
+    ]),
+]
+
+
+def _ensure_migrations_table(conn):
+    conn.execute(text(
+        'CREATE TABLE IF NOT EXISTS schema_migrations ('
+        'version INTEGER PRIMARY KEY, '
+        'description VARCHAR(200) NOT NULL, '
+        'applied_at TIMESTAMP NOT NULL)'
+    ))
+
+
+def applied_versions(engine):
+    with engine.begin() as conn:
+        _ensure_migrations_table(conn)
+        return {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+
+
+def pending_migrations(engine):
+    applied = applied_versions(engine)
+    return [migration for migration in MIGRATIONS if migration[0] not in applied]
+
+
+def _record_migration(conn, version, description):
+    conn.execute(
+        text('INSERT INTO schema_migrations (version, description, applied_at) '
+             'VALUES (:version, :description, :applied_at)'),
+        {'version': version, 'description': description, 'applied_at': datetime.utcnow()}
+    )
+
+
+def run_migrations(engine, metadata=None, log=print):
+    """Create missing tables, then apply every pending migration in order."""
+    if metadata is not None:
+        fresh = not inspect(engine).get_table_names()
+        metadata.create_all(engine)
+        if fresh:
+            # Built from the current models: nothing to upgrade
+            with engine.begin() as conn:
+                _ensure_migrations_table(conn)
+                for version, description, _ in MIGRATIONS:
+                    _record_migration(conn, version, description)
+            log(f'Created the schema at migration {MIGRATIONS[-1][0]}')
+            return []
+
+    applied = []
+    for version, description, statements in pending_migrations(engine):
+        with engine.begin() as conn:
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            _record_migration(conn, version, description)
+        log(f'Applied migration {version}: {description}')
+        applied.append(version)
+    return applied
@@ -1,37 +1,119 @@
 -- Core tables for Second Brain
-CREATE TABLE IF NOT EXISTS tasks (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    title TEXT NOT NULL,
-    description TEXT,
-    due_date DATETIME,
-    completed BOOLEAN DEFAULT FALSE,
-    reminder_sent BOOLEAN DEFAULT FALSE,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE TABLE IF NOT EXISTS notes (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    content TEXT NOT NULL,
-    tags TEXT,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE TABLE IF NOT EXISTS daily_logs (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    date DATE UNIQUE NOT NULL,
-    accomplishments TEXT,
-    missed_items TEXT,
-    tomorrow_plan TEXT,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-);
-
-CREATE TABLE IF NOT EXISTS habits (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    description TEXT,
-    streak_count INTEGER DEFAULT 0,
-    last_completed DATE,
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-);
\ No newline at end of file
+-- Mirrors the models in app.py; new databases are created from the models
+-- and existing ones upgraded with `flask --app app upgrade-db` (database/migrations.py).
+
+CREATE TABLE IF NOT EXISTS daily_log (
+	id INTEGER NOT NULL,
+	date DATE NOT NULL,
+	accomplishments TEXT,
+	missed_items TEXT,
+	tomorrow_plan TEXT,
+	created_at DATETIME,
+	PRIMARY KEY (id),
+	UNIQUE (date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_recap (
+	date DATE NOT NULL,
+	recap TEXT NOT NULL,
+	created_at DATETIME,
+	PRIMARY KEY (date)
+);
+
+CREATE TABLE IF NOT EXISTS daily_stats (
+	date DATE NOT NULL,
+	tasks_created INTEGER DEFAULT '0' NOT NULL,
+	tasks_completed INTEGER DEFAULT '0' NOT NULL,
+	notes_created INTEGER DEFAULT '0' NOT NULL,
+	habits_completed INTEGER DEFAULT '0' NOT NULL,
+	PRIMARY KEY (date)
+);
+
+CREATE TABLE IF NOT EXISTS habit (
+	id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	description TEXT,
+	streak_count INTEGER,
+	longest_streak INTEGER DEFAULT '0' NOT NULL,
+	last_completed DATE,
+	created_at DATETIME,
+	PRIMARY KEY (id)
+);
+
+CREATE TABLE IF NOT EXISTS job (
+	id VARCHAR(32) NOT NULL,
+	kind VARCHAR(50) NOT NULL,
+	params TEXT,
+	status VARCHAR(20) NOT NULL,
+	dedupe_key VARCHAR(100),
+	run_at DATETIME NOT NULL,
+	attempts INTEGER DEFAULT '0' NOT NULL,
+	result TEXT,
+	error TEXT,
+	created_at DATETIME,
+	started_at DATETIME,
+	finished_at DATETIME,
+	tenant VARCHAR(64),
+	PRIMARY KEY (id),
+	UNIQUE (dedupe_key)
+);
+CREATE INDEX IF NOT EXISTS ix_job_status_run_at ON job (status, run_at);
+
+CREATE TABLE IF NOT EXISTS note (
+	id INTEGER NOT NULL,
+	content TEXT NOT NULL,
+	tags VARCHAR(500),
+	created_at DATETIME,
+	updated_at DATETIME,
+	PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS ix_note_created_at ON note (created_at);
+CREATE INDEX IF NOT EXISTS ix_note_updated_at_id ON note (updated_at, id);
+
+CREATE TABLE IF NOT EXISTS sync_change (
+	seq INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+	kind VARCHAR(10) NOT NULL,
+	object_id INTEGER NOT NULL,
+	deleted BOOLEAN NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_sync_change_kind_object_id ON sync_change (kind, object_id);
+
+CREATE TABLE IF NOT EXISTS tag (
+	id INTEGER NOT NULL,
+	name VARCHAR(100) NOT NULL,
+	note_count INTEGER DEFAULT '0' NOT NULL,
+	PRIMARY KEY (id)
+);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_tag_name ON tag (name);
+
+CREATE TABLE IF NOT EXISTS task (
+	id INTEGER NOT NULL,
+	title VARCHAR(200) NOT NULL,
+	description TEXT,
+	due_date DATETIME,
+	completed BOOLEAN,
+	completed_at DATETIME,
+	created_at DATETIME,
+	updated_at DATETIME,
+	PRIMARY KEY (id)
+);
+CREATE INDEX IF NOT EXISTS ix_task_completed_at ON task (completed_at);
+CREATE INDEX IF NOT EXISTS ix_task_completed_due_date ON task (completed, due_date, id);
+CREATE INDEX IF NOT EXISTS ix_task_completed_updated_at ON task (completed, updated_at);
+CREATE INDEX IF NOT EXISTS ix_task_due_date_id ON task (due_date, id);
+
+CREATE TABLE IF NOT EXISTS habit_completion (
+	habit_id INTEGER NOT NULL,
+	date DATE NOT NULL,
+	PRIMARY KEY (habit_id, date),
+	FOREIGN KEY(habit_id) REFERENCES habit (id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS note_tag (
+	tag_id INTEGER NOT NULL,
+	note_id INTEGER NOT NULL,
+	PRIMARY KEY (tag_id, note_id),
+	FOREIGN KEY(tag_id) REFERENCES tag (id) ON DELETE CASCADE,
+	FOREIGN KEY(note_id) REFERENCES note (id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS ix_note_tag_note_id ON note_tag (note_id);
@@ -24,12 +24,7 @@ docker-compose up -d
 
 # Run database migrations (if any)
 echo "🗄️ Running database setup..."
-docker-compose exec web python -c "
-from app import db, app
-with app.app_context():
-    db.create_all()
-    print('Database setup completed')
-"
+docker-compose exec web flask --app app upgrade-db
 
 # Health check
 echo "🏥 Performing health check..."
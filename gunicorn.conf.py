@@ -1,17 +1,55 @@
 # Gunicorn configuration file
 import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
 
 # Server socket
 bind = "0.0.0.0:5000"
 backlog = 2048
 
-# Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Worker processes, chosen with GUNICORN_MODE:
+#   gthread (default): each process runs a pool of `threads` request threads. A slow
+#     export or a wait on the SQLite write lock ties up one thread, not a whole process,
+#     and SQLite releases the GIL while it works. A long stream is not killed by
+#     `timeout`, which only checks that the worker's main loop is alive.
+#   sync: one request per process.
+mode = os.environ.get("GUNICORN_MODE", "gthread")
+if mode == "sync":
+    worker_class = "sync"
+    workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+    threads = 1
+elif mode == "gthread":
+    worker_class = "gthread"
+    workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() + 1))
+    threads = int(os.environ.get("GUNICORN_THREADS", 8))
+else:
+    raise ValueError(f"Unknown GUNICORN_MODE: {mode}")
+# gthread: open connections per worker, idle keep-alive ones included (ignored by sync)
 worker_connections = 1000
 timeout = 30
 keepalive = 2
 
+# Startup. preload_app imports the app once in the master, and every worker is
+# forked with it already loaded, so a restarted worker serves within
+# milliseconds. Set GUNICORN_PRELOAD=false to have each worker import the code
+# itself (needed for `kill -HUP` to pick up new code).
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+# Run migrations and seed the default habits once, in the master, before forking
+migrate_on_start = os.environ.get("MIGRATE_ON_START", "true").lower() == "true"
+
+# Lets the app size its database connection pool to the threads per worker, and
+# split DB_MAX_CONNECTIONS between the workers
+os.environ.setdefault("SERVER_THREADS", str(threads))
+os.environ.setdefault("SERVER_WORKERS", str(workers))
+# Separate worker processes need a shared response cache to see each other's writes
+if workers > 1:
+    os.environ.setdefault("CACHE_BACKEND", "sqlite")
+# Workers pool their /metrics samples in a directory created fresh for each server start
+if os.environ.get("METRICS_ENABLED", "false").lower() == "true":
+    os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="second_brain_metrics_"))
+
 # Logging
 accesslog = "-"
 errorlog = "-"
@@ -33,12 +71,39 @@ tmp_upload_dir = None
 # certfile = "/path/to/ssl/cert.pem"
 
 # Server hooks
+def on_starting(server):
+    if not server.cfg.preload_app:
+        if migrate_on_start:
+            # Importing the app here would preload it after all
+            subprocess.run([sys.executable, "-m", "flask", "--app", "app", "upgrade-db"], check=True)
+        return
+    from app import app, db, prepare_database
+    from startup import warm_up
+    if migrate_on_start:
+        with app.app_context():
+            prepare_database()
+    # Warmed once here, compiled templates and statements are shared by every forked
+    # worker, which then only has to open its own connections
+    seconds = warm_up(app, db)
+    with app.app_context():
+        db.engine.dispose()
+    if seconds is not None:
+        server.log.info("Warmed up in %.0f ms before forking workers", seconds * 1000)
+
 def pre_fork(server, worker):
     pass
 
 def post_fork(server, worker):
     server.log.info("Worker spawned (pid: %s)", worker.pid)
 
+def post_worker_init(worker):
+    # The app is loaded by now with or without preload_app; warm up before accepting connections
+    from app import app, db
+    from startup import warm_up
+    seconds = warm_up(app, db)
+    if seconds is not None:
+        worker.log.info("Worker warmed up in %.0f ms (pid: %s)", seconds * 1000, worker.pid)
+
 def pre_exec(server):
     server.log.info("Forked child, re-executing.")
 
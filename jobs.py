@@ -0,0 +1,176 @@
+# jobs.py - SQLite-backed background job queue with a per-process worker pool
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueue:
+    """Runs registered handlers for rows queued in the job table.
+
+    Any process may enqueue; every process that calls start() runs worker
+    threads that claim jobs with a single UPDATE ... RETURNING, so a job runs
+    once no matter how many gunicorn workers are polling. Jobs left "running"
+    by a process that died are retried after JOB_TIMEOUT seconds.
+
+    With per-user databases (tenancy.py) the queue stays in the configured
+    database; each job records the user who queued it and runs against
+    that user's database.
+    """
+
+    def __init__(self, app=None, db=None, tenancy=None):
+        self.handlers = {}
+        self.schedules = []
+        self._pid = None
+        self._wake = threading.Event()
+        if app is not None:
+            self.init_app(app, db, tenancy)
+
+    def init_app(self, app, db, tenancy=None):
+        self.app = app
+        self.db = db
+        self.tenancy = tenancy
+        self.enabled = app.config.get('JOBS_ENABLED', True)
+        self.worker_count = app.config.get('JOB_WORKERS', 1)
+        self.poll_interval = app.config.get('JOB_POLL_INTERVAL', 2.0)
+        self.timeout = app.config.get('JOB_TIMEOUT', 3600)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', 3)
+        self.results_dir = app.config.get('JOB_RESULTS_DIR') or os.path.join(app.instance_path, 'jobs')
+
+    @property
+    def engine(self):
+        return self.db.default_engine if self.tenancy is not None else self.db.engine
+
+    def handler(self, kind):
+        def decorator(func):
+            self.handlers[kind] = func
+            return func
+        return decorator
+
+    def schedule(self, kind, next_run):
+        """Keep one upcoming `kind` job queued; next_run(now) gives its (run_at, dedupe key)."""
+        self.schedules.append((kind, next_run))
+
+    # Producer side
+    def enqueue(self, kind, params=None, run_at=None, dedupe_key=None):
+        if kind not in self.handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        tenant = self.tenancy.current() if self.tenancy is not None else None
+        with self.engine.begin() as conn:
+            inserted = conn.execute(text(
+                'INSERT INTO job (id, kind, params, status, dedupe_key, run_at, attempts, created_at, tenant) '
+                "VALUES (:id, :kind, :params, 'queued', :dedupe_key, :run_at, 0, :now, :tenant) "
+                'ON CONFLICT (dedupe_key) DO NOTHING'
+            ), {
+                'id': job_id, 'kind': kind, 'params': json.dumps(params or {}),
+                'dedupe_key': dedupe_key, 'run_at': run_at or now, 'now': now, 'tenant': tenant,
+            }).rowcount
+        if not inserted:
+            return None
+        self._wake.set()
+        return job_id
+
+    def get(self, job_id):
+        with self.engine.connect() as conn:
+            return conn.execute(text('SELECT * FROM job WHERE id = :id'), {'id': job_id}).mappings().first()
+
+    def result_path(self, job_id, extension):
+        os.makedirs(self.results_dir, exist_ok=True)
+        return os.path.join(self.results_dir, f'{job_id}.{extension}')
+
+    # Consumer side
+    def start(self):
+        """Start this process's worker threads (once per process, so it survives forking)."""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        for i in range(self.worker_count):
+            threading.Thread(target=self.run_forever, name=f'job-worker-{i}', daemon=True).start()
+
+    def run_forever(self):
+        last_schedule = 0.0
+        while True:
+            try:
+                with self.app.app_context():
+                    if time.monotonic() - last_schedule >= 60:
+                        self._ensure_scheduled()
+                        last_schedule = time.monotonic()
+                    while self.run_next():
+                        pass
+            except Exception:
+                logger.exception('Job worker error')
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _ensure_scheduled(self):
+        now = datetime.utcnow()
+        for kind, next_run in self.schedules:
+            run_at, dedupe_key = next_run(now)
+            self.enqueue(kind, run_at=run_at, dedupe_key=dedupe_key)
+
+    def _claim(self):
+        now = datetime.utcnow()
+        params = {'now': now, 'stale': now - timedelta(seconds=self.timeout)}
+        ready = ("(status = 'queued' AND run_at <= :now) OR "
+                 "(status = 'running' AND started_at < :stale)")
+        # Cheap indexed read first, so idle polling never takes the write lock
+        with self.engine.connect() as conn:
+            if conn.execute(text(f'SELECT 1 FROM job WHERE {ready} LIMIT 1'), params).first() is None:
+                return None
+        # Under PostgreSQL's READ COMMITTED every worker's subquery can pick the
+        # same row: SKIP LOCKED hands each one a different job, and re-checking
+        # the ready condition after the row lock turns a lost race into no row.
+        skip_locked = ' FOR UPDATE SKIP LOCKED' if self.engine.dialect.name == 'postgresql' else ''
+        with self.engine.begin() as conn:
+            return conn.execute(text(
+                "UPDATE job SET status = 'running', started_at = :now, attempts = attempts + 1 "
+                f'WHERE id = (SELECT id FROM job WHERE {ready} ORDER BY run_at LIMIT 1{skip_locked}) '
+                f'AND ({ready}) '
+                'RETURNING id, kind, params, attempts, tenant'
+            ), params).mappings().first()
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self.engine.begin() as conn:
+            conn.execute(text(
+                'UPDATE job SET status = :status, result = :result, error = :error, finished_at = :now '
+                'WHERE id = :id'
+            ), {
+                'id': job_id, 'status': status, 'error': error, 'now': datetime.utcnow(),
+                'result': json.dumps(result) if result is not None else None,
+            })
+
+    def run_next(self):
+        """Claim and run one job; returns False when nothing is ready."""
+        job = self._claim()
+        if job is None:
+            return False
+        if job['attempts'] > self.max_attempts:
+            self._finish(job['id'], 'failed', error='Gave up after repeated interruptions')
+            return True
+
+        handler = self.handlers.get(job['kind'])
+        with self.app.app_context():
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler for job kind {job['kind']}")
+                scope = self.tenancy.activate(job['tenant']) if self.tenancy is not None else nullcontext()
+                with scope:
+                    result = handler(job['id'], **json.loads(job['params'] or '{}'))
+                self._finish(job['id'], 'done', result=result)
+            except Exception as e:
+                logger.exception('Job %s (%s) failed', job['id'], job['kind'])
+                self.db.session.rollback()
+                self._finish(job['id'], 'failed', error=str(e))
+            finally:
+                self.db.session.remove()
+        return True
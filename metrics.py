@@ -0,0 +1,279 @@
+# metrics.py - Opt-in request instrumentation in Prometheus text format
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import Response, g, has_request_context, request
+from flask import before_render_template, request_finished, request_started, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# name -> (help text, buckets)
+HISTOGRAMS = {
+    'request_duration_seconds': ('Time to build the response, by endpoint', LATENCY_BUCKETS),
+    'request_sql_statements': ('SQL statements executed per request', SQL_COUNT_BUCKETS),
+    'request_sql_duration_seconds': ('Time spent in SQL per request', LATENCY_BUCKETS),
+    'template_render_duration_seconds': ('Template render time', LATENCY_BUCKETS),
+    'response_size_bytes': ('Response body size as sent (after compression)', SIZE_BUCKETS),
+    'section_duration_seconds': ('Time spent in instrumented hot paths', LATENCY_BUCKETS),
+}
+PREFIX = 'second_brain_'
+
+
+class Histograms:
+    """Per-label-set bucket counts, sums and totals that merge by addition."""
+
+    def __init__(self):
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            values = self.series.get(key)
+            if values is None:
+                # one slot per bucket, then +Inf, then the sum
+                values = self.series[key] = [0] * (len(buckets) + 1) + [0.0]
+            values[bisect_left(buckets, value)] += 1
+            values[-1] += value
+
+    def snapshot(self):
+        with self._lock:
+            return [[name, list(labels), list(values)] for (name, labels), values in self.series.items()]
+
+    @staticmethod
+    def merge(snapshots):
+        merged = {}
+        for snapshot in snapshots:
+            for name, labels, values in snapshot:
+                key = (name, tuple(tuple(pair) for pair in labels))
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        current[i] += value
+        return merged
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join(f'{key}="{_escape(value)}"' for key, value in pairs)
+
+
+def render_prometheus(merged):
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        series = sorted((labels, values) for (metric, labels), values in merged.items() if metric == name)
+        if not series:
+            continue
+        full_name = PREFIX + name
+        lines.append(f'# HELP {full_name} {help_text}')
+        lines.append(f'# TYPE {full_name} histogram')
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], values[:-1]):
+                cumulative += count
+                lines.append(f'{full_name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{full_name}_sum{_format_labels(labels)} {values[-1]}')
+            lines.append(f'{full_name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+class StackSampler:
+    """Samples the stacks of threads serving requests, in collapsed (flamegraph.pl) format."""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.active = {}
+        self._pid = None
+
+    def _ensure_running(self):
+        # Threads do not survive a fork, so each worker starts its own sampler
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='stack-sampler', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            for ident, stacks in list(self.active.items()):
+                frame = frames.get(ident)
+                if frame is not None:
+                    stacks[self._collapse(frame)] += 1
+
+    @staticmethod
+    def _collapse(frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append('%s:%s' % (frame.f_globals.get('__name__', '?'), getattr(code, 'co_qualname', code.co_name)))
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def start(self):
+        self._ensure_running()
+        self.active[threading.get_ident()] = Counter()
+
+    def stop(self):
+        return self.active.pop(threading.get_ident(), Counter())
+
+
+class RequestMetrics:
+    """Per-endpoint latency, SQL, template and size histograms served at /metrics.
+
+    Each process keeps its own histograms and periodically writes them to
+    METRICS_DIR, one file per pid, so /metrics can add up every gunicorn
+    worker. Without METRICS_DIR only the serving process is reported.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.histograms = Histograms()
+        self.sampler = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('METRICS_ENABLED', False)
+        if not self.enabled:
+            return
+        self.directory = app.config.get('METRICS_DIR')
+        self.flush_interval = app.config.get('METRICS_FLUSH_INTERVAL', 5)
+        self._last_flush = 0.0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            atexit.register(self.flush)
+
+        if app.config.get('PROFILER_ENABLED'):
+            self.sampler = StackSampler(app.config.get('PROFILER_INTERVAL_MS', 5) / 1000)
+            self.slow_seconds = app.config.get('PROFILER_SLOW_MS', 500) / 1000
+            self.profile_dir = app.config.get('PROFILER_DIR') or os.path.join(app.instance_path, 'profiles')
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+        request_started.connect(self._request_started, app)
+        request_finished.connect(self._request_finished, app)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._template_rendered, app)
+        event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.add_url_rule('/metrics', 'metrics', self.metrics_view)
+
+    # Request lifecycle
+    def _request_started(self, sender, **extra):
+        if request.environ.get('second_brain.warmup'):
+            return
+        g.metrics_start = time.perf_counter()
+        g.metrics_sql_count = 0
+        g.metrics_sql_seconds = 0.0
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def _request_finished(self, sender, response, **extra):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or 'unmatched'
+        observe = self.histograms.observe
+        observe('request_duration_seconds',
+                {'endpoint': endpoint, 'method': request.method, 'status': response.status_code}, elapsed)
+        observe('request_sql_statements', {'endpoint': endpoint}, g.pop('metrics_sql_count', 0))
+        observe('request_sql_duration_seconds', {'endpoint': endpoint}, g.pop('metrics_sql_seconds', 0.0))
+        # Streamed bodies (exports) have no length up front
+        if not response.is_streamed and response.content_length is not None:
+            observe('response_size_bytes', {'endpoint': endpoint}, response.content_length)
+
+        if self.sampler is not None:
+            stacks = self.sampler.stop()
+            if elapsed >= self.slow_seconds and stacks:
+                self._dump_profile(endpoint, elapsed, stacks)
+        if self.directory and time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def _before_render(self, sender, template, context, **extra):
+        g.setdefault('metrics_render_starts', []).append(time.perf_counter())
+
+    def _template_rendered(self, sender, template, context, **extra):
+        starts = g.get('metrics_render_starts')
+        if starts:
+            self.histograms.observe('template_render_duration_seconds',
+                                    {'template': template.name or 'string'}, time.perf_counter() - starts.pop())
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        if has_request_context() and 'metrics_sql_count' in g:
+            g.metrics_sql_count += 1
+            g.metrics_sql_seconds += elapsed
+
+    @contextmanager
+    def timer(self, section):
+        """Time a block of code as second_brain_section_duration_seconds{section=...}."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histograms.observe('section_duration_seconds', {'section': section}, time.perf_counter() - start)
+
+    # Output
+    def _dump_profile(self, endpoint, elapsed, stacks):
+        name = '%s-%s-%dms.folded' % (datetime.now().strftime('%Y%m%d-%H%M%S-%f'), endpoint, elapsed * 1000)
+        with open(os.path.join(self.profile_dir, name), 'w') as f:
+            for stack, count in stacks.most_common():
+                f.write(f'{stack} {count}\n')
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f'{pid}.json')
+
+    def flush(self):
+        if not self.directory:
+            return
+        self._last_flush = time.monotonic()
+        path = self._path(os.getpid())
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.histograms.snapshot(), f)
+        os.replace(path + '.tmp', path)
+
+    def collect(self):
+        snapshots = [self.histograms.snapshot()]
+        if self.directory:
+            own = os.path.basename(self._path(os.getpid()))
+            for name in os.listdir(self.directory):
+                if name.endswith('.json') and name != own:
+                    try:
+                        with open(os.path.join(self.directory, name)) as f:
+                            snapshots.append(json.load(f))
+                    except (OSError, ValueError):
+                        continue
+        return Histograms.merge(snapshots)
+
+    def metrics_view(self):
+        return Response(render_prometheus(self.collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,8 +1,14 @@
 # production.py - Windows production server
-from app import app
-from waitress import serve
 import os
 
+# Size the database connection pool to waitress' thread count (read when app is imported)
+THREADS = int(os.environ.get('SERVER_THREADS', 4))
+os.environ['SERVER_THREADS'] = str(THREADS)
+
+from app import app, db, prepare_database
+from startup import warm_up
+from waitress import serve
+
 if __name__ == '__main__':
     # Production configuration
     host = os.environ.get('HOST', '0.0.0.0')
@@ -12,5 +18,9 @@ if __name__ == '__main__':
     print("📊 Access your app at: http://localhost:5000")
     print("🛑 Press Ctrl+C to stop the server")
     
+    with app.app_context():
+        prepare_database()
+    warm_up(app, db)
+    
     # Serve with Waitress (production-ready for Windows)
-    serve(app, host=host, port=port, threads=4)
\ No newline at end of file
+    serve(app, host=host, port=port, threads=THREADS)
\ No newline at end of file
@@ -0,0 +1,73 @@
+# reminders.py - Long-poll waits for due-soon task reminders
+import threading
+import time
+from datetime import timedelta
+
+from database.engine import server_threads
+
+
+class DueSoonReminders:
+    """Holds /api/tasks/reminders requests open until a reminder is due.
+
+    A waiting request runs its query again when a commit in this process
+    changes tasks, when the next task comes within the lead time, and every
+    REMINDER_RECHECK seconds to pick up writes from other processes. At most
+    max_waiters requests per process wait at once, so long polls never hold
+    every request thread; the others are answered straight away.
+    """
+
+    def __init__(self, app=None):
+        self._changed = threading.Condition()
+        self._generation = 0
+        self._waiters = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.lead = timedelta(minutes=app.config.get('REMINDER_LEAD_MINUTES', 15))
+        self.max_wait = app.config.get('REMINDER_WAIT', 25)
+        self.recheck = app.config.get('REMINDER_RECHECK', 5)
+        max_waiters = app.config.get('REMINDER_MAX_WAITERS')
+        # Half the request threads by default; none in a single-threaded (sync) worker
+        self.max_waiters = server_threads() // 2 if max_waiters is None else int(max_waiters)
+        app.extensions['due_soon_reminders'] = self
+
+    def notify(self):
+        """Wake every waiting request; called after a commit that changed tasks."""
+        with self._changed:
+            self._generation += 1
+            self._changed.notify_all()
+
+    def poll(self, fetch, wait):
+        """Call fetch() until it returns reminders or `wait` seconds have passed.
+
+        fetch() returns (reminders, seconds until the next task is due for a
+        reminder, or None). Returns (reminders, waited); waited is False when
+        no waiting slot was free and the result is from a single fetch.
+        """
+        with self._changed:
+            waiting = wait > 0 and self._waiters < self.max_waiters
+            if waiting:
+                self._waiters += 1
+        if not waiting:
+            return fetch()[0], False
+
+        try:
+            deadline = time.monotonic() + min(wait, self.max_wait)
+            while True:
+                with self._changed:
+                    generation = self._generation
+                reminders, next_in = fetch()
+                remaining = deadline - time.monotonic()
+                if reminders or remaining <= 0:
+                    return reminders, True
+                timeout = min(remaining, self.recheck)
+                if next_in is not None:
+                    timeout = min(timeout, max(next_in, 0))
+                with self._changed:
+                    # A commit between the fetch and here has already moved the generation on
+                    if self._generation == generation:
+                        self._changed.wait(timeout)
+        finally:
+            with self._changed:
+                self._waiters -= 1
@@ -0,0 +1,285 @@
+# search.py - Full-text search over tasks, notes, habits and logs (SQLite FTS5 or PostgreSQL)
+import re
+from datetime import date, timedelta
+
+from markupsafe import Markup, escape
+from sqlalchemy import text
+
+# Marker characters used by snippet()/highlight(); swapped for <mark> after escaping
+_HL_START = '\x02'
+_HL_END = '\x03'
+
+# source table -> (fts table, indexed columns, bm25 column weights)
+FTS_INDEXES = {
+    'task': ('task_fts', ('title', 'description'), (10.0, 1.0)),
+    'note': ('note_fts', ('content', 'tags'), (1.0, 5.0)),
+    'habit': ('habit_fts', ('name', 'description'), (10.0, 1.0)),
+    'daily_log': ('daily_log_fts', ('accomplishments', 'missed_items', 'tomorrow_plan'), (2.0, 1.0, 1.0)),
+}
+
+_TOKEN_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# Databases whose search index is known to exist (one per user with tenancy)
+_ready = set()
+
+
+def _index_ddl(table, fts, columns):
+    cols = ', '.join(columns)
+    new_cols = ', '.join(f'new.{c}' for c in columns)
+    old_cols = ', '.join(f'old.{c}' for c in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{cols}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); END",
+        # Only re-index when searchable columns change (not on every completion toggle)
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old_cols}); "
+        f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new_cols}); END",
+    ]
+
+
+def build_match_query(query):
+    """Turn user input into an FTS5 MATCH expression.
+
+    "quoted text" becomes a phrase query, bare words become prefix queries,
+    and every term must match.
+    """
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(query):
+        if phrase.strip():
+            terms.append('"%s"' % phrase.replace('"', '""'))
+        elif word:
+            word = word.replace('"', '""')
+            terms.append('"%s"*' % word)
+    return ' AND '.join(terms)
+
+
+def _lexeme(word):
+    return "'%s'" % word.replace('\\', '\\\\').replace("'", "''")
+
+
+def build_tsquery(query):
+    """The same search as build_match_query, as a PostgreSQL to_tsquery() expression."""
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(query):
+        if phrase.strip():
+            terms.append('(%s)' % ' <-> '.join(_lexeme(w) for w in phrase.split()))
+        elif word:
+            terms.append(_lexeme(word) + ':*')
+    return ' & '.join(terms)
+
+
+class _FTS5:
+    """External-content FTS5 tables kept in sync by triggers, ranked by bm25()."""
+
+    build_query = staticmethod(build_match_query)
+
+    def ensure(self, conn):
+        existing = {row[0] for row in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%_fts'"
+        ))}
+        for table, (fts, columns, _) in FTS_INDEXES.items():
+            for statement in _index_ddl(table, fts, columns):
+                conn.execute(text(statement))
+            if fts not in existing:
+                conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+    def drop(self, conn):
+        for fts, _, _ in FTS_INDEXES.values():
+            conn.execute(text(f"DROP TABLE IF EXISTS {fts}"))
+
+    def optimize(self, conn):
+        for fts, _, _ in FTS_INDEXES.values():
+            conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('optimize')"))
+
+    def highlight(self, table, column):
+        return f'highlight({FTS_INDEXES[table][0]}, {column}, :hs, :he)'
+
+    def snippet(self, table, column, tokens):
+        return f"snippet({FTS_INDEXES[table][0]}, {column}, :hs, :he, '…', {tokens})"
+
+    def search_sql(self, table, select):
+        fts, _, weights = FTS_INDEXES[table]
+        return (
+            f"SELECT {select} FROM {fts} JOIN {table} AS src ON src.id = {fts}.rowid "
+            f"WHERE {fts} MATCH :match "
+            f"ORDER BY bm25({fts}, {', '.join(str(w) for w in weights)}) LIMIT :limit"
+        )
+
+
+class _PostgresFTS:
+    """A stored, generated search_vector column per table with a GIN index, ranked by ts_rank().
+
+    PostgreSQL keeps the column up to date itself, so no triggers are needed,
+    and matching rows are ranked from the stored vectors rather than
+    re-tokenizing their text. The 'simple' configuration neither stems nor
+    drops stop words, like FTS5's unicode61 tokenizer; unlike it, accents are kept.
+    """
+
+    build_query = staticmethod(build_tsquery)
+
+    @staticmethod
+    def _vector(table):
+        _, columns, _ = FTS_INDEXES[table]
+        return ' || '.join(
+            f"setweight(to_tsvector('simple', coalesce({column}, '')), '{label}')"
+            for column, label in zip(columns, 'ABC')
+        )
+
+    @staticmethod
+    def _weights(table):
+        # ts_rank wants {D, C, B, A}, each at most 1; columns are labelled A, B, C
+        _, _, weights = FTS_INDEXES[table]
+        scaled = [weight / max(weights) for weight in weights] + [0.0] * (4 - len(weights))
+        return '{%s}' % ', '.join(str(weight) for weight in reversed(scaled))
+
+    def ensure(self, conn):
+        for table in FTS_INDEXES:
+            conn.execute(text(
+                f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS search_vector tsvector '
+                f'GENERATED ALWAYS AS ({self._vector(table)}) STORED'
+            ))
+            conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING gin (search_vector)'))
+
+    def drop(self, conn):
+        for table in FTS_INDEXES:
+            conn.execute(text(f'ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector'))
+
+    def optimize(self, conn):
+        # Merge the GIN pending lists into the main index
+        for table in FTS_INDEXES:
+            conn.execute(text(f"SELECT gin_clean_pending_list('ix_{table}_search'::regclass)"))
+
+    def highlight(self, table, column):
+        name = FTS_INDEXES[table][1][column]
+        return f"ts_headline('simple', src.{name}, query, :hl_all)"
+
+    def snippet(self, table, column, tokens):
+        columns = FTS_INDEXES[table][1]
+        source = f"concat_ws(' ', {', '.join(f'src.{c}' for c in columns)})" if column < 0 else f'src.{columns[column]}'
+        return f"ts_headline('simple', {source}, query, :hl_fragment{tokens})"
+
+    def search_sql(self, table, select):
+        # Rank and limit on the index alone; headlines are built for the kept rows only
+        return (
+            f"SELECT {select} FROM ("
+            f"SELECT id, ts_rank('{self._weights(table)}', search_vector, query) AS rank "
+            f"FROM {table}, to_tsquery('simple', :match) AS query "
+            f"WHERE search_vector @@ query ORDER BY rank DESC LIMIT :limit"
+            f") AS hit JOIN {table} AS src ON src.id = hit.id, to_tsquery('simple', :match) AS query "
+            f"ORDER BY hit.rank DESC"
+        )
+
+
+_BACKENDS = {'sqlite': _FTS5(), 'postgresql': _PostgresFTS()}
+
+# ts_headline options matching highlight() and snippet(..., 24 / 32) above
+_HEADLINE_OPTIONS = {
+    'hl_all': f'StartSel={_HL_START}, StopSel={_HL_END}, HighlightAll=true',
+    'hl_fragment24': f'StartSel={_HL_START}, StopSel={_HL_END}, MaxFragments=1, MaxWords=24, MinWords=12',
+    'hl_fragment32': f'StartSel={_HL_START}, StopSel={_HL_END}, MaxFragments=1, MaxWords=32, MinWords=16',
+}
+
+
+def _backend(engine):
+    try:
+        return _BACKENDS[engine.dialect.name]
+    except KeyError:
+        raise NotImplementedError(f'Full-text search is not available on {engine.dialect.name}') from None
+
+
+def ensure_search_index(engine):
+    """Create the search index if missing, backfilling it from the source tables."""
+    if str(engine.url) in _ready:
+        return
+    with engine.begin() as conn:
+        _backend(engine).ensure(conn)
+    _ready.add(str(engine.url))
+
+
+def rebuild_search_index(engine):
+    """Drop and rebuild the search index from its source tables."""
+    backend = _backend(engine)
+    with engine.begin() as conn:
+        backend.drop(conn)
+    _ready.discard(str(engine.url))
+    ensure_search_index(engine)
+    with engine.begin() as conn:
+        backend.optimize(conn)
+
+
+def _mark(value):
+    if not value:
+        return Markup('')
+    return Markup(str(escape(value)).replace(_HL_START, '<mark>').replace(_HL_END, '</mark>'))
+
+
+def _search_table(conn, backend, table, select, match, limit):
+    return conn.execute(text(backend.search_sql(table, select)), {
+        'match': match, 'limit': limit, 'hs': _HL_START, 'he': _HL_END, **_HEADLINE_OPTIONS,
+        'streak_since': date.today() - timedelta(days=1),
+    }).mappings().all()
+
+
+def search_content(engine, query, limit=50):
+    results = {'tasks': [], 'notes': [], 'habits': [], 'logs': []}
+    backend = _backend(engine)
+    match = backend.build_query(query)
+    if not match:
+        return results
+
+    ensure_search_index(engine)
+    with engine.connect() as conn:
+        for row in _search_table(conn, backend, 'task', (
+            "src.id, src.title, src.description, src.completed, src.due_date, "
+            f"{backend.highlight('task', 0)} AS title_hl, "
+            f"{backend.snippet('task', 1, 24)} AS description_hl"
+        ), match, limit):
+            results['tasks'].append({
+                'id': row['id'],
+                'title': _mark(row['title_hl']),
+                'description': _mark(row['description_hl']),
+                'completed': bool(row['completed']),
+                'due_date': row['due_date'],
+            })
+
+        for row in _search_table(conn, backend, 'note', (
+            "src.id, src.tags, "
+            f"{backend.snippet('note', 0, 32)} AS content_hl, "
+            f"{backend.highlight('note', 1)} AS tags_hl"
+        ), match, limit):
+            results['notes'].append({
+                'id': row['id'],
+                'content': _mark(row['content_hl']),
+                'tags': _mark(row['tags_hl']),
+            })
+
+        for row in _search_table(conn, backend, 'habit', (
+            # Habit.current_streak: a streak not extended yesterday or today is broken
+            "src.id, CASE WHEN src.last_completed >= :streak_since "
+            "THEN coalesce(src.streak_count, 0) ELSE 0 END AS current_streak, "
+            f"{backend.highlight('habit', 0)} AS name_hl, "
+            f"{backend.snippet('habit', 1, 24)} AS description_hl"
+        ), match, limit):
+            results['habits'].append({
+                'id': row['id'],
+                'name': _mark(row['name_hl']),
+                'description': _mark(row['description_hl']),
+                'streak': row['current_streak'],
+            })
+
+        for row in _search_table(conn, backend, 'daily_log', (
+            "src.id, src.date, "
+            f"{backend.snippet('daily_log', -1, 24)} AS snippet_hl"
+        ), match, limit):
+            results['logs'].append({
+                'id': row['id'],
+                'date': row['date'],
+                'snippet': _mark(row['snippet_hl']),
+            })
+
+    return results
@@ -0,0 +1,133 @@
+# serialization.py - Compiled row schemas and the JSON provider (orjson when installed)
+import json
+
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import Date, DateTime, select
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib encoder is used instead
+    orjson = None
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's provider, plus encode() for streamed records."""
+
+    # Schemas convert dates to ISO strings themselves for this encoder
+    native_datetimes = False
+
+    def encode(self, obj):
+        # Same text as json.dumps, unsorted, for export lines
+        return json.dumps(obj)
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """orjson for responses, request bodies and exports; dates and datetimes serialize natively."""
+
+    native_datetimes = True
+    # Keys keep the order the schema gives them
+    sort_keys = False
+
+    def _option(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self._option(kwargs.get('indent'))).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def encode(self, obj):
+        return orjson.dumps(obj, default=self.default, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default, option=self._option(indent) | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def install_json_provider(app):
+    """Set app.json from JSON_BACKEND: orjson, stdlib, or auto (orjson if installed)."""
+    backend = app.config.get('JSON_BACKEND', 'auto')
+    if backend not in ('auto', 'orjson', 'stdlib'):
+        raise ValueError(f'Unknown JSON_BACKEND: {backend}')
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError('JSON_BACKEND=orjson but orjson is not installed')
+    use_orjson = orjson is not None and backend != 'stdlib'
+    app.json = (OrjsonProvider if use_orjson else StdlibJSONProvider)(app)
+
+
+class Schema:
+    """The columns a read-only endpoint returns, and a row -> dict function compiled once.
+
+    Fields are attribute names of `model`, or (key, attribute) or
+    (key, attribute, default) tuples; a default replaces empty values. Rows
+    come from select(), so no ORM objects are built. Date and datetime
+    columns are converted to ISO strings only when the JSON provider cannot
+    serialize them itself.
+    """
+
+    def __init__(self, model, *fields):
+        self.model = model
+        self.fields = []
+        for field in fields:
+            if isinstance(field, str):
+                field = (field, field)
+            key, attribute, default = (tuple(field) + (None,))[:3]
+            self.fields.append((key, attribute, default))
+        self.keys = [key for key, _, _ in self.fields]
+        self._compiled = {}
+        self._projections = {}
+
+    def columns(self):
+        # Resolved on every call so hybrid expressions (e.g. today's date) stay current
+        return [getattr(self.model, attribute).label(key) for key, attribute, _ in self.fields]
+
+    def select(self):
+        return select(*self.columns())
+
+    def only(self, keys):
+        """This schema narrowed to `keys` (in this schema's order), built once per key set."""
+        keys = tuple(key for key in self.keys if key in set(keys))
+        schema = self._projections.get(keys)
+        if schema is None:
+            fields = [field for field in self.fields if field[0] in keys]
+            schema = self._projections[keys] = Schema(self.model, *fields)
+        return schema
+
+    def _compile(self, native_datetimes):
+        values = []
+        for index, (key, attribute, default) in enumerate(self.fields):
+            value = f'row[{index}]'
+            column_type = getattr(self.model, attribute).type
+            if not native_datetimes and isinstance(column_type, (Date, DateTime)):
+                value = f'({value}.isoformat() if {value} is not None else None)'
+            if default is not None:
+                value = f'({value} or {default!r})'
+            values.append(f'{key!r}: {value}')
+        source = 'def to_dict(row):\n    return {%s}\n' % ', '.join(values)
+        namespace = {}
+        exec(compile(source, f'<schema {self.model.__name__}>', 'exec'), namespace)
+        return namespace['to_dict']
+
+    def serializer(self):
+        """The row -> dict function for the app's JSON provider."""
+        native = getattr(current_app.json, 'native_datetimes', False)
+        to_dict = self._compiled.get(native)
+        if to_dict is None:
+            to_dict = self._compiled[native] = self._compile(native)
+        return to_dict
+
+    def dump(self, rows):
+        to_dict = self.serializer()
+        return [to_dict(row) for row in rows]
+
+    def dump_one(self, row):
+        return self.serializer()(row) if row is not None else None
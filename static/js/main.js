@@ -126,6 +126,72 @@ function setupAutoSave(formId, saveEndpoint) {
     });
 }
 
+// Ask the service worker to replay offline writes as soon as we reconnect,
+// then bring the local replica up to date
+window.addEventListener('online', () => {
+    navigator.serviceWorker?.controller?.postMessage('flush-writes');
+    navigator.serviceWorker?.controller?.postMessage('sync-replica');
+});
+
+// Infinite scroll for keyset-paginated list endpoints
+function setupInfiniteScroll({ list, endpoint, itemsKey, renderItem, emptyState, params = {} }) {
+    let cursor = list.dataset.nextCursor || null;
+    let exhausted = !cursor;
+    let loading = false;
+    let currentParams = params;
+
+    const sentinel = document.createElement('div');
+    sentinel.className = 'scroll-sentinel';
+    list.after(sentinel);
+
+    async function loadPage() {
+        if (loading || exhausted) return;
+        loading = true;
+        try {
+            const query = new URLSearchParams(currentParams);
+            if (cursor) query.set('cursor', cursor);
+            const response = await fetch(`${endpoint}?${query}`);
+            const data = await response.json();
+            data[itemsKey].forEach(item => list.appendChild(renderItem(item)));
+            cursor = data.next_cursor;
+            exhausted = !cursor;
+            if (!list.children.length && emptyState) {
+                list.appendChild(emptyState());
+            }
+        } catch (error) {
+            console.error(`Error loading ${itemsKey}:`, error);
+        } finally {
+            loading = false;
+        }
+    }
+
+    const observer = new IntersectionObserver((entries) => {
+        if (entries[0].isIntersecting) loadPage();
+    }, { rootMargin: '400px' });
+    observer.observe(sentinel);
+
+    return {
+        reset(newParams) {
+            currentParams = newParams;
+            cursor = null;
+            exhausted = false;
+            list.innerHTML = '';
+            loadPage();
+        }
+    };
+}
+
+function createEmptyState(title, message) {
+    const empty = document.createElement('div');
+    empty.className = 'empty-state';
+    const heading = document.createElement('h3');
+    heading.textContent = title;
+    const text = document.createElement('p');
+    text.textContent = message;
+    empty.append(heading, text);
+    return empty;
+}
+
 // Notification system
 class NotificationSystem {
     constructor() {
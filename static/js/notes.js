@@ -94,4 +94,55 @@ document.addEventListener('click', (e) => {
     if (e.target.id === 'noteModal') {
         closeNoteModal();
     }
-});
\ No newline at end of file
+});
+
+// Note rendering for pages loaded by infinite scroll
+function renderNoteCard(note) {
+    const card = document.createElement('div');
+    card.className = 'note-card';
+
+    const content = document.createElement('div');
+    content.className = 'note-content';
+    note.content.split('\n').forEach((line, index) => {
+        if (index > 0) content.appendChild(document.createElement('br'));
+        content.appendChild(document.createTextNode(line));
+    });
+    card.appendChild(content);
+
+    if (note.tags) {
+        const tags = document.createElement('div');
+        tags.className = 'note-tags';
+        note.tags.split(',').forEach(tag => {
+            const span = document.createElement('span');
+            span.className = 'tag';
+            span.textContent = `#${tag.trim()}`;
+            tags.appendChild(span);
+        });
+        card.appendChild(tags);
+    }
+
+    const meta = document.createElement('div');
+    meta.className = 'note-meta';
+    meta.innerHTML = `
+        <small></small>
+        <div class="note-actions">
+            <button onclick="editNote(${note.id})" class="btn-icon">✏️</button>
+            <button onclick="deleteNote(${note.id})" class="btn-icon">🗑️</button>
+        </div>
+    `;
+    meta.querySelector('small').textContent = `Last updated: ${note.updated_at.slice(0, 16).replace('T', ' ')}`;
+    card.appendChild(meta);
+
+    return card;
+}
+
+const notesList = document.getElementById('notesList');
+if (notesList) {
+    setupInfiniteScroll({
+        list: notesList,
+        endpoint: '/api/notes',
+        itemsKey: 'notes',
+        renderItem: renderNoteCard,
+        emptyState: () => createEmptyState('No notes yet', 'Capture your first idea!')
+    });
+}
\ No newline at end of file
@@ -1,13 +1,34 @@
 // Simple notification system
 class NotificationManager {
     constructor() {
+        // Where the last reminder left off, so a reload does not repeat it
+        this.cursor = localStorage.getItem('reminderCursor');
         this.init();
     }
 
-    async init() {
-        // Request notification permission
-        if ('Notification' in window) {
-            await Notification.requestPermission();
+    init() {
+        if (!('Notification' in window)) {
+            return;
+        }
+        if (Notification.permission === 'granted') {
+            this.pollReminders();
+        } else if (Notification.permission === 'default') {
+            // Browsers only let a click ask for permission, so offer a button
+            const button = document.getElementById('enableReminders');
+            if (button) {
+                button.style.display = '';
+                button.addEventListener('click', () => this.enableReminders(button));
+            }
+        }
+    }
+
+    async enableReminders(button) {
+        const permission = await Notification.requestPermission();
+        if (permission !== 'default') {
+            button.style.display = 'none';
+        }
+        if (permission === 'granted') {
+            this.pollReminders();
         }
     }
 
@@ -19,6 +40,39 @@ class NotificationManager {
             });
         }
     }
+
+    // Long poll /api/tasks/reminders: the server answers when a task is due soon,
+    // or after a while with nothing, and the next request goes out straight away
+    async pollReminders() {
+        while (true) {
+            let delay = 0;
+            try {
+                const query = this.cursor ? `?cursor=${encodeURIComponent(this.cursor)}` : '';
+                const response = await fetch(`/api/tasks/reminders${query}`);
+                if (response.status === 400) {
+                    // A cursor from an earlier version: start over
+                    this.cursor = null;
+                    localStorage.removeItem('reminderCursor');
+                }
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                const data = await response.json();
+                data.reminders.forEach(task => this.showTaskReminder(task.title, task.description));
+                if (data.cursor) {
+                    this.cursor = data.cursor;
+                    localStorage.setItem('reminderCursor', data.cursor);
+                }
+                delay = data.retry_after * 1000;
+            } catch (error) {
+                // Offline or server restarting
+                delay = 30000;
+            }
+            if (delay) {
+                await new Promise(resolve => setTimeout(resolve, delay));
+            }
+        }
+    }
 }
 
 // Start the notification system
@@ -34,4 +88,4 @@ function testNotification() {
     } else {
         alert('Please allow notifications in your browser settings');
     }
-}
\ No newline at end of file
+}
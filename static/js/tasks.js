@@ -129,7 +129,70 @@ document.addEventListener('click', (e) => {
     }
 });
 
-// Task Filtering
+// Task rendering for pages loaded by infinite scroll
+function renderTaskCard(task) {
+    const card = document.createElement('div');
+    card.className = `task-card${task.completed ? ' completed' : ''}`;
+    card.dataset.status = task.completed ? 'completed' : 'pending';
+
+    const header = document.createElement('div');
+    header.className = 'task-header';
+
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.className = 'task-checkbox';
+    checkbox.checked = task.completed;
+    checkbox.setAttribute('onchange', `toggleTaskCompletion(${task.id})`);
+
+    const title = document.createElement('h3');
+    title.className = 'task-title';
+    title.textContent = task.title;
+
+    const actions = document.createElement('div');
+    actions.className = 'task-actions';
+    actions.innerHTML = `
+        <button onclick="editTask(${task.id})" class="btn-icon">✏️</button>
+        <button onclick="deleteTask(${task.id})" class="btn-icon">🗑️</button>
+    `;
+
+    header.append(checkbox, title, actions);
+    card.appendChild(header);
+
+    if (task.description) {
+        const description = document.createElement('p');
+        description.className = 'task-description';
+        description.textContent = task.description;
+        card.appendChild(description);
+    }
+
+    if (task.due_date) {
+        const meta = document.createElement('div');
+        meta.className = 'task-meta';
+        meta.innerHTML = '<span class="due-date"></span>';
+        meta.firstChild.textContent = `Due: ${task.due_date.slice(0, 16).replace('T', ' ')}`;
+        card.appendChild(meta);
+    }
+
+    return card;
+}
+
+const tasksList = document.getElementById('tasksList');
+const taskScroller = tasksList && setupInfiniteScroll({
+    list: tasksList,
+    endpoint: '/api/tasks',
+    itemsKey: 'tasks',
+    renderItem: renderTaskCard,
+    emptyState: () => createEmptyState('No tasks yet', 'Add your first task to get started!')
+});
+
+// Task Filtering (server-side, so filters cover every page)
+const TASK_FILTERS = {
+    all: {},
+    pending: { completed: 'false' },
+    completed: { completed: 'true' },
+    overdue: { overdue: 'true' }
+};
+
 document.querySelectorAll('.filter-btn').forEach(btn => {
     btn.addEventListener('click', () => {
         document.querySelectorAll('.filter-btn').forEach(b => b.classList.remove('active'));
@@ -141,15 +204,5 @@ document.querySelectorAll('.filter-btn').forEach(btn => {
 });
 
 function filterTasks(filter) {
-    const tasks = document.querySelectorAll('.task-card');
-    
-    tasks.forEach(task => {
-        const status = task.dataset.status;
-        
-        if (filter === 'all' || filter === status) {
-            task.style.display = 'block';
-        } else {
-            task.style.display = 'none';
-        }
-    });
+    taskScroller?.reset(TASK_FILTERS[filter] || {});
 }
\ No newline at end of file
@@ -1,19 +1,23 @@
 // Enhanced Service Worker with better online detection
-const CACHE_NAME = 'second-brain-v1.0.1';
-const STATIC_CACHE = 'static-v1';
+//
+// Served by the app at /sw.js with self.__PRECACHE_MANIFEST set to the
+// fingerprinted asset URLs from `flask build-assets`; the static cache is
+// named after their version, so a new build replaces it without manual bumps.
+const PRECACHE = self.__PRECACHE_MANIFEST || {
+  version: 'dev',
+  urls: [
+    '/static/css/style.css',
+    '/static/css/theme.css',
+    '/static/js/main.js',
+    '/static/js/tasks.js',
+    '/static/js/notes.js',
+    '/static/js/habits.js',
+    '/static/manifest.json'
+  ]
+};
+const STATIC_CACHE = `static-${PRECACHE.version}`;
 const DYNAMIC_CACHE = 'dynamic-v1';
 
-const STATIC_ASSETS = [
-  '/',
-  '/static/css/style.css',
-  '/static/css/themes.css',
-  '/static/js/main.js',
-  '/static/js/tasks.js', 
-  '/static/js/notes.js',
-  '/static/js/habits.js',
-  '/static/manifest.json'
-];
-
 // Install event
 self.addEventListener('install', (event) => {
   console.log('Service Worker: Installing...');
@@ -22,7 +26,7 @@ self.addEventListener('install', (event) => {
   event.waitUntil(
     caches.open(STATIC_CACHE)
       .then((cache) => {
-        return cache.addAll(STATIC_ASSETS);
+        return cache.addAll(PRECACHE.urls);
       })
   );
 });
@@ -30,13 +34,265 @@ self.addEventListener('install', (event) => {
 // Activate event  
 self.addEventListener('activate', (event) => {
   console.log('Service Worker: Activated');
-  event.waitUntil(self.clients.claim());
+  event.waitUntil(Promise.all([
+    self.clients.claim(),
+    // Drop precaches from earlier builds
+    caches.keys().then((names) => Promise.all(
+      names.filter((name) => name.startsWith('static-') && name !== STATIC_CACHE)
+        .map((name) => caches.delete(name))
+    )),
+    syncReplica().catch(() => {})
+  ]));
 });
 
+// Local replica of tasks, notes, habits and logs in IndexedDB, kept current
+// with the deltas from GET /api/sync?since=<cursor>. No page reads it yet:
+// it is groundwork for offline views.
+const REPLICA_DB = 'second-brain-replica';
+const REPLICA_STORES = ['tasks', 'notes', 'habits', 'logs'];
+
+function openReplica() {
+  return new Promise((resolve, reject) => {
+    const request = indexedDB.open(REPLICA_DB, 1);
+    request.onupgradeneeded = () => {
+      REPLICA_STORES.forEach((name) => request.result.createObjectStore(name, { keyPath: 'id' }));
+      request.result.createObjectStore('meta');
+    };
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+function readCursor(db) {
+  return new Promise((resolve, reject) => {
+    const request = db.transaction('meta').objectStore('meta').get('cursor');
+    request.onsuccess = () => resolve(request.result || 0);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+// Apply one page of changes and its cursor atomically
+function applyDelta(db, delta) {
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction([...REPLICA_STORES, 'meta'], 'readwrite');
+    const changes = delta.changes || {};
+    const deleted = delta.deleted || {};
+    REPLICA_STORES.forEach((name) => {
+      const store = tx.objectStore(name);
+      if (delta.reset) {
+        store.clear();
+      }
+      (changes[name] || []).forEach((record) => store.put(record));
+      (deleted[name] || []).forEach((id) => store.delete(id));
+    });
+    tx.objectStore('meta').put(delta.cursor, 'cursor');
+    tx.oncomplete = resolve;
+    tx.onerror = () => reject(tx.error);
+  });
+}
+
+async function syncReplica() {
+  const db = await openReplica();
+  let cursor = await readCursor(db);
+  let hasMore = true;
+  while (hasMore) {
+    const response = await fetch(`/api/sync?since=${cursor}`);
+    if (!response.ok) {
+      return;
+    }
+    const delta = await response.json();
+    await applyDelta(db, delta);
+    cursor = delta.cursor;
+    hasMore = delta.has_more;
+  }
+}
+
+// Offline write queue: writes that fail while offline are stored in
+// IndexedDB and replayed as a single POST /api/batch when back online
+const QUEUE_DB = 'second-brain-queue';
+const QUEUE_STORE = 'writes';
+
+const WRITE_ROUTES = [
+  { method: 'POST', pattern: /^\/api\/(task|note)s$/, op: 'create' },
+  { method: 'PUT', pattern: /^\/api\/(task|note)s\/(\d+)$/, op: 'update' },
+  { method: 'DELETE', pattern: /^\/api\/(task|note)s\/(\d+)$/, op: 'delete' },
+  { method: 'POST', pattern: /^\/api\/(habit)s\/(\d+)\/(complete|skip)$/ }
+];
+
+function matchWriteRoute(method, path) {
+  for (const route of WRITE_ROUTES) {
+    const match = route.method === method && path.match(route.pattern);
+    if (match) {
+      return { route, match };
+    }
+  }
+  return null;
+}
+
+function toBatchOperation(method, path, data) {
+  const { route, match } = matchWriteRoute(method, path);
+  const operation = { op: route.op || match[3], type: match[1], data };
+  if (match[2]) operation.id = Number(match[2]);
+  return operation;
+}
+
+function openQueue() {
+  return new Promise((resolve, reject) => {
+    const request = indexedDB.open(QUEUE_DB, 1);
+    request.onupgradeneeded = () => request.result.createObjectStore(QUEUE_STORE, { autoIncrement: true });
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+async function queueWrite(operation) {
+  const db = await openQueue();
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(QUEUE_STORE, 'readwrite');
+    tx.objectStore(QUEUE_STORE).add(operation);
+    tx.oncomplete = resolve;
+    tx.onerror = () => reject(tx.error);
+  });
+}
+
+async function readQueue() {
+  const db = await openQueue();
+  return new Promise((resolve, reject) => {
+    const entries = [];
+    const request = db.transaction(QUEUE_STORE).objectStore(QUEUE_STORE).openCursor();
+    request.onsuccess = () => {
+      const cursor = request.result;
+      if (cursor) {
+        entries.push({ key: cursor.key, operation: cursor.value });
+        cursor.continue();
+      } else {
+        resolve(entries);
+      }
+    };
+    request.onerror = () => reject(request.error);
+  });
+}
+
+async function clearQueue(keys) {
+  const db = await openQueue();
+  return new Promise((resolve, reject) => {
+    const tx = db.transaction(QUEUE_STORE, 'readwrite');
+    keys.forEach((key) => tx.objectStore(QUEUE_STORE).delete(key));
+    tx.oncomplete = resolve;
+    tx.onerror = () => reject(tx.error);
+  });
+}
+
+// Merge repeated updates to the same object and drop updates made redundant by a delete
+function coalesceOperations(operations) {
+  const result = [];
+  const pendingUpdates = new Map();
+  for (const operation of operations) {
+    const key = operation.id !== undefined ? `${operation.type}:${operation.id}` : null;
+    if (key && operation.op === 'update' && pendingUpdates.has(key)) {
+      Object.assign(pendingUpdates.get(key).data, operation.data);
+      continue;
+    }
+    if (key && operation.op === 'delete' && pendingUpdates.has(key)) {
+      result.splice(result.indexOf(pendingUpdates.get(key)), 1);
+      pendingUpdates.delete(key);
+    }
+    const copy = { ...operation, data: { ...(operation.data || {}) } };
+    if (key && operation.op === 'update') {
+      pendingUpdates.set(key, copy);
+    }
+    result.push(copy);
+  }
+  return result;
+}
+
+async function flushQueue() {
+  const entries = await readQueue();
+  if (!entries.length) {
+    return;
+  }
+
+  const response = await fetch('/api/batch', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ operations: coalesceOperations(entries.map((entry) => entry.operation)) })
+  });
+  if (response.ok) {
+    await clearQueue(entries.map((entry) => entry.key));
+    await syncReplica();
+  }
+}
+
+function offlineResponse() {
+  return new Response(
+    JSON.stringify({ error: 'You are offline' }),
+    { status: 503, headers: { 'Content-Type': 'application/json' } }
+  );
+}
+
+// Only called for WRITE_ROUTES, whose bodies are small JSON objects
+async function handleWrite(request) {
+  const body = await request.clone().text();
+  try {
+    return await fetch(request);
+  } catch (error) {
+    let data;
+    try {
+      data = body ? JSON.parse(body) : {};
+    } catch (parseError) {
+      return offlineResponse();
+    }
+    const operation = toBatchOperation(request.method, new URL(request.url).pathname, data);
+    await queueWrite(operation);
+    if (self.registration.sync) {
+      await self.registration.sync.register('flush-writes');
+    }
+    return new Response(
+      JSON.stringify({ queued: true, message: 'Saved offline, will sync when back online' }),
+      { status: 202, headers: { 'Content-Type': 'application/json' } }
+    );
+  }
+}
+
+self.addEventListener('sync', (event) => {
+  if (event.tag === 'flush-writes') {
+    event.waitUntil(flushQueue());
+  } else if (event.tag === 'sync-replica') {
+    event.waitUntil(syncReplica());
+  }
+});
+
+self.addEventListener('message', (event) => {
+  if (event.data === 'flush-writes') {
+    event.waitUntil(flushQueue());
+  } else if (event.data === 'sync-replica') {
+    event.waitUntil(syncReplica());
+  }
+});
+
+// GET /api/ routes left to the browser: never cached, never answered from cache
+const UNCACHED_API = [
+  /^\/api\/sync$/,      // deltas are applied to the replica instead
+  /^\/api\/tasks\/reminders$/,  // a replayed long poll would repeat its reminders
+  /^\/api\/export\//,   // streamed exports, possibly far too large to keep
+  /^\/api\/jobs\/[^/]+\/download$/  // background export result files, likewise
+];
+
 // Enhanced fetch with better online detection
 self.addEventListener('fetch', (event) => {
-  // Skip non-GET requests and API routes in development
+  const path = new URL(event.request.url).pathname;
+
+  // Writes the batch API can replay go to the network, falling back to the
+  // offline queue. Every other write (imports, export jobs, batches) passes
+  // straight through, so uploads stream rather than being buffered here.
   if (event.request.method !== 'GET') {
+    if (matchWriteRoute(event.request.method, path)) {
+      event.respondWith(handleWrite(event.request));
+    }
+    return;
+  }
+
+  if (UNCACHED_API.some((pattern) => pattern.test(path))) {
     return;
   }
 
@@ -63,20 +319,35 @@ self.addEventListener('fetch', (event) => {
                 return cachedResponse;
               }
               // Return offline response for API calls
-              return new Response(
-                JSON.stringify({ error: 'You are offline' }),
-                { 
-                  status: 503,
-                  headers: { 'Content-Type': 'application/json' }
-                }
-              );
+              return offlineResponse();
             });
         })
     );
     return;
   }
 
-  // For all other requests, try cache first
+  // Pages change with every write: network first, the last copy only offline
+  if (event.request.mode === 'navigate' || (event.request.headers.get('Accept') || '').includes('text/html')) {
+    event.respondWith(
+      fetch(event.request)
+        .then((response) => {
+          if (response.status === 200) {
+            const responseClone = response.clone();
+            caches.open(DYNAMIC_CACHE)
+              .then((cache) => {
+                cache.put(event.request, responseClone);
+              });
+          }
+          return response;
+        })
+        .catch(() => caches.match(event.request)
+          .then((cachedResponse) => cachedResponse || caches.match('/'))
+          .then((cachedResponse) => cachedResponse || new Response('Offline')))
+    );
+    return;
+  }
+
+  // Static assets are fingerprinted, so a cached copy stays correct: cache first
   event.respondWith(
     caches.match(event.request)
       .then((cachedResponse) => {
@@ -98,13 +369,7 @@ self.addEventListener('fetch', (event) => {
             }
             return response;
           })
-          .catch(() => {
-            // For navigation, return offline page
-            if (event.request.mode === 'navigate') {
-              return caches.match('/');
-            }
-            return new Response('Offline');
-          });
+          .catch(() => new Response('Offline'));
       })
   );
 });
\ No newline at end of file
@@ -0,0 +1,238 @@
+# tenancy.py - One SQLite database per user, with a bounded cache of open engines
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g, has_app_context, jsonify, request
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import create_engine
+
+from database.engine import engine_options
+
+logger = logging.getLogger(__name__)
+
+# User names become file names: no path separators, no leading dot
+TENANT_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_.@-]{0,63}$')
+
+
+class TenantSQLAlchemy(SQLAlchemy):
+    """Flask-SQLAlchemy whose default engine is the active tenant's, if any.
+
+    db.engine, db.session and everything built on them follow the tenant
+    activated for the current app context, so models, queries and raw
+    connections work unchanged.
+    """
+
+    @property
+    def engines(self):
+        if has_app_context():
+            engines = g.get('tenant_engines')
+            if engines is not None:
+                return engines
+        return super().engines
+
+    @property
+    def default_engine(self):
+        """The configured database, whichever tenant is active."""
+        return super().engines[None]
+
+
+class _TenantEngine:
+    def __init__(self, engine):
+        self.engines = {None: engine}
+        self.active = 0
+        self.last_used = time.monotonic()
+        self.ready = False
+        self.lock = threading.Lock()
+
+    @property
+    def engine(self):
+        return self.engines[None]
+
+
+class EngineCache:
+    """Engines of recently active tenants, least recently used first.
+
+    Holds at most max_engines and drops those idle for idle_timeout seconds,
+    but never one a request or job is still using. Dropped engines are
+    disposed, closing their pooled connections and file handles.
+    """
+
+    def __init__(self, create, max_engines=64, idle_timeout=300):
+        self._create = create
+        self.max_engines = max_engines
+        self.idle_timeout = idle_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Connections opened before a fork belong to the parent
+        os.register_at_fork(after_in_child=self._forget)
+
+    def _forget(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, tenant):
+        with self._lock:
+            entry = self._entries.get(tenant)
+            if entry is None:
+                entry = self._entries[tenant] = _TenantEngine(self._create(tenant))
+            self._entries.move_to_end(tenant)
+            entry.active += 1
+            entry.last_used = time.monotonic()
+            evicted = self._evict()
+        for engine in evicted:
+            engine.dispose()
+        return entry
+
+    def release(self, entry):
+        with self._lock:
+            entry.active -= 1
+            entry.last_used = time.monotonic()
+
+    def _evict(self):
+        now = time.monotonic()
+        evicted = []
+        for tenant, entry in list(self._entries.items()):
+            if len(self._entries) <= self.max_engines and now - entry.last_used < self.idle_timeout:
+                break
+            if entry.active == 0:
+                evicted.append(self._entries.pop(tenant).engine)
+        return evicted
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class Tenancy:
+    """Routes each request to the database of the user the proxy authenticated.
+
+    The user name comes from TENANT_HEADER (set by nginx after auth_basic or
+    an auth proxy) or the WSGI REMOTE_USER. Each user has their own SQLite
+    file under TENANT_DB_DIR, in a subdirectory picked by a hash of the
+    name, so users never share a write lock and need no owner column.
+    A new or evicted tenant's database is brought up to date on first use by
+    the function registered with on_create.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._prepare = None
+        self.exempt_endpoints = set()
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        self.app = app
+        self.db = db
+        self.enabled = app.config.get('TENANCY_ENABLED', False)
+        self.header = app.config.get('TENANT_HEADER', 'X-Remote-User')
+        self.root = app.config.get('TENANT_DB_DIR') or os.path.join(app.instance_path, 'tenants')
+        self.engines = EngineCache(
+            self._create_engine,
+            app.config.get('TENANT_MAX_ENGINES', 64),
+            app.config.get('TENANT_IDLE_TIMEOUT', 300),
+        )
+        app.extensions['tenancy'] = self
+        if self.enabled:
+            app.before_request(self._open_request_tenant)
+            app.teardown_request(self._close_request_tenant)
+
+    def on_create(self, func):
+        """Register the function that migrates a tenant database (run with the tenant active)."""
+        self._prepare = func
+        return func
+
+    def exempt(self, *endpoints):
+        """Endpoints served without a user, e.g. static files and health checks."""
+        self.exempt_endpoints.update(endpoints)
+
+    def path_for(self, tenant):
+        shard = hashlib.sha1(tenant.encode('utf-8')).hexdigest()[:2]
+        return os.path.join(self.root, shard, f'{tenant}.db')
+
+    def tenants(self):
+        """Names of every tenant with a database."""
+        if not os.path.isdir(self.root):
+            return []
+        names = []
+        for shard in sorted(os.listdir(self.root)):
+            directory = os.path.join(self.root, shard)
+            if os.path.isdir(directory):
+                names.extend(name[:-3] for name in sorted(os.listdir(directory)) if name.endswith('.db'))
+        return names
+
+    def current(self):
+        """The active tenant's name, or None."""
+        return g.get('tenant') if has_app_context() else None
+
+    def _create_engine(self, tenant):
+        path = self.path_for(tenant)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        url = f'sqlite:///{path}'
+        return create_engine(url, **engine_options(url, self.app.config))
+
+    def _enter(self, tenant):
+        entry = self.engines.acquire(tenant)
+        g.tenant, g.tenant_engines = tenant, entry.engines
+        if not entry.ready:
+            with entry.lock:
+                if not entry.ready:
+                    self._prepare_database(tenant)
+                    entry.ready = True
+        return entry
+
+    def _prepare_database(self, tenant):
+        if self._prepare is None:
+            return
+        try:
+            self._prepare()
+        except Exception:
+            # Another process may have been migrating the same new file
+            logger.warning('Retrying database setup for tenant %s', tenant, exc_info=True)
+            self.db.session.rollback()
+            self._prepare()
+
+    @contextmanager
+    def activate(self, tenant):
+        """Run the block against `tenant`'s database (jobs, CLI commands); None leaves it as is."""
+        if not self.enabled or tenant is None:
+            yield
+            return
+        previous = (g.get('tenant'), g.get('tenant_engines'))
+        self.db.session.remove()
+        entry = self._enter(tenant)
+        try:
+            yield
+        finally:
+            self.db.session.remove()
+            self.engines.release(entry)
+            g.tenant, g.tenant_engines = previous
+
+    def each(self):
+        """Activate every tenant in turn, or yield once for the single database."""
+        if not self.enabled:
+            yield None
+            return
+        for tenant in self.tenants():
+            with self.activate(tenant):
+                yield tenant
+
+    def _open_request_tenant(self):
+        if request.endpoint in self.exempt_endpoints:
+            return None
+        tenant = request.headers.get(self.header) or request.environ.get('REMOTE_USER')
+        if not tenant:
+            return jsonify({'error': 'Authentication required'}), 401
+        if not TENANT_NAME.match(tenant):
+            return jsonify({'error': 'Invalid user name'}), 400
+        g.tenant_entry = self._enter(tenant)
+        return None
+
+    def _close_request_tenant(self, exc):
+        entry = g.pop('tenant_entry', None)
+        if entry is not None:
+            self.engines.release(entry)